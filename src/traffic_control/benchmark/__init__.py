@@ -0,0 +1,5 @@
+"""
+效能測試
+
+於 src/traffic_control 目錄下以 python -m benchmark.<模組> 執行
+"""
@@ -0,0 +1,87 @@
+"""
+封包訂閱分派效能測試
+
+1. publish() 耗時：訂閱者數 N（各訂閱不同指令與控制器），比較預先計算的 (cmd_key, tc_id) 列表
+   與每筆逐一比對過濾條件
+2. 慢訂閱者隔離：一個每筆處理 1ms 的佇列訂閱者與一個快速訂閱者同時訂閱，
+   量測接收端 publish() 耗時、快速訂閱者收到的筆數與慢訂閱者的丟棄筆數
+
+執行: python -m benchmark.bus
+"""
+
+import logging
+import time
+import timeit
+
+from packet.bus import PacketBus
+from packet.center import PacketCenter
+from utils import encode
+
+CMD_CODES = ["5F03", "5F0C", "5F00", "0F04", "5FC8"]
+
+
+def _time(func, number: int) -> float:
+    """返回單次呼叫耗時（微秒，取 5 次最小值）"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def _packet(center, tc_id=3):
+    return center.parse(encode(1, tc_id, bytes([0x5F, 0x0C, 0x01, 2, 3])))
+
+
+def bench_dispatch(number: int = 100000):
+    """預先計算列表 vs 逐一比對"""
+    center = PacketCenter(mode="bench")
+    packet = _packet(center)
+
+    print(f"{'訂閱者數':<10}{'符合':>6}{'列表(us)':>10}{'逐一比對(us)':>14}")
+    for count in (0, 1, 10, 100):
+        bus = PacketBus(mode="bench")
+        for i in range(count):
+            bus.subscribe(lambda p: None, cmd_codes=[CMD_CODES[i % len(CMD_CODES)]],
+                          tc_ids=[i % 4], queue_size=0)
+        subscriptions = bus.subscriptions
+        matched = sum(s.matches(packet.cmd_key, packet.tc_id) for s in subscriptions)
+
+        def scan():
+            for s in subscriptions:
+                if s.matches(packet.cmd_key, packet.tc_id):
+                    s.deliver(packet)
+
+        t_routes = _time(lambda: bus.publish(packet), number)
+        t_scan = _time(scan, number)
+        print(f"{count:<10}{matched:>6}{t_routes:>10.3f}{t_scan:>14.3f}")
+
+
+def bench_isolation(total: int = 5000, rate: float = 2000.0):
+    """慢訂閱者不影響接收端與其他訂閱者"""
+    center = PacketCenter(mode="bench")
+    packet = _packet(center)
+    bus = PacketBus(mode="bench")
+    fast = []
+    slow = bus.subscribe(lambda p: time.sleep(0.001), queue_size=100, name="slow")
+    bus.subscribe(fast.append, queue_size=1000, name="fast")
+
+    costs = []
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for i in range(total):
+        begin = time.perf_counter_ns()
+        bus.publish(packet)
+        costs.append(time.perf_counter_ns() - begin)
+        # 固定速率送入
+        delay = start + (i + 1) * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    bus.stop()
+
+    costs.sort()
+    print(f"\n{total} 筆 @ {rate:g}/s，慢訂閱者每筆 1ms（佇列 100）")
+    print(f"publish p50 {costs[len(costs) // 2] / 1000:.1f}us, p99 {costs[int(len(costs) * 0.99)] / 1000:.1f}us")
+    print(f"快速訂閱者收到 {len(fast)}/{total}, 慢訂閱者處理 {slow.delivered}, 丟棄 {slow.dropped}")
+
+
+if __name__ == "__main__":
+    logging.getLogger("tc.bench").setLevel(logging.ERROR)
+    bench_dispatch()
+    bench_isolation()
@@ -0,0 +1,75 @@
+"""
+位元組語意解碼查表效能測試
+
+比較逐次計算（_build/_format/_describe 參考實作）與查表的耗時，
+並量測 5F03、0F04 的解析+處理耗時
+
+執行: python -m benchmark.decoders
+"""
+
+import timeit
+
+from packet.center import PacketCenter
+from packet.packet_parser import SignalStatusList, SIGNAL_STATUS_TEXT, _describe_signal_status
+from definitions.group_0f import format_0f04_hardware_status, _format_hardware_bits
+from config.constants import (
+    CONTROL_STRATEGY_MAP, ERROR_CODE_MAP, _format_control_strategy, _format_error_code
+)
+from utils import encode, int_to_binary_list, _build_binary_list
+
+
+STATUS_BYTES = [0x44, 0x84, 0x21, 0x82, 0x0C, 0x41, 0x01, 0x81]
+
+
+def _time(func, number: int) -> float:
+    """返回單次呼叫耗時（微秒，取 5 次最小值）"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def bench_decoders(number: int = 100000):
+    """查表 vs 逐次計算"""
+    cases = [
+        ("int_to_binary_list",
+         lambda: _build_binary_list(0xA5),
+         lambda: int_to_binary_list(0xA5)),
+        ("燈號狀態 x8",
+         lambda: [f"   方向 {i}: {_describe_signal_status(b)}" for i, b in enumerate(STATUS_BYTES, 1)],
+         lambda: SignalStatusList(STATUS_BYTES).formatted_lines),
+        ("0F04 硬體狀態",
+         lambda: _format_hardware_bits(0x40, 0) + _format_hardware_bits(0x81, 8),
+         lambda: format_0f04_hardware_status(0x8140)),
+        ("控制策略",
+         lambda: _format_control_strategy(0x83),
+         lambda: CONTROL_STRATEGY_MAP(0x83)),
+        ("錯誤碼",
+         lambda: _format_error_code(0x4C),
+         lambda: ERROR_CODE_MAP(0x4C)),
+    ]
+
+    print(f"{'項目':<16}{'計算(us)':>10}{'查表(us)':>10}{'倍數':>8}")
+    for name, compute, lookup in cases:
+        t_compute = _time(compute, number)
+        t_lookup = _time(lookup, number)
+        print(f"{name:<16}{t_compute:>10.3f}{t_lookup:>10.3f}{t_compute / t_lookup:>8.1f}")
+
+
+def bench_packets(number: int = 50000):
+    """5F03、0F04 解析與處理"""
+    center = PacketCenter(mode="receive")
+    frames = {
+        "5F03": encode(1, 3, bytes([0x5F, 0x03, 0x40, 0xC0, len(STATUS_BYTES), 1, 1, 0, 30] + STATUS_BYTES)),
+        "0F04": encode(1, 3, bytes([0x0F, 0x04, 0x40, 0x81])),
+    }
+
+    print(f"\n{'指令':<8}{'解析(us)':>10}{'解析+處理(us)':>16}")
+    render = center.processor.renderer.text
+    for cmd_code, frame in frames.items():
+        t_parse = _time(lambda: center.parse(frame), number)
+        t_total = _time(lambda: render(center.parse(frame)), number)
+        print(f"{cmd_code:<8}{t_parse:>10.2f}{t_total:>16.2f}")
+
+
+if __name__ == "__main__":
+    print(f"燈號狀態描述表: {len(SIGNAL_STATUS_TEXT)} 項\n")
+    bench_decoders()
+    bench_packets()
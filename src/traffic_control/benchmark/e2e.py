@@ -0,0 +1,259 @@
+"""
+端對端接收效能測試（本機 loopback，SLO 報告）
+
+子程序執行 Receive 模式（UDPTransport -> PacketBuffer -> parse -> process -> ACK，非同步日誌寫入暫存目錄），
+本程序以 benchmark.simulator 的虛擬控制器逐階提高總速率送出 5F03 / 5F0C / 0F04 / 5F00 混合流量（比例同模擬器預設），
+每一階輸出：
+- 目標與實際送出速率、送出 / ACK / 未確認（遺失）筆數
+- ACK 往返 p50 / p99（控制器送出到收到 ACK）
+- 接收程序每幀 CPU 時間（該階接收程序的 CPU 時間 / 送出幀數）
+未確認比例超過 --loss 或送出速率不足目標 90%（單核時產生端與接收端共用 CPU）的階停止，
+最大可持續速率為之前最後一個通過的階。
+
+SLO：最大可持續速率，及參考速率（--reference）該階的 ACK p50 / p99 與每幀 CPU。
+結果存為 JSON，與基準比較時任一指標變差超過門檻結束碼為 1：
+
+    python -m benchmark.e2e -o base.json
+    python -m benchmark.e2e -o new.json --compare base.json
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+
+from benchmark.simulator import DEFAULT_RATES, Simulator
+from packet.packet_definition import PacketDefinition
+
+RECEIVE_PORT = 5955
+
+DEFAULT_STEPS = [500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+# 每階結束後等待 ACK 的秒數
+SETTLE_TIME = 1.0
+
+# 比較時視為變差的門檻（比例）
+DEFAULT_THRESHOLD = 0.20
+
+# SLO 指標：名稱 -> 是否越大越好
+SLO_METRICS = {
+    "max_rate": True,
+    "ack_p50_us": False,
+    "ack_p99_us": False,
+    "cpu_us_per_packet": False,
+}
+
+
+def receiver(port: int, log_dir: str, ready, conn):
+    """接收程序：Receive 模式在背景執行緒執行，主執行緒回應 CPU 時間查詢"""
+    from config.log_setup import setup_logging
+    from config.network import UDPTransport
+    from mode import Receive
+
+    logger = setup_logging(log_dir=log_dir, log_file="receive.log", mode="receive", console=False)
+    network = UDPTransport("127.0.0.1", port, "127.0.0.1", 0, logger)
+    receive = Receive(device_id=3, mode="receive", network=network, logger=logger)
+    thread = threading.Thread(target=receive.start, name="Receive", daemon=True)
+    thread.start()
+
+    deadline = time.perf_counter() + 5.0
+    while not receive.running and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    conn.send(receive.running)
+    ready.set()
+
+    while conn.recv() != "stop":
+        conn.send(time.process_time())
+    receive.running = False
+    thread.join(timeout=3.0)
+
+
+def _step_rates(rate: float, controllers: int) -> Dict[str, float]:
+    """總速率依模擬器預設比例分配到各指令，再平均到每個控制器"""
+    total = sum(DEFAULT_RATES.values())
+    return {code: rate * weight / total / controllers for code, weight in DEFAULT_RATES.items()}
+
+
+def run_step(rate: float, controllers: int, duration: float, packet_def: PacketDefinition, cpu_time,
+             seed: int = 0) -> Dict[str, float]:
+    """以指定總速率送出 duration 秒，返回該階結果"""
+    simulator = Simulator(controllers, ("127.0.0.1", RECEIVE_PORT), _step_rates(rate, controllers),
+                          seed=seed, packet_def=packet_def)
+    cpu = cpu_time()
+    start = time.perf_counter()
+    simulator.run(duration)
+    elapsed = time.perf_counter() - start
+    simulator.drain(SETTLE_TIME)
+    cpu = cpu_time() - cpu
+    simulator.close()
+    simulator.expire_pending(0)
+
+    sent = sum(simulator.sent.values())
+    lost = simulator.counts["unacked"]
+    rtts = sorted(simulator.take_rtts())
+    return {
+        "rate": rate,
+        "send_rate": sent / elapsed,
+        "sent": sent,
+        "acked": simulator.counts["acked"],
+        "lost": lost,
+        "loss": lost / sent if sent else 0.0,
+        "ack_p50_us": rtts[len(rtts) // 2] / 1000 if rtts else None,
+        "ack_p99_us": rtts[int(len(rtts) * 0.99)] / 1000 if rtts else None,
+        "cpu_us_per_packet": cpu / sent * 1e6 if sent else None,
+    }
+
+
+def run(steps: List[float], controllers: int, duration: float, loss: float, reference: float):
+    """
+    啟動接收程序並逐階送出
+
+    Returns:
+        (各階結果, SLO 指標)
+    """
+    log_dir = tempfile.mkdtemp(prefix="tc_e2e_")
+    ready = multiprocessing.Event()
+    parent_conn, child_conn = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=receiver, args=(RECEIVE_PORT, log_dir, ready, child_conn), daemon=True)
+    process.start()
+
+    def cpu_time():
+        parent_conn.send("cpu")
+        return parent_conn.recv()
+
+    results = []
+    slo: Dict[str, Optional[float]] = {"max_rate": 0}
+    try:
+        if not ready.wait(10) or not parent_conn.recv():
+            raise RuntimeError(f"接收程序啟動失敗（端口 {RECEIVE_PORT}）")
+        packet_def = PacketDefinition()
+
+        print(f"{'目標(/s)':>9}{'送出(/s)':>10}{'送出':>8}{'ACK':>8}{'遺失':>7}"
+              f"{'p50(us)':>9}{'p99(us)':>9}{'CPU(us/幀)':>12}")
+        for rate in steps:
+            result = run_step(rate, controllers, duration, packet_def, cpu_time)
+            results.append(result)
+            print(f"{rate:>9g}{result['send_rate']:>10.0f}{result['sent']:>8}{result['acked']:>8}{result['lost']:>7}"
+                  f"{_fmt(result['ack_p50_us']):>9}{_fmt(result['ack_p99_us']):>9}"
+                  f"{_fmt(result['cpu_us_per_packet']):>12}")
+            if result["loss"] > loss:
+                print(f"遺失 {result['loss']:.2%}，停止")
+                break
+            if result["send_rate"] < rate * 0.9:
+                print("送出速率不足目標 90%（產生端或 CPU 飽和），停止")
+                break
+            slo["max_rate"] = rate
+    finally:
+        if process.is_alive():
+            try:
+                parent_conn.send("stop")
+            except OSError:
+                pass
+        process.join(timeout=5.0)
+        if process.is_alive():
+            process.terminate()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+    # 參考速率的那一階（未執行到時取第一階）
+    chosen = next((r for r in results if r["rate"] == reference), results[0] if results else None)
+    if chosen:
+        for name in ("ack_p50_us", "ack_p99_us", "cpu_us_per_packet"):
+            slo[name] = chosen[name]
+        slo["reference_rate"] = chosen["rate"]
+    return results, slo
+
+
+def _fmt(value: Optional[float]) -> str:
+    return "-" if value is None else f"{value:.1f}"
+
+
+def _metadata(args) -> Dict:
+    """執行環境"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "controllers": args.controllers,
+        "duration": args.duration,
+        "loss": args.loss,
+    }
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> int:
+    """
+    比較 SLO 指標
+
+    Returns:
+        變差超過門檻的指標數
+    """
+    regressions = 0
+    print(f"\n{'指標':<20}{'基準':>10}{'目前':>10}{'變化':>9}")
+    for name, higher_better in SLO_METRICS.items():
+        old, value = base.get(name), new.get(name)
+        if not old or value is None:
+            print(f"{name:<20}{_fmt(old):>10}{_fmt(value):>10}{'-':>9}")
+            continue
+        change = (value - old) / old
+        worse = -change if higher_better else change
+        mark = ""
+        if worse > threshold:
+            mark = "  變差"
+            regressions += 1
+        elif worse < -threshold:
+            mark = "  改善"
+        print(f"{name:<20}{old:>10.1f}{value:>10.1f}{change:>+9.1%}{mark}")
+    if base.get("reference_rate") != new.get("reference_rate"):
+        print(f"注意：參考速率不同（基準 {base.get('reference_rate')}，目前 {new.get('reference_rate')}）")
+    print(f"\n門檻 {threshold:.0%}：{regressions} 項變差")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端對端接收效能測試（SLO 報告）")
+    parser.add_argument("--steps", default=",".join(str(step) for step in DEFAULT_STEPS),
+                        help="各階總速率（幀/秒，逗號分隔）")
+    parser.add_argument("-c", "--controllers", type=int, default=50, help="虛擬控制器數")
+    parser.add_argument("--duration", type=float, default=3.0, help="每階秒數")
+    parser.add_argument("--loss", type=float, default=0.0, help="可接受的未確認比例")
+    parser.add_argument("--reference", type=float, default=1000, help="延遲與 CPU 指標的參考速率")
+    parser.add_argument("-o", "--output", help="結果 JSON 檔")
+    parser.add_argument("--compare", metavar="JSON", help="基準結果")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="變差門檻（比例）")
+    args = parser.parse_args()
+
+    try:
+        steps = [float(step) for step in args.steps.split(",") if step]
+    except ValueError:
+        parser.error(f"無效的速率: {args.steps}")
+
+    results, slo = run(steps, args.controllers, args.duration, args.loss, args.reference)
+    print(f"\nSLO：最大可持續速率 {slo['max_rate']:g}/s；參考速率 {slo.get('reference_rate', '-')}/s 下 "
+          f"ACK p50 {_fmt(slo.get('ack_p50_us'))}us, p99 {_fmt(slo.get('ack_p99_us'))}us, "
+          f"CPU {_fmt(slo.get('cpu_us_per_packet'))}us/幀")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": _metadata(args), "slo": slo, "steps": results}, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            base = json.load(f)["slo"]
+        sys.exit(1 if compare(base, slo, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
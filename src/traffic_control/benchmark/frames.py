@@ -0,0 +1,123 @@
+"""
+合成幀產生器
+
+依編譯後的定義為每個指令碼產生合法的 PAYLOAD 與幀（涵蓋 group_5f.py / group_0f.py 的全部定義）：
+- uint8 取 1~8（作為計數字段時列表長度合理），uint16 隨機，signal_map 隨機
+- 列表類型依 count_from 計算項目數；時段為合法的時、分，星期為 1~7 或 11~17
+- 固定位置（index）之前的空隙與 validation 最小長度以 0 補齊
+同一 seed 產生相同內容，不同 variant 內容不同（不被重複回報過濾）。
+
+供 benchmark.suite、benchmark.simulator 及其他效能測試使用。
+"""
+
+import random
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from packet.compiled_definition import CompiledDefinition
+from packet.packet_definition import PacketDefinition
+from utils import encode
+
+WEEKDAYS = list(range(1, 8)) + list(range(11, 18))
+
+
+class SyntheticFrame(NamedTuple):
+    """合成幀"""
+    cmd_code: str
+    seq: int
+    tc_id: int
+    payload: bytes
+    frame: bytes
+    values: Dict[str, Any]       # 字段值（PacketBuilder.build 的 fields）
+
+
+def _field_bytes(field, values: Dict[str, Any], rng: random.Random, fixed: Dict[str, Any]) -> bytes:
+    """產生單一字段的 bytes，並記錄字段值（數值字段有指定值時使用指定值）"""
+    field_type = field.type
+    if field_type in ("uint8", "signal_map"):
+        if field.name in fixed:
+            value = int(fixed[field.name]) & 0xFF
+        else:
+            value = rng.randint(1, 8) if field_type == "uint8" else rng.randint(0, 0xFF)
+        values[field.name] = value
+        return bytes([value])
+    if field_type == "uint16":
+        value = int(fixed[field.name]) & 0xFFFF if field.name in fixed else rng.randint(0, 0xFFFF)
+        values[field.name] = value
+        return value.to_bytes(2, "big")
+
+    count = int(field.count_from(values)) if field.count_from else 0
+    if field_type == "list":
+        size = field.item_size or 1
+        items = [rng.randint(0, (1 << (8 * size)) - 1) for _ in range(count)]
+        values[field.name] = items
+        return b"".join(item.to_bytes(size, "big") for item in items)
+    if field_type == "signal_status_list":
+        items = [rng.randint(0, 0xFF) for _ in range(count)]
+        values[field.name] = items
+        return bytes(items)
+    if field_type == "time_segment_list":
+        items = [(rng.randint(0, 23), rng.choice((0, 15, 30, 45)), rng.randint(1, 40)) for _ in range(count)]
+        values[field.name] = items
+        return b"".join(bytes(item) for item in items)
+    if field_type == "weekday_list":
+        items = [rng.choice(WEEKDAYS) for _ in range(count)]
+        values[field.name] = items
+        return bytes(items)
+    raise ValueError(f"{field.name}: 不支援的字段類型 {field_type}")
+
+
+def synthetic_payload(definition: CompiledDefinition, rng: random.Random,
+                      fixed: Optional[Dict[str, Any]] = None) -> Optional[tuple]:
+    """
+    產生定義的 PAYLOAD
+
+    Args:
+        definition: 編譯後的定義
+        rng: 亂數產生器
+        fixed: 數值字段（uint8 / uint16 / signal_map）的指定值，其餘字段隨機
+
+    Returns:
+        (payload, 字段值) 或 None（定義沒有群組碼/命令碼）
+    """
+    if definition.group_code is None or definition.command is None:
+        return None
+    payload = bytearray([definition.group_code, definition.command])
+    values: Dict[str, Any] = {}
+    for field in definition.fields:
+        if field.index is not None and field.index > len(payload):
+            payload.extend(bytes(field.index - len(payload)))
+        payload.extend(_field_bytes(field, values, rng, fixed or {}))
+    if len(payload) < definition.min_length:
+        payload.extend(bytes(definition.min_length - len(payload)))
+    return bytes(payload), values
+
+
+def synthetic_frames(packet_def: Optional[PacketDefinition] = None, variants: int = 1, seed: int = 0,
+                     controllers: int = 1, reply_types: Optional[set] = None) -> List[SyntheticFrame]:
+    """
+    為每個定義產生 variants 個幀（依指令碼排序，同一指令的 variant 相鄰）
+
+    Args:
+        packet_def: 封包定義（預設新建）
+        variants: 每個指令的幀數
+        seed: 亂數種子
+        controllers: 控制器數（tc_id 1~N 輪流）
+        reply_types: 只產生這些訊息型態（None 表示全部）
+    """
+    packet_def = packet_def or PacketDefinition()
+    rng = random.Random(seed)
+    frames = []
+    index = 0
+    for cmd_code, definition in sorted(packet_def.definitions.items()):
+        if reply_types is not None and definition.reply_type not in reply_types:
+            continue
+        for _ in range(variants):
+            result = synthetic_payload(definition, rng)
+            if result is None:
+                break
+            payload, values = result
+            seq = index & 0xFF
+            tc_id = index % controllers + 1
+            frames.append(SyntheticFrame(cmd_code, seq, tc_id, payload, encode(seq, tc_id, payload), values))
+            index += 1
+    return frames
@@ -0,0 +1,71 @@
+"""
+不記錄封包的處理成本
+
+PacketProcessor.process 先判斷是否記錄再格式化；比較以下情況的 process() 耗時：
+- 定義的 log_modes 不含目前模式（5F03 於 command 模式）
+- logger 等級為 WARNING（INFO 會被丟棄）
+- 會記錄（INFO，同步格式化到記憶體）
+並列出 text 格式化本身的耗時（原本不記錄時也要付出的成本）。
+
+執行: python -m benchmark.log_decision
+"""
+
+import io
+import logging
+import timeit
+
+from packet.center import PacketCenter
+from utils import encode
+
+STATUS_BYTES = [0x44, 0x84, 0x21, 0x82, 0x0C, 0x41, 0x01, 0x81]
+
+
+def _time(func, number: int) -> float:
+    """返回單次呼叫耗時（微秒，取 5 次最小值）"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def _packets(center, count):
+    """內容各不相同的 5F03 封包（不被重複過濾）"""
+    return [
+        center.parse(encode(i & 0xFF, 3, bytes(
+            [0x5F, 0x03, 0x40, 0xC0, len(STATUS_BYTES), 1, 1, (i >> 8) & 0xFF, i & 0xFF] + STATUS_BYTES
+        )))
+        for i in range(count)
+    ]
+
+
+def run(number: int = 20000):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    cases = []
+    for name, mode, level in (
+        ("log_modes 不含目前模式", "command", logging.INFO),
+        ("logger 等級 WARNING", "receive", logging.WARNING),
+        ("記錄（INFO）", "receive", logging.INFO),
+    ):
+        logger = logging.getLogger(f"tc.{mode}")
+        logger.handlers[:] = [handler]
+        logger.propagate = False
+        logger.setLevel(level)
+        center = PacketCenter(mode=mode)
+        packets = iter(_packets(center, number * 6))
+        process = center.processor.process
+        cases.append((name, _time(lambda: process(next(packets)), number)))
+        stream.seek(0)
+        stream.truncate()
+
+    center = PacketCenter(mode="receive")
+    packet = _packets(center, 1)[0]
+    render = center.processor.render
+    cases.append(("格式化本身", _time(lambda: render(packet), number)))
+
+    print(f"{'5F03 情況':<24}{'耗時(us)':>10}")
+    for name, cost in cases:
+        print(f"{name:<24}{cost:>10.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,105 @@
+"""
+日誌管線效能測試
+
+以 PacketProcessor 處理 N 筆 5F03 / 0F04 封包（內容各不相同，不被重複過濾），比較：
+- 同步：FileHandler + StreamHandler，呼叫端直接格式化與寫入（--log-queue 0）
+- 非同步：有界佇列 + 背景執行緒批次寫入
+
+輸出呼叫端每筆封包耗時、寫完全部記錄的總時間、丟棄筆數與日誌檔行數。
+終端輸出導向 /dev/null（仍有 write 系統呼叫）。每種情況在獨立程序執行。
+
+執行: python -m benchmark.logging_pipeline [-n 20000] [--queue 10000] [--flush 0.5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+STATUS_BYTES = [0x44, 0x84, 0x21, 0x82, 0x0C, 0x41, 0x01, 0x81]
+
+
+def make_frames(total):
+    """產生內容各不相同的 5F03 / 0F04 幀"""
+    from utils import encode
+    frames = []
+    for i in range(total):
+        if i % 4 == 3:
+            payload = bytes([0x0F, 0x04, (i >> 8) & 0xFF, i & 0xFF])
+        else:
+            payload = bytes([0x5F, 0x03, 0x40, 0xC0, len(STATUS_BYTES), 1, i & 0x0F,
+                             (i >> 8) & 0xFF, i & 0xFF] + STATUS_BYTES)
+        frames.append(encode(i & 0xFF, 3, payload))
+    return frames
+
+
+def worker(total, queue_size, flush_interval, results):
+    """獨立程序：設定日誌並處理封包"""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+
+    from config.log_setup import setup_logging, stop_logging, logging_stats
+    from packet.center import PacketCenter
+
+    log_dir = tempfile.mkdtemp(prefix="tc_log_bench_")
+    setup_logging(log_dir=log_dir, log_file="bench.log", mode="receive",
+                  queue_size=queue_size, flush_interval=flush_interval)
+    center = PacketCenter(mode="receive")
+    packets = [center.parse(frame) for frame in make_frames(total)]
+    process = center.processor.process
+
+    costs = []
+    start = time.perf_counter()
+    for packet in packets:
+        begin = time.perf_counter_ns()
+        process(packet)
+        costs.append(time.perf_counter_ns() - begin)
+    caller_elapsed = time.perf_counter() - start
+
+    stats = logging_stats("receive")
+    stop_logging("receive")
+    total_elapsed = time.perf_counter() - start
+
+    with open(os.path.join(log_dir, "bench.log"), encoding="utf-8") as f:
+        lines = sum(1 for _ in f)
+
+    costs.sort()
+    results.put({
+        "caller": caller_elapsed,
+        "total": total_elapsed,
+        "p50": costs[len(costs) // 2] / 1000,
+        "p99": costs[int(len(costs) * 0.99)] / 1000,
+        "dropped": stats[1] if stats else 0,
+        "lines": lines,
+    })
+
+
+def run_case(total, queue_size, flush_interval):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=worker, args=(total, queue_size, flush_interval, results))
+    proc.start()
+    stats = results.get(timeout=600)
+    proc.join(10)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日誌管線效能測試")
+    parser.add_argument("-n", type=int, default=20000, help="封包數")
+    parser.add_argument("--queue", type=int, default=10000, help="非同步佇列上限")
+    parser.add_argument("--flush", type=float, default=0.5, help="批次寫入間隔（秒）")
+    args = parser.parse_args()
+
+    print(f"封包 {args.n} 筆（3/4 為 5F03，1/4 為 0F04）")
+    print(f"{'方式':<10}{'呼叫端(s)':>10}{'全部寫完(s)':>12}{'p50(us)':>9}{'p99(us)':>9}{'丟棄':>7}{'行數':>9}")
+    cases = (("同步", 0), ("非同步", args.queue))
+    for name, queue_size in cases:
+        stats = run_case(args.n, queue_size, args.flush)
+        print(f"{name:<10}{stats['caller']:>10.3f}{stats['total']:>12.3f}{stats['p50']:>9.1f}"
+              f"{stats['p99']:>9.1f}{stats['dropped']:>7}{stats['lines']:>9}")
+
+
+if __name__ == "__main__":
+    main()
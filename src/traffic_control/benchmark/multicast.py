@@ -0,0 +1,151 @@
+"""
+Multicast 轉發丟包與吞吐量測試（本機 loopback）
+
+一個 MulticastPublisher 以指定速率送出 N 筆 5F03 幀，多個訂閱程序
+（MulticastUDPTransport + PacketBuffer + decode）各自統計收到、遺失、
+重複與校驗錯誤的筆數及吞吐量。PAYLOAD 尾端附加 4 bytes 流水號以判斷遺失。
+
+執行: python -m benchmark.multicast [-n 100000] [-c 3] [--rate 0]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+
+from config.network import MulticastPublisher, MulticastUDPTransport
+from utils import decode, encode
+
+GROUP = "239.255.13.99"
+PORT = 5699
+INTERFACE = "127.0.0.1"
+
+# 5F03 PAYLOAD（4 個方向），尾端再附加流水號
+BASE_PAYLOAD = bytes([0x5F, 0x03, 0x01, 0x1E, 4, 1, 1, 0x11, 0x22, 0x33, 0x44, 0, 30])
+
+# 最後一筆之後無數據多久視為結束（秒）
+IDLE_TIMEOUT = 1.0
+
+
+def consumer(index, total, ready, results):
+    """訂閱程序：接收並統計"""
+    logger = logging.getLogger(f"bench.multicast.{index}")
+    transport = MulticastUDPTransport(
+        local_ip=INTERFACE, local_port=PORT,
+        server_ip=INTERFACE, server_port=0,
+        logger=logger, multicast_group=GROUP,
+    )
+    if not transport.open():
+        results.put((index, None))
+        ready.set()
+        return
+    transport.socket.settimeout(0.2)
+    ready.set()
+    started = time.perf_counter()
+
+    seen = bytearray(total)
+    received = duplicates = corrupt = 0
+    first = last = None
+
+    while True:
+        data, addr = transport.receive_data()
+        now = time.perf_counter()
+        if not data:
+            if last is not None and now - last > IDLE_TIMEOUT:
+                break
+            if first is None and now - started > 30:
+                break
+            continue
+
+        for frame in transport.process_buffer(data):
+            try:
+                payload = decode(frame).get("payload")
+            except ValueError:
+                payload = None
+            if not payload:
+                corrupt += 1
+                continue
+            counter = int.from_bytes(payload[-4:], "big")
+            if counter >= total or seen[counter]:
+                duplicates += 1
+                continue
+            seen[counter] = 1
+            received += 1
+            if first is None:
+                first = now
+            last = now
+
+    transport.close()
+    elapsed = (last - first) if first is not None and last != first else 0.0
+    results.put((index, {
+        "received": received,
+        "lost": total - received,
+        "duplicates": duplicates,
+        "corrupt": corrupt,
+        "elapsed": elapsed,
+    }))
+
+
+def run(total: int, consumers: int, rate: float):
+    """執行一次測試並輸出結果"""
+    logger = logging.getLogger("bench.multicast")
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    events = [ctx.Event() for _ in range(consumers)]
+    procs = [
+        ctx.Process(target=consumer, args=(i, total, events[i], results), daemon=True)
+        for i in range(consumers)
+    ]
+    for proc in procs:
+        proc.start()
+    for event in events:
+        event.wait(10)
+
+    publisher = MulticastPublisher(GROUP, PORT, logger, interface=INTERFACE)
+    if not publisher.open():
+        print("無法開啟 multicast 轉發")
+        return
+
+    frames = [encode(i & 0xFF, 3, BASE_PAYLOAD + i.to_bytes(4, "big")) for i in range(total)]
+    interval = 1.0 / rate if rate > 0 else 0.0
+
+    start = time.perf_counter()
+    next_send = start
+    for frame in frames:
+        if interval:
+            next_send += interval
+            while time.perf_counter() < next_send:
+                pass
+        publisher.publish(frame)
+    send_elapsed = time.perf_counter() - start
+    publisher.close()
+
+    collected = dict(results.get(timeout=60) for _ in procs)
+    for proc in procs:
+        proc.join(5)
+
+    print(f"幀數 {total}, 訂閱者 {consumers}, 幀大小 {len(frames[0])} bytes, "
+          f"目標速率 {'最大' if not rate else f'{rate:.0f} pps'}")
+    print(f"發送: {send_elapsed:.3f}s, {total / send_elapsed:,.0f} pps, 發送失敗 {publisher.failed}")
+    print(f"{'訂閱者':<6}{'收到':>10}{'遺失':>10}{'遺失率':>9}{'重複':>7}{'錯誤':>7}{'pps':>12}")
+    for index in range(consumers):
+        stats = collected.get(index)
+        if stats is None:
+            print(f"{index:<6}無法開啟")
+            continue
+        pps = stats["received"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        print(f"{index:<6}{stats['received']:>10}{stats['lost']:>10}"
+              f"{stats['lost'] / total:>9.2%}{stats['duplicates']:>7}{stats['corrupt']:>7}{pps:>12,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multicast 轉發丟包與吞吐量測試")
+    parser.add_argument("-n", type=int, default=100000, help="幀數")
+    parser.add_argument("-c", "--consumers", type=int, default=3, help="訂閱程序數")
+    parser.add_argument("--rate", type=float, default=0, help="發送速率 pps（0 表示最大）")
+    args = parser.parse_args()
+    run(args.n, args.consumers, args.rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+發送排程 ACK 延遲測試（本機 loopback）
+
+命令執行緒以指定速率排入 N 筆指令（洪流），同時接收端以固定速率排入 ACK，
+接收程序記錄每筆幀到達時間，統計 ACK 從排入到送達的延遲，
+比較三種方式：
+- 直接發送：排程器未啟動，各執行緒自行 send_data（原本的做法）
+- ACK 立即送出：指令由發送執行緒送出，ACK 由接收端立即送出（預設）
+- ACK 排入佇列：ACK 也由發送執行緒送出（最高優先）
+
+ACK 以 ADDR 欄位放流水號辨識；時間使用 perf_counter_ns（同機跨程序一致）。
+
+--command-rate 0 表示不限速（純 CPU 迴圈排入，單核上會以 GIL 切換間隔佔住直譯器）。
+
+執行: python -m benchmark.outbound [-n 200000] [--command-rate 50000] [--acks 2000] [--ack-rate 2000]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+
+from config.network import UDPTransport
+from packet.outbound import OutboundScheduler
+from utils import encode
+
+SINK_PORT = 5877
+
+# 5F10 指令 PAYLOAD
+COMMAND_PAYLOAD = bytes([0x5F, 0x10, 0x01, 0x02])
+
+
+def sink(ready, stop, results):
+    """接收程序：記錄 ACK 到達時間"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sock.bind(("127.0.0.1", SINK_PORT))
+    sock.settimeout(0.1)
+    ready.set()
+
+    arrivals = {}
+    commands = 0
+    while not stop.is_set():
+        try:
+            data = sock.recv(256)
+        except socket.timeout:
+            continue
+        now = time.perf_counter_ns()
+        if data[1] == 0xDD:
+            arrivals[(data[3] << 8) | data[4]] = now
+        else:
+            commands += 1
+    results.put((arrivals, commands))
+
+
+def run_case(scheduled: bool, inline_ack: bool, total: int, command_rate: float, acks: int, ack_rate: float):
+    logging.basicConfig(level=logging.ERROR)
+    logger = logging.getLogger("bench.outbound")
+    network = UDPTransport("127.0.0.1", 0, "127.0.0.1", SINK_PORT, logger)
+    network.open()
+    target = ("127.0.0.1", SINK_PORT)
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, stop = ctx.Event(), ctx.Event()
+    results = ctx.Queue()
+    proc = ctx.Process(target=sink, args=(ready, stop, results), daemon=True)
+    proc.start()
+    ready.wait(10)
+
+    scheduler = OutboundScheduler(network, mode="bench", retransmit_timeout=0, inline_ack=inline_ack)
+    if scheduled:
+        scheduler.start()
+
+    command_frame = encode(1, 3, COMMAND_PAYLOAD)
+    ack_frames = [encode(i & 0xFF, i, b"") for i in range(acks)]
+    enqueued = [0] * acks
+
+    def flood():
+        # 每 1ms 排入一小批，以 sleep 控制速率
+        chunk = max(1, int(command_rate / 1000)) if command_rate > 0 else total
+        next_chunk = time.perf_counter()
+        for i in range(0, total, chunk):
+            for _ in range(min(chunk, total - i)):
+                scheduler.send_command(command_frame, target)
+            if command_rate > 0:
+                next_chunk += chunk / command_rate
+                delay = next_chunk - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+    flooder = threading.Thread(target=flood, daemon=True)
+    start = time.perf_counter()
+    flooder.start()
+
+    interval = 1.0 / ack_rate
+    next_send = time.perf_counter()
+    for i, frame in enumerate(ack_frames):
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        enqueued[i] = time.perf_counter_ns()
+        scheduler.send_ack(frame, target)
+
+    flooder.join()
+    # 停止時未送出的指令會被捨棄，先等佇列清空
+    while sum(scheduler.depth()):
+        time.sleep(0.01)
+    scheduler.stop(timeout=30)
+    elapsed = time.perf_counter() - start
+    time.sleep(0.3)
+    stop.set()
+    arrivals, commands = results.get(timeout=30)
+    proc.join(5)
+    network.close()
+
+    latencies = sorted(arrivals[i] - enqueued[i] for i in range(acks) if i in arrivals)
+    return {
+        "elapsed": elapsed,
+        "commands": commands,
+        "acks": len(latencies),
+        "p50": latencies[len(latencies) // 2] / 1000 if latencies else None,
+        "p99": latencies[int(len(latencies) * 0.99)] / 1000 if latencies else None,
+        "max": latencies[-1] / 1000 if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="發送排程 ACK 延遲測試")
+    parser.add_argument("-n", type=int, default=200000, help="指令洪流筆數")
+    parser.add_argument("--command-rate", type=float, default=50000, help="指令排入速率（每秒，0 表示不限速）")
+    parser.add_argument("--acks", type=int, default=2000, help="ACK 筆數")
+    parser.add_argument("--ack-rate", type=float, default=2000, help="ACK 排入速率（每秒）")
+    args = parser.parse_args()
+
+    rate = f"{args.command_rate:.0f}/s" if args.command_rate else "不限速"
+    print(f"指令 {args.n} 筆 @ {rate}, ACK {args.acks} 筆 @ {args.ack_rate:.0f}/s")
+    cases = (("直接發送", False, True), ("ACK 立即送出", True, True), ("ACK 排入佇列", True, False))
+    for name, scheduled, inline_ack in cases:
+        stats = run_case(scheduled, inline_ack, args.n, args.command_rate, args.acks, args.ack_rate)
+        print(f"{name}: 指令送達 {stats['commands']}, ACK 送達 {stats['acks']}, 耗時 {stats['elapsed']:.2f}s, "
+              f"ACK 延遲 p50 {stats['p50']:.0f}us p99 {stats['p99']:.0f}us max {stats['max']:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Packet 配置效能測試
+
+比較舊版 Packet（一般 dataclass，建立時即產生十六進制字串與 ISO 時間）
+與目前的 slots Packet（保存原始 bytes 與 time_ns，字串延遲產生）
+建立 N 個封包的耗時與記憶體
+
+執行: python -m benchmark.packet_alloc [-n 1000000]
+"""
+
+import argparse
+import binascii
+import datetime
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from packet.packet_parser import Packet
+from utils import encode
+
+
+@dataclass
+class LegacyPacket:
+    """舊版封包數據結構（對照用）"""
+    seq: int
+    tc_id: int
+    length: int
+    cmd_code: Optional[str] = None
+    command: Optional[str] = None
+    reply_type: Optional[str] = None
+    needs_ack: bool = False
+    raw_packet: Optional[str] = None
+    receive_time: Optional[str] = None
+    extra_fields: Dict[str, Any] = field(default_factory=dict)
+
+
+def make_legacy(frame: bytes):
+    return LegacyPacket(
+        seq=1, tc_id=3, length=len(frame), cmd_code="5F0C",
+        raw_packet=binascii.hexlify(frame).decode('ascii'),
+        receive_time=datetime.datetime.now().isoformat()
+    )
+
+
+def make_slotted(frame: bytes):
+    return Packet(
+        seq=1, tc_id=3, length=len(frame), cmd_code="5F0C",
+        frame=frame, receive_ns=time.time_ns()
+    )
+
+
+def measure(factory, frame: bytes, count: int):
+    """返回 (每秒建立數, 每個封包記憶體 bytes)"""
+    start = time.perf_counter()
+    for _ in range(count):
+        factory(frame)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    packets = [factory(frame) for _ in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del packets
+
+    return count / elapsed, current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Packet 配置效能測試")
+    parser.add_argument("-n", type=int, default=1_000_000, help="封包數量")
+    args = parser.parse_args()
+
+    frame = encode(1, 3, bytes([0x5F, 0x0C, 0x01, 0x02, 0x03]))
+
+    print(f"封包數量: {args.n:,}")
+    print(f"{'類型':<10}{'封包/秒':>14}{'bytes/封包':>14}")
+    for name, factory in [("legacy", make_legacy), ("slots", make_slotted)]:
+        rate, per_packet = measure(factory, frame, args.n)
+        print(f"{name:<10}{rate:>14,.0f}{per_packet:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+發送速率限制測試（本機 loopback）
+
+一次排入 K 個控制器各 M 筆指令（全部推送），接收程序記錄每個控制器的到達時間，
+檢查每個控制器與全域的實際速率是否符合 token bucket 設定，並輸出佇列等待統計。
+推送期間同時送出 ACK，確認限速不影響 ACK。
+
+執行: python -m benchmark.rate_limit [-k 20] [-m 10] [--controller-rate 5] [--global-rate 50]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import selectors
+import socket
+import time
+
+from config.network import UDPTransport
+from packet.outbound import OutboundScheduler
+from packet.rate_limit import RateLimiter
+from utils import encode
+
+BASE_PORT = 5900
+
+# 5F10 指令 PAYLOAD
+COMMAND_PAYLOAD = bytes([0x5F, 0x10, 0x01, 0x02])
+
+
+def sink(controllers, ready, stop, results):
+    """接收程序：每個控制器一個端口，記錄指令與 ACK 到達時間"""
+    sel = selectors.DefaultSelector()
+    for index in range(controllers):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", BASE_PORT + index))
+        sock.setblocking(False)
+        sel.register(sock, selectors.EVENT_READ, index)
+    ready.set()
+
+    arrivals = [[] for _ in range(controllers)]
+    acks = []
+    while not stop.is_set():
+        for key, _ in sel.select(0.05):
+            while True:
+                try:
+                    data = key.fileobj.recv(256)
+                except BlockingIOError:
+                    break
+                now = time.monotonic()
+                if data[1] == 0xDD:
+                    acks.append(now)
+                else:
+                    arrivals[key.data].append(now)
+    results.put((arrivals, acks))
+
+
+def max_in_window(times, window):
+    """任意 window 秒內的最多筆數"""
+    best = start = 0
+    for end in range(len(times)):
+        while times[end] - times[start] > window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+
+def run(controllers: int, per_controller: int, limiter: RateLimiter):
+    logging.basicConfig(level=logging.ERROR)
+    logger = logging.getLogger("bench.rate_limit")
+    network = UDPTransport("127.0.0.1", 0, "127.0.0.1", BASE_PORT, logger)
+    network.open()
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, stop = ctx.Event(), ctx.Event()
+    results = ctx.Queue()
+    proc = ctx.Process(target=sink, args=(controllers, ready, stop, results), daemon=True)
+    proc.start()
+    ready.wait(10)
+
+    scheduler = OutboundScheduler(network, mode="bench", retransmit_timeout=0, rate_limiter=limiter)
+    scheduler.start()
+    targets = [("127.0.0.1", BASE_PORT + index) for index in range(controllers)]
+    frame = encode(1, 3, COMMAND_PAYLOAD)
+    ack = encode(1, 3, b"")
+
+    total = controllers * per_controller
+    start = time.monotonic()
+    for _ in range(per_controller):
+        for target in targets:
+            scheduler.send_command(frame, target)
+    peak = scheduler.depth()[2]
+
+    # 推送期間每 10ms 送一筆 ACK，直到佇列清空
+    while sum(scheduler.depth()) and time.monotonic() - start < 600:
+        scheduler.send_ack(ack, targets[0])
+        time.sleep(0.01)
+    elapsed = time.monotonic() - start
+    scheduler.stop()
+    time.sleep(0.2)
+    stop.set()
+    arrivals, acks = results.get(timeout=30)
+    proc.join(5)
+    network.close()
+
+    received = sum(len(times) for times in arrivals)
+    all_times = sorted(t for times in arrivals for t in times)
+    print(f"控制器 {controllers} x {per_controller} 筆, {limiter.describe()}")
+    print(f"送達 {received}/{total}, 耗時 {elapsed:.2f}s, 實際 {received / elapsed:.1f} 筆/s, "
+          f"佇列峰值 {peak}, ACK 送達 {len(acks)}")
+    print(scheduler.stats_summary())
+
+    # 任意 1 秒內的筆數不應超過 burst + rate
+    bucket = limiter.global_bucket
+    if bucket:
+        print(f"全域 1 秒內最多 {max_in_window(all_times, 1.0)} 筆（上限 {bucket.burst + bucket.rate:g}）")
+    if limiter.controller_rate > 0:
+        worst = max(max_in_window(times, 1.0) for times in arrivals)
+        print(f"單一控制器 1 秒內最多 {worst} 筆（上限 {limiter.controller_burst + limiter.controller_rate:g}）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="發送速率限制測試")
+    parser.add_argument("-k", "--controllers", type=int, default=20, help="控制器數")
+    parser.add_argument("-m", type=int, default=10, help="每個控制器的指令數")
+    parser.add_argument("--controller-rate", type=float, default=5, help="每個控制器每秒指令數")
+    parser.add_argument("--controller-burst", type=float, default=2, help="每個控制器可連續送出的指令數")
+    parser.add_argument("--global-rate", type=float, default=50, help="全域每秒指令數")
+    parser.add_argument("--global-burst", type=float, default=10, help="全域可連續送出的指令數")
+    args = parser.parse_args()
+    limiter = RateLimiter(args.controller_rate, args.controller_burst, args.global_rate, args.global_burst)
+    run(args.controllers, args.m, limiter)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+轉發延遲與吞吐量測試（本機 loopback）
+
+模擬控制器與 BackServer：控制器以指定速率送出 5F03/5F0C/0F04 混合幀，
+FrameRelay 上行轉發到 BackServer，BackServer 對每筆回覆 ACK，
+relay 下行轉發回控制器（或本地 ACK 時由 relay 回覆）。
+
+輸出 relay 內部轉發延遲（receive_data 返回到 send_data 完成）與預算比較，
+以及控制器端 ACK 往返時間。
+
+執行: python -m benchmark.relay [-n 50000] [--rate 5000] [--local-ack]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+
+from config.network import UDPTransport
+from packet.center import PacketCenter
+from packet.relay import FrameRelay
+from utils import encode
+
+RELAY_PORT = 5855
+SERVER_PORT = 5889
+
+PAYLOADS = [
+    bytes([0x5F, 0x03, 0x01, 0x1E, 4, 1, 1, 0x11, 0x22, 0x33, 0x44, 0, 30]),
+    bytes([0x5F, 0x0C, 0x01, 0x02]),
+    bytes([0x0F, 0x04, 0x00, 0x01]),
+]
+
+
+def back_server(sock, stop, counts):
+    """BackServer：每筆 STX 回覆 ACK"""
+    while not stop.is_set():
+        try:
+            data, addr = sock.recvfrom(4096)
+        except socket.timeout:
+            continue
+        counts["received"] += 1
+        if data[1] == 0xBB:
+            sock.sendto(encode(data[2], (data[3] << 8) | data[4], b""), addr)
+
+
+def peers(total, rate, ready, results):
+    """模擬控制器與 BackServer（獨立程序，不與 relay 競爭 GIL）"""
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server_sock.bind(("127.0.0.1", SERVER_PORT))
+    server_sock.settimeout(0.1)
+
+    controller = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    controller.bind(("127.0.0.1", 0))
+    controller.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    controller.setblocking(False)
+
+    stop = threading.Event()
+    counts = {"received": 0}
+    server_thread = threading.Thread(target=back_server, args=(server_sock, stop, counts), daemon=True)
+    server_thread.start()
+    ready.wait(10)
+
+    # 每筆 seq 不同，記錄送出時間以計算 ACK 往返
+    frames = [encode(i & 0xFF, 3, PAYLOADS[i % len(PAYLOADS)]) for i in range(total)]
+    sent_at = {}
+    rtts = []
+    acks = 0
+
+    def collect_acks():
+        nonlocal acks
+        while True:
+            try:
+                data, _ = controller.recvfrom(64)
+            except BlockingIOError:
+                return
+            now = time.perf_counter_ns()
+            acks += 1
+            start = sent_at.pop(data[2], None)
+            if start is not None:
+                rtts.append(now - start)
+
+    interval = 1.0 / rate if rate > 0 else 0.0
+    start = time.perf_counter()
+    next_send = start
+    for i, frame in enumerate(frames):
+        if interval:
+            next_send += interval
+            collect_acks()
+            # 以 sleep 控制速率，避免單核機器上忙等搶佔 relay 的 CPU
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        sent_at[i & 0xFF] = time.perf_counter_ns()
+        controller.sendto(frame, ("127.0.0.1", RELAY_PORT))
+    send_elapsed = time.perf_counter() - start
+
+    deadline = time.perf_counter() + 1.0
+    while time.perf_counter() < deadline:
+        collect_acks()
+        time.sleep(0.001)
+
+    stop.set()
+    server_thread.join(1)
+    rtts.sort()
+    results.put({
+        "send_pps": total / send_elapsed,
+        "server_received": counts["received"],
+        "acks": acks,
+        "rtt_p50": rtts[len(rtts) // 2] / 1000 if rtts else None,
+        "rtt_p99": rtts[int(len(rtts) * 0.99)] / 1000 if rtts else None,
+        "rtt_count": len(rtts),
+    })
+
+
+def relay_loop(source, handler, stop):
+    """轉發迴圈（同 mode.Relay._relay_loop）"""
+    while not stop.is_set():
+        data, addr = source.receive_data()
+        if addr and data:
+            handler(data, addr, time.perf_counter_ns())
+
+
+def run(total: int, rate: float, local_ack: bool):
+    logging.basicConfig(level=logging.ERROR)
+    logger = logging.getLogger("bench.relay")
+
+    controller_net = UDPTransport("127.0.0.1", RELAY_PORT, "127.0.0.1", 0, logger)
+    server_net = UDPTransport("127.0.0.1", 0, "127.0.0.1", SERVER_PORT, logger)
+    controller_net.open()
+    server_net.open()
+    controller_net.socket.settimeout(0.1)
+    server_net.socket.settimeout(0.1)
+
+    center = PacketCenter(mode="relay")
+    relay = FrameRelay(center, controller_net, server_net, local_ack=local_ack)
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=relay_loop, args=(controller_net, relay.upstream, stop), daemon=True),
+        threading.Thread(target=relay_loop, args=(server_net, relay.downstream, stop), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    ctx = multiprocessing.get_context("spawn")
+    ready = ctx.Event()
+    results = ctx.Queue()
+    proc = ctx.Process(target=peers, args=(total, rate, ready, results), daemon=True)
+    proc.start()
+    ready.set()
+    stats = results.get(timeout=600)
+    proc.join(5)
+
+    stop.set()
+    for thread in threads:
+        thread.join(1)
+    controller_net.close()
+    server_net.close()
+
+    print(f"幀數 {total}, 目標速率 {'最大' if not rate else f'{rate:.0f} pps'}, "
+          f"本地ACK {'是' if local_ack else '否'}")
+    print(f"發送 {stats['send_pps']:,.0f} pps, BackServer 收到 {stats['server_received']}, "
+          f"控制器收到 ACK {stats['acks']}")
+    print(relay.collect_report(force=True))
+    if stats["rtt_count"]:
+        print(f"控制器 ACK 往返: p50 {stats['rtt_p50']:.0f}us, p99 {stats['rtt_p99']:.0f}us"
+              f"（{stats['rtt_count']} 筆）")
+    print("延遲預算: " + ("超出" if relay.over_budget() else "符合"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="轉發延遲與吞吐量測試")
+    parser.add_argument("-n", type=int, default=50000, help="幀數")
+    parser.add_argument("--rate", type=float, default=5000, help="發送速率 pps（0 表示最大）")
+    parser.add_argument("--local-ack", action="store_true", help="relay 直接回覆 ACK")
+    args = parser.parse_args()
+    run(args.n, args.rate, args.local_ack)
+
+
+if __name__ == "__main__":
+    main()
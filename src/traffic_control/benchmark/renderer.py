@@ -0,0 +1,79 @@
+"""
+封包輸出模板效能測試
+
+比較原本的格式化方式（format_packet_display 產生字串後 split，再逐行 insert 狀態行，參考實作）
+與預編譯模板一次附加的 text 輸出，並列出 json / csv 的耗時。
+狀態行數 N 增加時，原本方式每行 insert 需搬移其後的元素。
+
+執行: python -m benchmark.renderer
+"""
+
+import timeit
+
+from packet.center import PacketCenter
+from utils import encode
+
+STATUS_BYTES = [0x44, 0x84, 0x21, 0x82, 0x0C, 0x41, 0x01, 0x81]
+
+
+def _time(func, number: int) -> float:
+    """返回單次呼叫耗時（微秒，取 5 次最小值）"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def _legacy_display(packet, command, fields):
+    """原 utils.format_packet_display（參考實作）"""
+    lines = ["=" * 60, f"接收 {command} 封包: {packet.raw_packet}", "=== 封包詳細資訊 ===",
+             f"序列號 (SEQ): 0x{packet.seq:02X}", f"控制器編號: TC{packet.tc_id:03d}",
+             f"指令: {command}", f"訊息型態: {packet.reply_type}"]
+    for label, value in fields.items():
+        if isinstance(value, list):
+            lines.extend(str(item) for item in value)
+        else:
+            lines.append(f"{label}: {value}")
+    lines.append(f"原始資料: {packet.raw_packet}")
+    lines.append(f"接收時間: {packet.receive_time}")
+    lines.append("=" * 60)
+    return "\n".join(lines)
+
+
+def _legacy_5f03(packet):
+    """原 _handle_5f03（參考實作）：產生字串後 split / insert 狀態行"""
+    record = packet.record
+    fields = {
+        "時相編號": f"{record.get('時相編號'):02X}",
+        "號誌位置圖": str(record.get("號誌位置圖")),
+        "岔路數目": record.get("岔路數目"),
+        "分相序號": record.get("分相序號"),
+        "步階序號": record.get("步階序號"),
+        "步階秒數": f"{record.get('步階秒數')} 秒",
+    }
+    log_message = _legacy_display(packet, "5F03", fields)
+    signal_status_list = record.get("燈號狀態列表")
+    if signal_status_list and len(signal_status_list) > 0:
+        lines = log_message.split("\n")
+        insert_pos = len(lines) - 1
+        for status_line in reversed(signal_status_list.formatted_lines):
+            lines.insert(insert_pos, status_line)
+        log_message = "\n".join(lines)
+    return log_message
+
+
+def run(number: int = 20000):
+    center = PacketCenter(mode="receive")
+    renderer = center.processor.renderer
+
+    print(f"{'5F03 方向數':<12}{'原本(us)':>10}{'text(us)':>10}{'json(us)':>10}{'csv(us)':>10}")
+    for directions in (8, 16, 64, 200):
+        status = (STATUS_BYTES * (directions // len(STATUS_BYTES) + 1))[:directions]
+        frame = encode(1, 3, bytes([0x5F, 0x03, 0x40, 0xC0, directions, 1, 1, 0, 30] + status))
+        packet = center.parse(frame)
+        # 預先產生延遲字串，兩者比較相同的工作
+        packet.raw_packet, packet.receive_time
+        costs = [_time(lambda: _legacy_5f03(packet), number)]
+        costs += [_time(lambda f=f: f(packet), number) for f in (renderer.text, renderer.json, renderer.csv)]
+        print(f"{directions:<12}" + "".join(f"{cost:>10.2f}" for cost in costs))
+
+
+if __name__ == "__main__":
+    run()
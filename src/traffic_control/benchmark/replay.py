@@ -0,0 +1,176 @@
+"""
+擷取檔重播
+
+將 --capture 記錄的原始 datagram 依原本的時間間隔重播（--speed 1 原速、N 倍速、0 最快），
+輸出吞吐量與延遲：
+- center（預設）：同程序直接送入 PacketBuffer -> parse -> PacketCenter.process（不送 ACK），
+  延遲為每筆 datagram 的處理時間
+- udp：由另一個執行緒經 loopback 送到 UDPTransport，接收迴圈與 Base._receive_loop 相同（回覆 ACK），
+  延遲為送出到處理完成（依到達順序對應，遺失時以收到筆數計）
+
+兩者皆輸出落後排程的最大時間（處理不及時會持續增加）。
+--make N 產生 N 筆合成擷取檔（10 個控制器的 5F03 / 0F04 / 5F0C，每秒 100 筆）供測試。
+
+執行: python -m benchmark.replay capture.bin [--speed 10] [--target udp] [--log]
+"""
+
+import argparse
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from config.network import PacketBuffer, UDPTransport
+from packet.capture import CaptureReader, CaptureWriter
+from packet.center import PacketCenter
+from utils import encode
+
+STATUS_BYTES = [0x44, 0x84, 0x21, 0x82, 0x0C, 0x41, 0x01, 0x81]
+
+
+def make_capture(path: str, total: int, rate: float = 100.0, controllers: int = 10):
+    """產生合成擷取檔"""
+    writer = CaptureWriter(path)
+    start = time.time_ns()
+    for i in range(total):
+        tc_id = i % controllers + 1
+        kind = i % 8
+        if kind == 7:
+            payload = bytes([0x0F, 0x04, (i >> 8) & 0xFF, i & 0xFF])
+        elif kind == 6:
+            payload = bytes([0x5F, 0x0C, 0x01, i & 0x07, i & 0x0F])
+        else:
+            payload = bytes([0x5F, 0x03, 0x40, 0xC0, len(STATUS_BYTES), 1, i & 0x0F,
+                             (i >> 8) & 0xFF, i & 0xFF] + STATUS_BYTES)
+        writer.record(encode(i & 0xFF, tc_id, payload), ("192.168.1.%d" % tc_id, 5000),
+                      start + int(i * 1e9 / rate))
+    writer.close()
+
+
+def _pace(start: float, first_ns: int, receive_ns: int, speed: float) -> float:
+    """等待到排程時間，返回落後排程的秒數"""
+    if speed <= 0:
+        return 0.0
+    due = start + (receive_ns - first_ns) / 1e9 / speed
+    delay = due - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
+        return 0.0
+    return -delay
+
+
+def replay_center(reader: CaptureReader, speed: float, center: PacketCenter):
+    """直接送入 PacketBuffer / PacketCenter"""
+    buffer = PacketBuffer(center.logger)
+    parse, process = center.parse, center.process
+    costs, frames, lag = [], 0, 0.0
+    first_ns = None
+    start = time.perf_counter()
+    for receive_ns, addr, data in reader:
+        if first_ns is None:
+            first_ns = receive_ns
+        lag = max(lag, _pace(start, first_ns, receive_ns, speed))
+        begin = time.perf_counter_ns()
+        for frame in buffer.feed(data):
+            process(parse(frame), addr)
+            frames += 1
+        costs.append(time.perf_counter_ns() - begin)
+    return costs, frames, lag, time.perf_counter() - start
+
+
+def replay_udp(reader: CaptureReader, speed: float, center: PacketCenter, transport: UDPTransport):
+    """另一執行緒經 loopback 送到 UDPTransport"""
+    target = transport.socket.getsockname()
+    sent_at = []
+    done = threading.Event()
+    lag = [0.0]
+
+    def sender():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        first_ns = None
+        start = time.perf_counter()
+        for receive_ns, _, data in reader:
+            if first_ns is None:
+                first_ns = receive_ns
+            lag[0] = max(lag[0], _pace(start, first_ns, receive_ns, speed))
+            sent_at.append(time.perf_counter_ns())
+            sock.sendto(data, target)
+        done.set()
+        sock.close()
+
+    thread = threading.Thread(target=sender, name="ReplaySender", daemon=True)
+    costs, frames, received = [], 0, 0
+    start = time.perf_counter()
+    thread.start()
+    transport.socket.settimeout(0.5)
+    while True:
+        data, addr = transport.receive_data()
+        if not data:
+            if done.is_set():
+                break
+            continue
+        for frame in transport.process_buffer(data):
+            center.process(center.parse(frame), addr)
+            frames += 1
+        now = time.perf_counter_ns()
+        if received < len(sent_at):
+            costs.append(now - sent_at[received])
+        received += 1
+    elapsed = time.perf_counter() - start
+    if received < len(sent_at):
+        print(f"遺失 {len(sent_at) - received} 筆 datagram（接收緩衝區溢出，延遲依到達順序對應，僅供參考）")
+    return costs, frames, lag[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="擷取檔重播")
+    parser.add_argument("path", help="擷取檔")
+    parser.add_argument("--speed", type=float, default=0, help="倍速（1 原速，0 最快）")
+    parser.add_argument("--target", choices=["center", "udp"], default="center", help="送入位置")
+    parser.add_argument("--log", action="store_true", help="啟用日誌（寫入暫存目錄，含格式化成本）")
+    parser.add_argument("--make", type=int, metavar="N", help="先產生 N 筆合成擷取檔")
+    args = parser.parse_args()
+
+    if args.make:
+        if os.path.exists(args.path):
+            parser.error(f"擷取檔已存在: {args.path}")
+        make_capture(args.path, args.make)
+
+    logging.basicConfig(level=logging.ERROR)
+    if args.log:
+        from config.log_setup import setup_logging
+        setup_logging(log_dir=tempfile.mkdtemp(prefix="tc_replay_"), log_file="replay.log",
+                      mode="receive", console=False)
+
+    opened = time.perf_counter()
+    reader = CaptureReader(args.path)
+    print(f"擷取檔 {args.path}: {reader.size / 1e6:.1f} MB, 開啟 {(time.perf_counter() - opened) * 1000:.2f} ms")
+
+    if args.target == "udp":
+        logger = logging.getLogger("tc.receive")
+        transport = UDPTransport("127.0.0.1", 0, "127.0.0.1", 0, logger)
+        transport.open()
+        transport.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 << 20)
+        center = PacketCenter(mode="receive", network=transport)
+        costs, frames, lag, elapsed = replay_udp(reader, args.speed, center, transport)
+        transport.close()
+    else:
+        center = PacketCenter(mode="receive")
+        costs, frames, lag, elapsed = replay_center(reader, args.speed, center)
+    reader.close()
+
+    if not costs:
+        print("沒有記錄")
+        return
+    costs.sort()
+    speed = f"{args.speed:g}x" if args.speed > 0 else "最快"
+    print(f"{args.target} {speed}: {len(costs)} datagram / {frames} 幀, 耗時 {elapsed:.2f}s, "
+          f"{len(costs) / elapsed:.0f} datagram/s")
+    print(f"延遲 p50 {costs[len(costs) // 2] / 1000:.1f}us, p99 {costs[int(len(costs) * 0.99)] / 1000:.1f}us, "
+          f"最大 {costs[-1] / 1000:.1f}us, 落後排程最多 {lag * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
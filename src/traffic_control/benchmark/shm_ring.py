@@ -0,0 +1,139 @@
+"""
+共享記憶體環狀緩衝區效能測試
+
+寫入者以指定速率寫入 N 筆 5F03 幀，多個讀取程序（ShmRingReader）輪詢讀取，
+各自統計收到、被追上（lapped）與內容錯誤（與原幀不一致）的筆數。輸出寫入者每筆 publish 的
+耗時分佈，比較無讀取者與有讀取者時的差異（寫入者不應受讀取者影響）。
+
+執行: python -m benchmark.shm_ring [-n 200000] [-c 2] [--rate 50000] [--slots 16384]
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from packet.shm_ring import ShmRingReader, ShmRingWriter
+from utils import encode
+
+RING_NAME = "tc_bench_ring"
+
+# 5F03 PAYLOAD（4 個方向），尾端再附加流水號
+BASE_PAYLOAD = bytes([0x5F, 0x03, 0x01, 0x1E, 4, 1, 1, 0x11, 0x22, 0x33, 0x44, 0, 30])
+
+# 寫入結束後無新數據多久視為結束（秒）
+IDLE_TIMEOUT = 0.5
+
+
+def make_frames(total):
+    """產生測試幀（PAYLOAD 尾端附加流水號，每筆內容不同）"""
+    return [encode(i & 0xFF, 3, BASE_PAYLOAD + i.to_bytes(4, "big")) for i in range(total)]
+
+
+def consumer(index, total, ready, done, results):
+    """讀取程序：輪詢讀取並與原幀比對"""
+    frames = make_frames(total)
+    reader = ShmRingReader(RING_NAME, start="latest")
+    ready.set()
+
+    received = corrupt = 0
+    idle_since = None
+    while True:
+        entries = reader.read(4096)
+        if not entries:
+            now = time.perf_counter()
+            if done.is_set():
+                if idle_since is None:
+                    idle_since = now
+                elif now - idle_since > IDLE_TIMEOUT:
+                    break
+            time.sleep(0.0005)
+            continue
+        idle_since = None
+        for entry in entries:
+            if entry.frame != frames[entry.seq - 1]:
+                corrupt += 1
+            received += 1
+
+    results.put((index, {"received": received, "lapped": reader.lapped, "corrupt": corrupt}))
+    reader.close()
+
+
+def write(writer, frames, rate):
+    """依速率寫入，返回每筆 publish 耗時（ns）"""
+    costs = []
+    interval = 1.0 / rate if rate > 0 else 0.0
+    next_send = time.perf_counter()
+    for i, frame in enumerate(frames):
+        if interval:
+            next_send += interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        start = time.perf_counter_ns()
+        writer.publish(frame, 3, 0x5F03, i & 0xFF, start)
+        costs.append(time.perf_counter_ns() - start)
+    return costs
+
+
+def summarize(costs):
+    costs = sorted(costs)
+    return (f"p50 {costs[len(costs) // 2] / 1000:.2f}us, "
+            f"p99 {costs[int(len(costs) * 0.99)] / 1000:.2f}us, "
+            f"max {costs[-1] / 1000:.1f}us")
+
+
+def run(total: int, consumers: int, rate: float, slots: int):
+    frames = make_frames(total)
+
+    # 1. 無讀取者
+    writer = ShmRingWriter(RING_NAME, slot_count=slots)
+    alone = write(writer, frames, rate)
+    writer.close()
+
+    # 2. 有讀取者
+    writer = ShmRingWriter(RING_NAME, slot_count=slots)
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    done = ctx.Event()
+    events = [ctx.Event() for _ in range(consumers)]
+    procs = [
+        ctx.Process(target=consumer, args=(i, total, events[i], done, results), daemon=True)
+        for i in range(consumers)
+    ]
+    for proc in procs:
+        proc.start()
+    for event in events:
+        event.wait(10)
+
+    start = time.perf_counter()
+    shared = write(writer, frames, rate)
+    elapsed = time.perf_counter() - start
+    done.set()
+
+    collected = dict(results.get(timeout=60) for _ in procs)
+    for proc in procs:
+        proc.join(5)
+    writer.close()
+
+    print(f"幀數 {total}, slot {slots}, 幀大小 {len(frames[0])} bytes, "
+          f"目標速率 {'最大' if not rate else f'{rate:.0f} pps'}")
+    print(f"publish 耗時（無讀取者）: {summarize(alone)}")
+    print(f"publish 耗時（{consumers} 讀取者）: {summarize(shared)}, 寫入 {total / elapsed:,.0f} pps")
+    print(f"{'讀取者':<6}{'收到':>10}{'追上':>10}{'錯誤':>7}")
+    for index in range(consumers):
+        stats = collected[index]
+        print(f"{index:<6}{stats['received']:>10}{stats['lapped']:>10}{stats['corrupt']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享記憶體環狀緩衝區效能測試")
+    parser.add_argument("-n", type=int, default=200000, help="幀數")
+    parser.add_argument("-c", "--consumers", type=int, default=2, help="讀取程序數")
+    parser.add_argument("--rate", type=float, default=50000, help="寫入速率 pps（0 表示最大）")
+    parser.add_argument("--slots", type=int, default=16384, help="slot 數量")
+    args = parser.parse_args()
+    run(args.n, args.consumers, args.rate, args.slots)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+"""
+本機號誌控制器模擬器（負載測試）
+
+在 loopback 啟動 N 個虛擬控制器（各自一個 UDP socket，ADDR 依序遞增），單一執行緒以 selector 收發：
+- 依設定速率主動送出 5F03 / 5F0C / 0F04 / 5F00（--rate 指令碼=每秒筆數，每個控制器各自計算）
+- 收到中心的指令先回覆 ACK，再依定義回報：
+  設定 -> 0F80（--invalid 比例改回 0F81 參數值無效）
+  查詢 -> 對應的查詢回報（5F40 -> 5FC0、5F43 -> 5FC3、5F48 -> 5FC8 ...，同名字段沿用查詢值），
+          沒有對應定義時 0F81 無法回應資料
+  其他 -> 0F81 無此訊息
+- 統計送出的幀收到中心 ACK 的往返時間
+幀內容由 benchmark.frames 依封包定義產生並以 utils.encode 編碼，與協議定義同步。
+
+所有送出的 datagram（主動回報、ACK、回報）依比例損傷：遺失、重複、亂序（延後到同一控制器的下一筆之後）、
+損毀（隨機一個 byte）。
+
+執行: python -m benchmark.simulator -n 10 [--target 127.0.0.1:5555] [--rate 5F03=5] [--loss 0.01] [--duration 60]
+"""
+
+import argparse
+import heapq
+import random
+import selectors
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from benchmark.frames import synthetic_payload
+from config.constants import ACK
+from config.log_setup import get_logger
+from config.network import PacketBuffer
+from packet.packet_definition import PacketDefinition
+from packet.packet_parser import PacketParser
+from utils import encode
+
+# 每個控制器每秒主動回報筆數
+DEFAULT_RATES = {"5F03": 2.0, "5F0C": 1.0, "0F04": 0.2, "5F00": 0.1}
+
+# 每個指令預先產生的回報內容數（循環使用）
+PAYLOAD_VARIANTS = 16
+
+# 亂序暫存最長秒數（之後沒有下一筆也送出）
+REORDER_HOLD = 0.05
+
+# 未收到 ACK 視為遺失的秒數
+ACK_TIMEOUT = 5.0
+
+# 每輪最多送出的主動回報數（避免高速率時延遲接收）
+EMIT_BATCH_SIZE = 256
+
+# 0F81 錯誤碼
+ERROR_NO_MESSAGE = 0x01
+ERROR_NO_DATA = 0x02
+ERROR_INVALID_PARAM = 0x04
+
+IMPAIRMENTS = ("dropped", "duplicated", "reordered", "corrupted")
+
+
+class Impairment:
+    """datagram 損傷比例（0~1）"""
+
+    def __init__(self, loss: float = 0.0, duplicate: float = 0.0, reorder: float = 0.0, corrupt: float = 0.0):
+        self.loss = loss
+        self.duplicate = duplicate
+        self.reorder = reorder
+        self.corrupt = corrupt
+
+    def __str__(self):
+        return (f"遺失 {self.loss:.1%}, 重複 {self.duplicate:.1%}, 亂序 {self.reorder:.1%}, "
+                f"損毀 {self.corrupt:.1%}")
+
+
+class VirtualController:
+    """虛擬控制器狀態"""
+
+    def __init__(self, tc_id: int, sock: socket.socket, logger):
+        self.tc_id = tc_id
+        self.sock = sock
+        self.buffer = PacketBuffer(logger, datagram=True)
+        self.seq = 0
+        # 等待 ACK：seq -> 送出時間（perf_counter_ns）
+        self.pending: Dict[int, int] = {}
+        # 亂序暫存：(datagram, addr, 暫存時間)
+        self.held: Optional[Tuple[bytes, Tuple[str, int], float]] = None
+
+    def next_seq(self) -> int:
+        self.seq = (self.seq + 1) & 0xFF
+        return self.seq
+
+
+class Simulator:
+    """N 個虛擬控制器"""
+
+    def __init__(self, controllers: int = 1, target: Tuple[str, int] = ("127.0.0.1", 5555),
+                 rates: Optional[Dict[str, float]] = None, impairment: Optional[Impairment] = None,
+                 invalid: float = 0.0, first_id: int = 1, port_base: int = 0, seed: int = 0,
+                 packet_def: Optional[PacketDefinition] = None):
+        """
+        初始化模擬器（建立並綁定 socket）
+
+        Args:
+            controllers: 控制器數
+            target: 主動回報的送出地址（中心接收端）
+            rates: {指令碼: 每個控制器每秒筆數}
+            impairment: datagram 損傷比例
+            invalid: 設定 / 查詢指令回報 0F81 參數值無效的比例
+            first_id: 第一個控制器的 ADDR
+            port_base: 第一個控制器的本機端口（0 表示系統指定）
+            seed: 亂數種子
+
+        Raises:
+            ValueError: 指令碼沒有定義
+        """
+        self.logger = get_logger("tc.simulator")
+        self.packet_def = packet_def or PacketDefinition()
+        self.parser = PacketParser(mode="simulator", packet_def=self.packet_def)
+        self.target = target
+        self.impairment = impairment or Impairment()
+        self.invalid = invalid
+        self.rng = random.Random(seed)
+        self.rates = dict(DEFAULT_RATES if rates is None else rates)
+
+        # 主動回報內容（每個指令 PAYLOAD_VARIANTS 筆）
+        self.payloads: Dict[str, List[bytes]] = {}
+        for cmd_code in self.rates:
+            definition = self.packet_def.get_definition(cmd_code)
+            if definition is None:
+                raise ValueError(f"未定義的指令碼: {cmd_code}")
+            self.payloads[cmd_code] = [synthetic_payload(definition, self.rng)[0] for _ in range(PAYLOAD_VARIANTS)]
+
+        self.selector = selectors.DefaultSelector()
+        self.controllers: List[VirtualController] = []
+        for i in range(controllers):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind(("127.0.0.1", port_base + i if port_base else 0))
+            sock.setblocking(False)
+            controller = VirtualController(first_id + i, sock, self.logger)
+            self.controllers.append(controller)
+            self.selector.register(sock, selectors.EVENT_READ, controller)
+
+        # 排程：(到期時間, 序號, 控制器, 指令碼, 間隔)，開始執行時建立
+        self.schedule = []
+        # 有亂序暫存的控制器
+        self.holding: List[VirtualController] = []
+
+        self.counts = Counter()      # 收發與損傷筆數
+        self.sent = Counter()        # 主動回報：指令碼 -> 筆數
+        self.replies = Counter()     # 指令回報：指令碼 -> 筆數
+        self.rtts: List[int] = []    # ACK 往返時間（ns）
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+    # ============= 執行 =============
+
+    def start(self, duration: float = 0.0):
+        """在背景執行緒執行（duration 秒後結束，0 表示直到 stop）"""
+        self.thread = threading.Thread(target=self.run, args=(duration,), name="Simulator", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """停止並關閉 socket"""
+        self.running = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2.0)
+        self.close()
+
+    def close(self):
+        for controller in self.controllers:
+            try:
+                self.selector.unregister(controller.sock)
+            except (KeyError, ValueError):
+                pass
+            controller.sock.close()
+        self.selector.close()
+
+    def run(self, duration: float = 0.0):
+        """
+        收發迴圈
+
+        Args:
+            duration: 執行秒數（0 表示直到 stop）
+        """
+        self.running = True
+        self._build_schedule(time.perf_counter())
+        end = time.perf_counter() + duration if duration > 0 else None
+        select = self.selector.select
+        next_expire = time.perf_counter() + 1.0
+        while self.running:
+            now = time.perf_counter()
+            if end is not None and now >= end:
+                break
+            if now >= next_expire:
+                self.expire_pending()
+                next_expire = now + 1.0
+            timeout = 0.05
+            if self.schedule:
+                timeout = min(timeout, max(self.schedule[0][0] - now, 0.0))
+            for key, _ in select(timeout):
+                self._receive(key.data)
+            now = time.perf_counter()
+            self._emit_due(now)
+            self._release_held(now)
+        self.running = False
+
+    def drain(self, timeout: float):
+        """只接收不送出主動回報（收取已送出幀的 ACK、回覆指令）"""
+        end = time.perf_counter() + timeout
+        select = self.selector.select
+        while True:
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                break
+            for key, _ in select(min(remaining, 0.05)):
+                self._receive(key.data)
+            self._release_held(time.perf_counter())
+
+    def _build_schedule(self, now: float):
+        """每個控制器的每個指令一項，起始時間在一個間隔內隨機錯開"""
+        self.schedule = []
+        for controller in self.controllers:
+            for cmd_code, rate in self.rates.items():
+                if rate > 0:
+                    interval = 1.0 / rate
+                    self.schedule.append((now + self.rng.random() * interval, len(self.schedule),
+                                          controller, cmd_code, interval))
+        heapq.heapify(self.schedule)
+
+    def _emit_due(self, now: float):
+        """送出到期的主動回報（排程以間隔累加，不因延遲漂移）"""
+        schedule = self.schedule
+        for _ in range(EMIT_BATCH_SIZE):
+            if not schedule or schedule[0][0] > now:
+                return
+            due, order, controller, cmd_code, interval = schedule[0]
+            heapq.heapreplace(schedule, (due + interval, order, controller, cmd_code, interval))
+            payload = self.rng.choice(self.payloads[cmd_code])
+            self._send_frame(controller, payload, self.target)
+            self.sent[cmd_code] += 1
+
+    def _release_held(self, now: float):
+        """送出暫存過久的亂序 datagram"""
+        if not self.holding:
+            return
+        waiting = []
+        for controller in self.holding:
+            held = controller.held
+            if held is None:
+                continue
+            if now - held[2] >= REORDER_HOLD:
+                controller.held = None
+                self._sendto(controller, held[0], held[1])
+            else:
+                waiting.append(controller)
+        self.holding = waiting
+
+    # ============= 接收 =============
+
+    def _receive(self, controller: VirtualController):
+        """讀取 socket 直到沒有資料"""
+        while True:
+            try:
+                data, addr = controller.sock.recvfrom(4096)
+            except BlockingIOError:
+                return
+            except OSError:
+                # 目標端口未開啟（ICMP port unreachable）
+                self.counts["send_errors"] += 1
+                return
+            self.counts["received"] += 1
+            for frame in controller.buffer.feed(data):
+                if len(frame) > 2 and frame[1] == ACK:
+                    self._acknowledged(controller, frame)
+                else:
+                    self._answer(controller, frame, addr)
+
+    def _acknowledged(self, controller: VirtualController, frame: bytes):
+        """中心回覆 ACK"""
+        if len(frame) < 3:
+            return
+        sent_ns = controller.pending.pop(frame[2], None)
+        if sent_ns is None:
+            self.counts["stray_acks"] += 1
+            return
+        self.counts["acked"] += 1
+        self.rtts.append(time.perf_counter_ns() - sent_ns)
+
+    def _answer(self, controller: VirtualController, frame: bytes, addr: Tuple[str, int]):
+        """回覆中心的指令：ACK，再依定義回報"""
+        packet = self.parser.parse(frame)
+        if packet is None or packet.reply_type == "ACK":
+            self.counts["bad_frames"] += 1
+            return
+        self.counts["commands"] += 1
+        self._send(controller, encode(packet.seq, controller.tc_id, b""), addr)
+
+        definition = packet.definition
+        if definition is None:
+            self._reply_error(controller, packet.cmd_key, ERROR_NO_MESSAGE, 0, addr)
+        elif self.invalid and definition.reply_type in ("設定", "查詢") and self.rng.random() < self.invalid:
+            self._reply_error(controller, packet.cmd_key, ERROR_INVALID_PARAM, 1, addr)
+        elif definition.reply_type == "設定":
+            self._reply(controller, "0F80", {"指令ID": packet.cmd_key}, addr)
+        elif definition.reply_type == "查詢":
+            # 查詢回報的命令碼為查詢命令碼 | 0x80
+            reply_code = self.packet_def.get_cmd_code(packet.cmd_key | 0x80)
+            if self.packet_def.get_definition(reply_code) is None:
+                self._reply_error(controller, packet.cmd_key, ERROR_NO_DATA, 0, addr)
+            else:
+                self._reply(controller, reply_code, packet.extra_fields, addr)
+        else:
+            self._reply_error(controller, packet.cmd_key, ERROR_NO_MESSAGE, 0, addr)
+
+    def _reply(self, controller: VirtualController, cmd_code: str, fixed: Dict, addr: Tuple[str, int]):
+        definition = self.packet_def.get_definition(cmd_code)
+        payload, _ = synthetic_payload(definition, self.rng, fixed)
+        self._send_frame(controller, payload, addr)
+        self.replies[cmd_code] += 1
+
+    def _reply_error(self, controller: VirtualController, cmd_key: int, error_code: int, param: int,
+                     addr: Tuple[str, int]):
+        self._reply(controller, "0F81", {"指令ID": cmd_key, "錯誤碼": error_code, "參數編號": param}, addr)
+
+    # ============= 發送 =============
+
+    def _send_frame(self, controller: VirtualController, payload: bytes, addr: Tuple[str, int]):
+        """編碼並送出（登記等待 ACK）"""
+        seq = controller.next_seq()
+        if seq in controller.pending:
+            # SEQ 繞回時仍未收到 ACK
+            self.counts["unacked"] += 1
+        controller.pending[seq] = time.perf_counter_ns()
+        self._send(controller, encode(seq, controller.tc_id, payload), addr)
+
+    def _send(self, controller: VirtualController, data: bytes, addr: Tuple[str, int]):
+        """依損傷比例送出 datagram"""
+        impairment = self.impairment
+        rng = self.rng
+        self.counts["sent"] += 1
+        if impairment.loss and rng.random() < impairment.loss:
+            self.counts["dropped"] += 1
+            return
+        if impairment.corrupt and rng.random() < impairment.corrupt:
+            corrupted = bytearray(data)
+            corrupted[rng.randrange(len(corrupted))] ^= rng.randint(1, 0xFF)
+            data = bytes(corrupted)
+            self.counts["corrupted"] += 1
+        if impairment.reorder and controller.held is None and rng.random() < impairment.reorder:
+            controller.held = (data, addr, time.perf_counter())
+            self.holding.append(controller)
+            self.counts["reordered"] += 1
+            return
+        self._sendto(controller, data, addr)
+        if impairment.duplicate and rng.random() < impairment.duplicate:
+            self._sendto(controller, data, addr)
+            self.counts["duplicated"] += 1
+        held = controller.held
+        if held:
+            controller.held = None
+            self._sendto(controller, held[0], held[1])
+
+    def _sendto(self, controller: VirtualController, data: bytes, addr: Tuple[str, int]):
+        try:
+            controller.sock.sendto(data, addr)
+        except OSError:
+            self.counts["send_errors"] += 1
+
+    # ============= 統計 =============
+
+    def expire_pending(self, timeout: float = ACK_TIMEOUT) -> int:
+        """移除逾時未收到 ACK 的記錄，返回本次移除筆數"""
+        deadline = time.perf_counter_ns() - int(timeout * 1e9)
+        expired = 0
+        for controller in self.controllers:
+            stale = [seq for seq, sent_ns in controller.pending.items() if sent_ns < deadline]
+            for seq in stale:
+                controller.pending.pop(seq, None)
+            expired += len(stale)
+        self.counts["unacked"] += expired
+        return expired
+
+    def take_rtts(self) -> List[int]:
+        """取出目前累計的 ACK 往返時間（ns）並重新累計"""
+        rtts, self.rtts = self.rtts, []
+        return rtts
+
+    def summary(self, rtts: List[int]) -> str:
+        """統計摘要（一行收發、一行損傷與 ACK）"""
+        counts = self.counts
+        sent = ", ".join(f"{code} {count}" for code, count in sorted(self.sent.items()))
+        replies = ", ".join(f"{code} {count}" for code, count in sorted(self.replies.items())) or "-"
+        impaired = ", ".join(f"{name} {counts[name]}" for name in IMPAIRMENTS)
+        lines = [
+            f"主動回報 {sum(self.sent.values())} ({sent}) | 指令 {counts['commands']}, 回報 {replies}",
+            f"datagram 送出 {counts['sent']}, 收到 {counts['received']} | {impaired} | "
+            f"ACK {counts['acked']}, 未確認 {counts['unacked']} | 無效幀 {counts['bad_frames']}, "
+            f"發送錯誤 {counts['send_errors']}",
+        ]
+        if rtts:
+            rtts = sorted(rtts)
+            lines.append(f"ACK 往返 p50 {rtts[len(rtts) // 2] / 1000:.0f}us, "
+                         f"p99 {rtts[int(len(rtts) * 0.99)] / 1000:.0f}us, 最大 {rtts[-1] / 1000:.0f}us")
+        return "\n".join(lines)
+
+
+def _parse_addr(parser, value: str) -> Tuple[str, int]:
+    """解析 HOST:PORT"""
+    host, _, port = value.rpartition(":")
+    if not host or not port.isdigit():
+        parser.error(f"無效的地址: {value} (應為 HOST:PORT)")
+    return (host, int(port))
+
+
+def _parse_rates(parser, values: List[str]) -> Dict[str, float]:
+    """解析 指令碼=每秒筆數（未指定的使用預設，0 表示不送）"""
+    rates = dict(DEFAULT_RATES)
+    for value in values:
+        cmd_code, _, rate = value.partition("=")
+        try:
+            rates[cmd_code.upper()] = float(rate)
+        except ValueError:
+            parser.error(f"無效的速率: {value} (應為 指令碼=每秒筆數)")
+    return {code: rate for code, rate in rates.items() if rate > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機號誌控制器模擬器")
+    parser.add_argument("-n", "--controllers", type=int, default=1, help="控制器數")
+    parser.add_argument("--target", default="127.0.0.1:5555", metavar="HOST:PORT", help="主動回報送出地址")
+    parser.add_argument("--first-id", type=int, default=1, help="第一個控制器 ADDR")
+    parser.add_argument("--port-base", type=int, default=0, help="第一個控制器的本機端口（0 表示系統指定）")
+    parser.add_argument("--rate", action="append", default=[], metavar="CMD=R",
+                        help="每個控制器每秒主動回報筆數（可重複，例如 5F03=5；預設 "
+                             + " ".join(f"{code}={rate:g}" for code, rate in DEFAULT_RATES.items()) + "）")
+    parser.add_argument("--loss", type=float, default=0.0, help="遺失比例")
+    parser.add_argument("--duplicate", type=float, default=0.0, help="重複比例")
+    parser.add_argument("--reorder", type=float, default=0.0, help="亂序比例")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="損毀比例")
+    parser.add_argument("--invalid", type=float, default=0.0, help="設定 / 查詢指令回報 0F81 的比例")
+    parser.add_argument("--duration", type=float, default=0.0, help="執行秒數（0 表示直到 Ctrl+C）")
+    parser.add_argument("--interval", type=float, default=5.0, help="統計輸出間隔秒數")
+    parser.add_argument("--seed", type=int, default=0, help="亂數種子")
+    args = parser.parse_args()
+
+    impairment = Impairment(args.loss, args.duplicate, args.reorder, args.corrupt)
+    try:
+        simulator = Simulator(args.controllers, _parse_addr(parser, args.target), _parse_rates(parser, args.rate),
+                              impairment, args.invalid, args.first_id, args.port_base, args.seed)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+    first, last = simulator.controllers[0], simulator.controllers[-1]
+    ports = f" (端口 {args.port_base}~{args.port_base + args.controllers - 1})" if args.port_base else ""
+    print(f"{args.controllers} 個控制器 TC{first.tc_id:03d}~TC{last.tc_id:03d}{ports} -> {args.target}")
+    print(f"每個控制器每秒: " + ", ".join(f"{code} {rate:g}" for code, rate in simulator.rates.items())
+          + f" | {impairment} | 0F81 {args.invalid:.1%}")
+
+    simulator.start(args.duration)
+    start = time.perf_counter()
+    rtts = []
+    try:
+        while True:
+            simulator.thread.join(timeout=args.interval)
+            if not simulator.thread.is_alive():
+                break
+            elapsed = time.perf_counter() - start
+            interval_rtts = simulator.take_rtts()
+            rtts.extend(interval_rtts)
+            print(f"\n[{elapsed:.0f}s]\n{simulator.summary(interval_rtts)}")
+    except KeyboardInterrupt:
+        pass
+    simulator.stop()
+    # 結束時仍未收到 ACK 的也計入未確認
+    simulator.expire_pending(0)
+    rtts.extend(simulator.take_rtts())
+    print(f"\n總計 {time.perf_counter() - start:.1f}s\n{simulator.summary(rtts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+熱路徑微效能測試套件
+
+以 benchmark.frames 產生涵蓋全部定義的合成幀，分別量測：
+- codec      utils.encode / utils.decode
+- buffer     PacketBuffer.feed（每個 datagram 一幀，及多幀連續串流的每幀耗時）
+- parse      PacketParser.parse
+- build      PacketBuilder.build（設定 / 查詢指令）
+- process    PacketProcessor.process（INFO 記錄並同步格式化，不寫出）
+每項輸出全部指令平均（<項目>）與各指令（<項目>/<指令碼>）的單次耗時（微秒，取多次重複的最小值）。
+
+結果存為 JSON，比較兩次結果時列出變化超過門檻的項目（regression 時結束碼為 1）。
+各指令的單項耗時較短，共用 CPU 時易受干擾，預設只以平均項目判定 regression（--strict 含各指令）：
+
+    python -m benchmark.suite -o base.json
+    python -m benchmark.suite -o new.json --compare base.json
+    python -m benchmark.suite --compare base.json new.json     # 只比較兩個檔案
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import sys
+import timeit
+from typing import Callable, Dict, List
+
+from benchmark.frames import synthetic_frames
+from config.network import PacketBuffer
+from packet.center import PacketCenter
+from utils import decode, encode
+
+# 比較時視為變化的門檻（比例）
+DEFAULT_THRESHOLD = 0.10
+
+COMMAND_TYPES = {"設定", "查詢"}
+
+
+class _FormatHandler(logging.Handler):
+    """只格式化不寫出（量測 process 的格式化成本）"""
+
+    def emit(self, record):
+        self.format(record)
+
+
+def _time(func: Callable, duration: float, repeat: int) -> float:
+    """
+    返回單次呼叫耗時（微秒，取 repeat 次最小值）
+
+    先校準呼叫數，使每次重複至少 duration 秒（共用 CPU 時較穩定）
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= duration:
+            break
+        number = max(number * 2, int(number * duration / max(elapsed, 1e-9) * 1.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def _cycle(items: List):
+    """依序循環取出（每次呼叫返回下一個）"""
+    state = [0]
+    count = len(items)
+
+    def next_item():
+        index = state[0]
+        state[0] = index + 1 if index + 1 < count else 0
+        return items[index]
+    return next_item
+
+
+def _stage(results: Dict[str, float], name: str, groups: Dict[str, List], make_call: Callable,
+           duration: float, repeat: int):
+    """量測一個項目：各指令與全部平均"""
+    costs = []
+    for cmd_code, items in groups.items():
+        cost = _time(make_call(items), duration, repeat)
+        results[f"{name}/{cmd_code}"] = cost
+        costs.append(cost)
+    if costs:
+        results[name] = sum(costs) / len(costs)
+
+
+def run(duration: float = 0.02, repeat: int = 7, variants: int = 32, seed: int = 0) -> Dict[str, float]:
+    """執行全部量測，返回 {項目: 微秒}"""
+    logger = logging.getLogger("tc.receive")
+    logger.handlers[:] = [_FormatHandler()]
+    logger.handlers[0].setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.propagate = False
+    logger.setLevel(logging.WARNING)
+
+    center = PacketCenter(mode="receive")
+    frames = synthetic_frames(center.packet_def, variants=variants, seed=seed, controllers=8)
+
+    groups: Dict[str, List] = {}
+    for frame in frames:
+        groups.setdefault(frame.cmd_code, []).append(frame)
+    commands = {code: items for code, items in groups.items()
+                if center.packet_def.get_definition(code).reply_type in COMMAND_TYPES}
+
+    results: Dict[str, float] = {}
+
+    def encode_call(items):
+        take = _cycle([(f.seq, f.tc_id, f.payload) for f in items])
+        return lambda: encode(*take())
+    _stage(results, "encode", groups, encode_call, duration, repeat)
+
+    def decode_call(items):
+        take = _cycle([f.frame for f in items])
+        return lambda: decode(take())
+    _stage(results, "decode", groups, decode_call, duration, repeat)
+
+    buffer = PacketBuffer(logger)
+
+    def feed_call(items):
+        take = _cycle([f.frame for f in items])
+        return lambda: buffer.feed(take())
+    _stage(results, "buffer.feed", groups, feed_call, duration, repeat)
+
+    # 多幀連續串流（全部指令各一幀接在一起），換算為每幀耗時
+    stream = b"".join(items[0].frame for items in groups.values())
+    results["buffer.feed_stream"] = _time(lambda: buffer.feed(stream), duration, repeat) / len(groups)
+
+    def parse_call(items):
+        take = _cycle([f.frame for f in items])
+        parse = center.parse
+        return lambda: parse(take())
+    _stage(results, "parse", groups, parse_call, duration, repeat)
+
+    def build_call(items):
+        take = _cycle([(f.cmd_code, f.values, f.seq, f.tc_id) for f in items])
+        build = center.build
+        return lambda: build(*take())
+    _stage(results, "build", commands, build_call, duration, repeat)
+
+    # process：INFO 記錄並同步格式化（每個指令 variants 筆內容不同的封包循環，控制器輪流）
+    logger.setLevel(logging.INFO)
+
+    def process_call(items):
+        take = _cycle([center.parse(f.frame) for f in items])
+        process = center.processor.process
+        return lambda: process(take())
+    _stage(results, "process", groups, process_call, duration, repeat)
+    logger.setLevel(logging.WARNING)
+
+    return results
+
+
+def _metadata(args) -> Dict[str, str]:
+    """執行環境"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    return {
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "duration": args.duration,
+        "repeat": args.repeat,
+        "variants": args.variants,
+    }
+
+
+def load(path: str) -> Dict[str, float]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(base: Dict[str, float], new: Dict[str, float], threshold: float, verbose: bool = False,
+            strict: bool = False) -> int:
+    """
+    列出兩次結果的差異
+
+    Args:
+        verbose: 列出全部項目（預設只列平均項目與超過門檻的項目）
+        strict: 各指令項目變慢也計入
+
+    Returns:
+        變慢超過門檻的項目數
+    """
+    regressions = 0
+    print(f"{'項目':<24}{'基準(us)':>10}{'目前(us)':>10}{'變化':>9}")
+    for name in sorted(set(base) | set(new)):
+        if name not in base or name not in new:
+            side = "僅基準" if name in base else "新增"
+            print(f"{name:<24}{base.get(name, 0):>10.3f}{new.get(name, 0):>10.3f}{side:>9}")
+            continue
+        change = (new[name] - base[name]) / base[name] if base[name] else 0.0
+        mark = ""
+        if change > threshold:
+            mark = "  變慢"
+            if strict or "/" not in name:
+                regressions += 1
+        elif change < -threshold:
+            mark = "  變快"
+        if mark or verbose or "/" not in name:
+            print(f"{name:<24}{base[name]:>10.3f}{new[name]:>10.3f}{change:>+9.1%}{mark}")
+    print(f"\n門檻 {threshold:.0%}：{regressions} 項變慢")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="熱路徑微效能測試套件")
+    parser.add_argument("-o", "--output", help="結果 JSON 檔")
+    parser.add_argument("--compare", nargs="+", metavar="JSON", help="基準結果（再給一個檔案時只比較兩個檔案）")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="變化門檻（比例）")
+    parser.add_argument("--duration", type=float, default=0.02, help="每次重複至少的秒數（自動決定呼叫數）")
+    parser.add_argument("--repeat", type=int, default=7, help="重複次數（取最小值）")
+    parser.add_argument("--variants", type=int, default=32, help="每個指令的合成幀數")
+    parser.add_argument("-v", "--verbose", action="store_true", help="比較時列出全部項目")
+    parser.add_argument("--strict", action="store_true", help="各指令項目變慢也判定為 regression")
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare 最多兩個檔案")
+    if args.compare and len(args.compare) == 2:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold, args.verbose, args.strict)
+        sys.exit(1 if regressions else 0)
+
+    results = run(args.duration, args.repeat, args.variants)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": _metadata(args), "results": results}, f, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), results, args.threshold, args.verbose, args.strict)
+        sys.exit(1 if regressions else 0)
+
+    print(f"{'項目':<24}{'耗時(us)':>10}")
+    for name in sorted(results):
+        if args.verbose or "/" not in name:
+            print(f"{name:<24}{results[name]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+TCP 連線池效能測試（本機 loopback）
+
+模擬 N 個串列轉 TCP 閘道（127.0.x.y 同一端口，由單一程序 accept），
+每條連線建立後以一次 sendall 送出 M 筆 5F03 幀（測試任意切割的串流重組）。
+TCPTransport 於單一執行緒收幀並回覆 ACK，量測：
+
+1. 建立 N 條連線的時間
+2. 收幀吞吐量（fps）與 ACK 回到閘道的筆數
+3. 閘道中斷部分連線後，退避重連完成的時間
+
+執行: python -m benchmark.tcp_pool [-c 1000] [-m 50] [--drop 0.5]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import selectors
+import socket
+import time
+
+from config.network import TCPTransport
+from utils import encode
+
+PORT = 5799
+
+# 5F03 PAYLOAD（4 個方向）
+PAYLOAD = bytes([0x5F, 0x03, 0x01, 0x1E, 4, 1, 1, 0x11, 0x22, 0x33, 0x44, 0, 30])
+
+# ACK 幀長度（DLE ACK SEQ ADDR(2) LEN(2) CKS）
+ACK_SIZE = 8
+
+
+def _raise_fd_limit():
+    """提高檔案描述符上限（軟上限調至硬上限）"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def endpoint(index: int):
+    """第 index 個閘道地址"""
+    return (f"127.0.{index // 250}.{index % 250 + 1}", PORT)
+
+
+def gateway_server(frames_per_conn, drop_ratio, ready, drop, stop, results):
+    """模擬閘道：每條新連線送出 M 筆幀，統計收到的 ACK"""
+    _raise_fd_limit()
+    burst = b"".join(encode(i & 0xFF, 3, PAYLOAD) for i in range(frames_per_conn))
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("0.0.0.0", PORT))
+    listener.listen(4096)
+    listener.setblocking(False)
+
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ, None)
+    ready.set()
+
+    ack_bytes = accepted = dropped = 0
+    live = []
+    drop_done = False
+
+    while not stop.is_set():
+        for key, _ in sel.select(0.05):
+            if key.data is None:
+                while True:
+                    try:
+                        sock, _ = listener.accept()
+                    except BlockingIOError:
+                        break
+                    sock.setblocking(True)
+                    sock.sendall(burst)
+                    sock.setblocking(False)
+                    sel.register(sock, selectors.EVENT_READ, "conn")
+                    live.append(sock)
+                    accepted += 1
+                continue
+
+            sock = key.fileobj
+            try:
+                data = sock.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                sel.unregister(sock)
+                sock.close()
+                live.remove(sock)
+                continue
+            ack_bytes += len(data)
+
+        if drop.is_set() and not drop_done:
+            drop_done = True
+            for sock in live[:int(len(live) * drop_ratio)]:
+                sel.unregister(sock)
+                sock.close()
+                dropped += 1
+            live = live[dropped:]
+
+    results.put({"acks": ack_bytes // ACK_SIZE, "accepted": accepted, "dropped": dropped})
+    for sock in live:
+        sock.close()
+    listener.close()
+
+
+def pump(transport, until, deadline):
+    """驅動接收迴圈並回覆 ACK，直到 until() 成立或逾時；返回收到的幀數"""
+    frames = 0
+    while not until(frames) and time.perf_counter() < deadline:
+        data, addr = transport.receive_data(timeout=0.05)
+        if not data:
+            continue
+        for frame in transport.process_buffer(data):
+            frames += 1
+            transport.send_data(encode(frame[2], 3, b""), addr)
+    return frames
+
+
+def run(connections: int, frames_per_conn: int, drop_ratio: float):
+    _raise_fd_limit()
+    logging.basicConfig(level=logging.ERROR)
+    logger = logging.getLogger("bench.tcp")
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, drop, stop = ctx.Event(), ctx.Event(), ctx.Event()
+    results = ctx.Queue()
+    server = ctx.Process(
+        target=gateway_server,
+        args=(frames_per_conn, drop_ratio, ready, drop, stop, results),
+        daemon=True,
+    )
+    server.start()
+    ready.wait(10)
+
+    transport = TCPTransport(
+        server_ip=endpoint(0)[0], server_port=PORT, logger=logger,
+        endpoints=[endpoint(i) for i in range(connections)],
+        backoff_initial=0.1, backoff_max=2.0,
+    )
+
+    # 1. 建立連線並收取首批幀
+    start = time.perf_counter()
+    transport.open()
+    expected = connections * frames_per_conn
+    frames = pump(transport, lambda n: n >= expected, start + 60)
+    elapsed = time.perf_counter() - start
+    connected = transport.connected_count()
+
+    print(f"閘道 {connections}, 每連線 {frames_per_conn} 幀")
+    print(f"建立連線並收取 {frames}/{expected} 幀: {elapsed:.3f}s, "
+          f"{frames / elapsed:,.0f} fps, 已連線 {connected}")
+
+    # 2. 中斷部分連線，量測重連
+    reconnect_frames = 0
+    if drop_ratio > 0:
+        drop.set()
+        dropped = int(connections * drop_ratio)
+        start = time.perf_counter()
+        reconnect_frames = pump(
+            transport, lambda n: n >= dropped * frames_per_conn, start + 60
+        )
+        elapsed = time.perf_counter() - start
+        print(f"中斷 {dropped} 條連線後重連並收取 {reconnect_frames} 幀: {elapsed:.3f}s, "
+              f"重連次數 {transport.reconnects}, 已連線 {transport.connected_count()}")
+
+    # 讓最後的 ACK 送達
+    pump(transport, lambda n: False, time.perf_counter() + 0.5)
+    transport.close()
+    stop.set()
+    stats = results.get(timeout=10)
+    server.join(5)
+    print(f"閘道端: accept {stats['accepted']}, 中斷 {stats['dropped']}, "
+          f"收到 ACK {stats['acks']}/{frames + reconnect_frames}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TCP 連線池效能測試")
+    parser.add_argument("-c", "--connections", type=int, default=1000, help="閘道連線數")
+    parser.add_argument("-m", "--frames", type=int, default=50, help="每條連線送出的幀數")
+    parser.add_argument("--drop", type=float, default=0.5, help="中斷連線比例（0 表示不測試重連）")
+    args = parser.parse_args()
+    run(args.connections, args.frames, args.drop)
+
+
+if __name__ == "__main__":
+    main()
@@ -102,11 +102,11 @@ class StepProcessor:
             
             field_def = self.packet_def.get_field_definition(session.definition, field_name)
             
-            if field_def and field_def.get("count_from"):
+            if field_def and field_def.count_from:
                 
-                # lambda函式=field_def["count_from"]，類型統一為int
-                # 執行lambda函式，傳入session.fields
-                count = int(field_def["count_from"](session.fields)) 
+                # count_from 已於編譯時轉換為函數，類型統一為int
+                # 傳入session.fields 計算數量
+                count = int(field_def.count_from(session.fields)) 
                 
                 replacements["total"] = count
                 
@@ -158,7 +158,7 @@ class StepProcessor:
             # 處理列表字段
             if field_def.get("type") == "list":
                 
-                count = int(field_def["count_from"](session.fields)) # 類型統一為int
+                count = int(field_def.count_from(session.fields)) # 類型統一為int
 
                 success, list_values, error = self.validator.parse_list_values(
                     parts, i, count, field_def, field_name
@@ -41,4 +41,12 @@ class TCConfig:
         
     def get_transserver_port(self):
         """獲取轉譯端端口"""
-        return self.config.get("TransServer_port", 5555)
\ No newline at end of file
+        return self.config.get("TransServer_port", 5555)
+        
+    def get_multicast_group(self):
+        """獲取轉發 multicast 組地址"""
+        return self.config.get("Multicast_group", "239.255.13.1")
+        
+    def get_multicast_port(self):
+        """獲取轉發 multicast 組端口"""
+        return self.config.get("Multicast_port", 5600)
\ No newline at end of file
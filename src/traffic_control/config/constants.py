@@ -18,6 +18,8 @@ DEVICE_CONFIG = {
         "BackServer_port": 8889,
         "TransServer_ip": "0.0.0.0",
         "TransServer_port": 5555,
+        "Multicast_group": "239.255.13.1",
+        "Multicast_port": 5600,
     }
 }
 
@@ -33,11 +35,8 @@ CONTROL_STRATEGY_CONFIG = [
     (0x80, "特別路線控制"),
 ]
 
-def CONTROL_STRATEGY_MAP(value):
-    """
-    控制策略映射函数（用于 mapping 字段）
-    直接返回格式化字符串，如 "定時控制、動態控制 (0x03)"
-    """
+def _format_control_strategy(value):
+    """格式化控制策略，如 "定時控制、動態控制 (0x03)" """
     result = []
     for bit, description in CONTROL_STRATEGY_CONFIG:
         if value & bit:
@@ -46,6 +45,18 @@ def CONTROL_STRATEGY_MAP(value):
     strategy_desc = "、".join(result) if result else "無設定策略"
     return f"{strategy_desc} (0x{value:02X})"
 
+# 0x00~0xFF 預先格式化
+_CONTROL_STRATEGY_TEXT = [_format_control_strategy(value) for value in range(256)]
+
+def CONTROL_STRATEGY_MAP(value):
+    """
+    控制策略映射函数（用于 mapping 字段）
+    直接返回格式化字符串，如 "定時控制、動態控制 (0x03)"
+    """
+    if 0 <= value <= 0xFF:
+        return _CONTROL_STRATEGY_TEXT[value]
+    return _format_control_strategy(value)
+
 #============================== 硬件狀態位映射（0F04） ==============================
 HARDWARE_STATUS_MAP = [
     (0, "CPU模組錯誤"),
@@ -81,11 +92,8 @@ ERROR_CODE_CONFIG = [
 
 PARAM_LABELS = {0x04: "位置", 0x08: "錯誤值", 0x40: "位置"}
 
-def ERROR_CODE_MAP(value):
-    """
-    錯誤碼映射函数（用于 mapping 字段）
-    返回格式化字符串，使用占位符 {xx} 表示需要參數的位置
-    """
+def _format_error_code(value):
+    """格式化錯誤碼，使用占位符 {xx} 表示需要參數的位置"""
     errors = [
         f"{desc}({PARAM_LABELS[bit]}:{{xx}})" if bit in PARAM_LABELS else desc
         for bit, desc in ERROR_CODE_CONFIG
@@ -93,6 +101,18 @@ def ERROR_CODE_MAP(value):
     ]
     return f"{'、'.join(errors)} (0x{value:02X})" if errors else f"未知錯誤 (0x{value:02X})"
 
+# 0x00~0xFF 預先格式化
+_ERROR_CODE_TEXT = [_format_error_code(value) for value in range(256)]
+
+def ERROR_CODE_MAP(value):
+    """
+    錯誤碼映射函数（用于 mapping 字段）
+    返回格式化字符串，使用占位符 {xx} 表示需要參數的位置
+    """
+    if 0 <= value <= 0xFF:
+        return _ERROR_CODE_TEXT[value]
+    return _format_error_code(value)
+
 #============================== 現場操作碼映射(5F08) ==============================
 FIELD_OPERATION_MAP = {
     0x01: "現場手動",
@@ -110,6 +130,14 @@ BEGIN_END_STATUS_MAP = {
     0x03: "路口手動超時回報"
 }
 
+#============================== 星期映射(5FC6) ==============================
+WEEKDAY_MAP = {
+    1: "星期一", 2: "星期二", 3: "星期三", 4: "星期四",
+    5: "星期五", 6: "星期六", 7: "星期日",
+    11: "隔週休星期一", 12: "隔週休星期二", 13: "隔週休星期三",
+    14: "隔週休星期四", 15: "隔週休星期五", 16: "隔週休星期六", 17: "隔週休星期日"
+}
+
 #============================== 時制計畫編號映射 ==============================
 def PLAN_ID_MAP(value):
     """
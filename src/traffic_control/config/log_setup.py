@@ -1,57 +1,427 @@
 # logging/setup.py
 """
 日誌配置
+
+預設使用非同步管線：logger -> DroppingQueueHandler（有界佇列）-> BatchQueueListener（背景執行緒）
+-> BatchFileHandler / BatchStreamHandler。
+- 呼叫端只把記錄放入佇列，時間格式化與檔案/終端寫入都在背景執行緒
+- 寫入依 flush_interval 批次進行（WARNING 以上立即寫出）
+- 佇列滿時丟棄並計數，恢復後補記一筆丟棄摘要
+
+json / csv 封包日誌（setup_packet_log）使用相同管線，但只寫入記錄本身，與主日誌分開。
 """
 
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-_logging_configured = {} 
+from typing import Dict, Tuple
+
+_logging_configured = {}
+
+# 非同步日誌預設：佇列上限（筆）與批次寫入間隔（秒）
+LOG_QUEUE_SIZE = 10000
+LOG_FLUSH_INTERVAL = 0.5
+
+# 隔離檔預設：單檔上限（bytes）、保留檔數、佇列上限（筆）
+QUARANTINE_MAX_BYTES = 5 * 1024 * 1024
+QUARANTINE_BACKUPS = 3
+QUARANTINE_QUEUE_SIZE = 1000
+
+# 等待記錄逾時（QueueListener 的結束標記為 None，不可共用）
+_IDLE = object()
+
+# mode -> (DroppingQueueHandler, BatchQueueListener)
+_pipelines: Dict[str, Tuple["DroppingQueueHandler", "BatchQueueListener"]] = {}
+
+
+class _BatchWriteMixin:
+    """emit 只累積格式化後的文字，flush 時一次寫入"""
+
+    # 累積超過此筆數時立即寫入
+    max_pending = 512
+
+    def emit(self, record):
+        try:
+            self.pending.append(self.format(record) + self.terminator)
+            if len(self.pending) >= self.max_pending:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self.pending and self.stream:
+                self.stream.write("".join(self.pending))
+                self.pending.clear()
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+        finally:
+            self.release()
+
+
+class BatchFileHandler(_BatchWriteMixin, logging.FileHandler):
+    """批次寫入的檔案處理器"""
+
+    def __init__(self, filename, encoding=None):
+        self.pending = []
+        super().__init__(filename, encoding=encoding)
+
+
+class BatchStreamHandler(_BatchWriteMixin, logging.StreamHandler):
+    """批次寫入的終端處理器"""
+
+    def __init__(self, stream=None):
+        self.pending = []
+        super().__init__(stream)
+
+
+class KeyedFileHandler(logging.Handler):
+    """
+    依記錄的 log_key 分檔批次寫入（{directory}/{log_key}{suffix}）
+
+    檔案為新建（或為空）時先寫入 record.log_header 一行（str() 後的文字，例如 CSV 標題列）。
+    batch=False 時每筆記錄立即寫入。
+    """
+
+    max_pending = 512
+
+    def __init__(self, directory: str, suffix: str, encoding: str = 'utf-8', batch: bool = True):
+        super().__init__()
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+        self.suffix = suffix
+        self.encoding = encoding
+        self.batch = batch
+        # log_key -> 檔案 / 待寫入的行
+        self.streams = {}
+        self.pending = {}
+        self.count = 0
+
+    def emit(self, record):
+        try:
+            key = record.log_key
+            lines = self.pending.get(key)
+            if lines is None:
+                lines = self.pending[key] = []
+                stream = open(os.path.join(self.directory, f"{key}{self.suffix}"), 'a', encoding=self.encoding)
+                self.streams[key] = stream
+                header = getattr(record, "log_header", None)
+                if header is not None and stream.tell() == 0:
+                    lines.append(f"{header}\n")
+            lines.append(self.format(record) + "\n")
+            self.count += 1
+            if not self.batch or self.count >= self.max_pending:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            for key, lines in self.pending.items():
+                stream = self.streams[key]
+                if lines:
+                    stream.write("".join(lines))
+                    lines.clear()
+                stream.flush()
+            self.count = 0
+        finally:
+            self.release()
+
+    def close(self):
+        self.acquire()
+        try:
+            self.flush()
+            for stream in self.streams.values():
+                stream.close()
+            self.streams.clear()
+            self.pending.clear()
+        finally:
+            self.release()
+        super().close()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """有界佇列處理器：佇列滿時丟棄並計數，不阻塞呼叫端"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self.reported = 0
+
+    def prepare(self, record):
+        """
+        只合併 msg 與 args（參數可能在之後被修改），時間格式化留給背景執行緒
+
+        同程序內傳遞，保留 exc_info 由 Formatter 處理
+        """
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self.dropped != self.reported:
+                self._report_dropped(record)
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _report_dropped(self, record):
+        """佇列恢復後補記丟棄筆數"""
+        dropped = self.dropped
+        summary = logging.LogRecord(
+            record.name, logging.WARNING, __file__, 0,
+            f"日誌佇列已滿，丟棄 {dropped - self.reported} 筆（累計 {dropped}）", None, None
+        )
+        self.queue.put_nowait(summary)
+        self.reported = dropped
+
+
+class BatchQueueListener(QueueListener):
+    """批次寫入的佇列監聽器：依間隔 flush 處理器"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers, flush_interval: float = LOG_FLUSH_INTERVAL):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def _monitor(self):
+        log_queue = self.queue
+        handle = self.handle
+        interval = self.flush_interval
+        last_flush = time.monotonic()
+        dirty = False
+
+        while True:
+            try:
+                record = log_queue.get(timeout=interval if dirty else None)
+            except queue.Empty:
+                record = _IDLE
+
+            if record is self._sentinel:
+                self._flush()
+                log_queue.task_done()
+                break
+
+            if record is not _IDLE:
+                handle(record)
+                log_queue.task_done()
+                dirty = True
+                urgent = record.levelno >= logging.WARNING
+            else:
+                urgent = False
 
-def setup_logging(log_dir: str = "logs", log_file: str = "traffic_control.log", mode: str = "default"):
+            now = time.monotonic()
+            if dirty and (urgent or now - last_flush >= interval):
+                self._flush()
+                last_flush = now
+                dirty = False
+
+    def _flush(self):
+        for handler in self.handlers:
+            handler.flush()
+
+    def enqueue_sentinel(self):
+        """
+        放入結束標記
+
+        有界佇列可能已滿，先等待背景執行緒騰出空間；逾時則丟棄最舊的記錄讓出位置。
+        由 atexit 的 stop_logging 呼叫，不可拋出 queue.Full（否則 stop() 不會 join，剩餘記錄也不會寫出）。
+        """
+        try:
+            self.queue.put(self._sentinel, timeout=5)
+            return
+        except queue.Full:
+            pass
+        while True:
+            try:
+                self.queue.put_nowait(self._sentinel)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.task_done()
+                except queue.Empty:
+                    pass
+
+
+def setup_logging(log_dir: str = "logs", log_file: str = "traffic_control.log", mode: str = "default",
+                  queue_size: int = LOG_QUEUE_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL,
+                  console: bool = True):
     """設置日志系統
-    
+
     Args:
         log_dir: 日誌目錄
         log_file: 日誌文件名
         mode: 模式名稱（用於區分不同的logger實例）
+        queue_size: 非同步日誌佇列上限（0 表示同步寫入）
+        flush_interval: 批次寫入間隔（秒）
+        console: 是否輸出到終端
     """
     # 創建日誌目錄
     Path(log_dir).mkdir(exist_ok=True)
-    
+
     # 為每個模式創建獨立的logger
     logger_name = f"tc.{mode}"
     logger = logging.getLogger(logger_name)
-    
+
     # 如果已經配置過，直接返回
     if logger_name in _logging_configured and logger.handlers:
         return logger
-    
+
     # 配置日誌格式
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
     date_format = '%Y-%m-%d %H:%M:%S'
-    
+
     # 文件處理器
     log_path = os.path.join(log_dir, log_file)
-    file_handler = logging.FileHandler(log_path, encoding='utf-8')
+    if queue_size > 0:
+        file_handler = BatchFileHandler(log_path, encoding='utf-8')
+    else:
+        file_handler = logging.FileHandler(log_path, encoding='utf-8')
     file_handler.setFormatter(logging.Formatter(log_format, date_format))
     file_handler.setLevel(logging.INFO)
-    
+    handlers = [file_handler]
+
     # 控制台處理器
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(log_format, date_format))
-    console_handler.setLevel(logging.INFO)
-    
+    if console:
+        console_handler = BatchStreamHandler() if queue_size > 0 else logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(log_format, date_format))
+        console_handler.setLevel(logging.INFO)
+        handlers.append(console_handler)
+
     # 配置logger
     logger.setLevel(logging.INFO)
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if queue_size > 0:
+        # 非同步：呼叫端只入列，寫入在背景執行緒
+        queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        listener = BatchQueueListener(queue_handler.queue, *handlers, flush_interval=flush_interval)
+        listener.start()
+        logger.addHandler(queue_handler)
+        _pipelines[mode] = (queue_handler, listener)
+        atexit.register(stop_logging, mode)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     logger.propagate = False  # 防止日誌向上傳播
-    
+
+    _logging_configured[logger_name] = True
+
+    return logger
+
+def setup_packet_log(output: str, log_dir: str = "logs", mode: str = "default",
+                     queue_size: int = LOG_QUEUE_SIZE, flush_interval: float = LOG_FLUSH_INTERVAL):
+    """
+    設置機器可讀的封包日誌（logger "tc.{mode}.packets"）
+
+    只寫入封包記錄本身（formatter 為 %(message)s，不加時間與等級，不輸出到終端），
+    其他訊息仍寫入 setup_logging 的主日誌：
+    - json  {log_dir}/{mode}.packets.jsonl，每行一筆 JSON
+    - csv   {log_dir}/{mode}.packets/{指令碼}.csv，各指令欄位不同故分檔，新檔先寫標題列
+            （記錄需帶 log_key 與 log_header，見 PacketProcessor）
+
+    Args:
+        output: 輸出格式（json / csv）
+        log_dir: 日誌目錄
+        mode: 模式名稱
+        queue_size: 非同步日誌佇列上限（0 表示同步寫入）
+        flush_interval: 批次寫入間隔（秒）
+    """
+    name = f"{mode}.packets"
+    logger_name = f"tc.{name}"
+    logger = logging.getLogger(logger_name)
+    if logger_name in _logging_configured:
+        return logger
+
+    Path(log_dir).mkdir(exist_ok=True)
+    if output == "json":
+        log_path = os.path.join(log_dir, f"{name}.jsonl")
+        if queue_size > 0:
+            handler = BatchFileHandler(log_path, encoding='utf-8')
+        else:
+            handler = logging.FileHandler(log_path, encoding='utf-8')
+    elif output == "csv":
+        handler = KeyedFileHandler(os.path.join(log_dir, name), ".csv", batch=queue_size > 0)
+    else:
+        raise ValueError(f"封包日誌不支援格式: {output}（可用: json, csv）")
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.setLevel(logging.INFO)
+
+    logger.setLevel(logging.INFO)
+    if queue_size > 0:
+        queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+        listener = BatchQueueListener(queue_handler.queue, handler, flush_interval=flush_interval)
+        listener.start()
+        logger.addHandler(queue_handler)
+        _pipelines[name] = (queue_handler, listener)
+        atexit.register(stop_logging, name)
+    else:
+        logger.addHandler(handler)
+    logger.propagate = False
+
     _logging_configured[logger_name] = True
-    
+
     return logger
 
+def setup_quarantine(path: str, max_bytes: int = QUARANTINE_MAX_BYTES, backups: int = QUARANTINE_BACKUPS,
+                     queue_size: int = QUARANTINE_QUEUE_SIZE):
+    """
+    設置錯誤幀隔離檔（logger "tc.quarantine"）
+
+    與封包日誌相同的非同步管線：呼叫端只入列，格式化與寫入在背景執行緒，佇列滿時丟棄並計數；
+    檔案超過 max_bytes 時輪替，保留 backups 個舊檔。logging_stats("quarantine") 取得佇列狀態。
+    """
+    logger = logging.getLogger("tc.quarantine")
+    if "quarantine" in _pipelines:
+        return logger
+
+    directory = os.path.dirname(path)
+    if directory:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    file_handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s', '%Y-%m-%d %H:%M:%S'))
+
+    queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+    listener = BatchQueueListener(queue_handler.queue, file_handler)
+    listener.start()
+    logger.setLevel(logging.INFO)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+    _pipelines["quarantine"] = (queue_handler, listener)
+    atexit.register(stop_logging, "quarantine")
+    return logger
+
+def stop_logging(mode: str = "default"):
+    """停止非同步日誌（寫出佇列中剩餘的記錄）"""
+    pipeline = _pipelines.pop(mode, None)
+    if pipeline is None:
+        return
+    queue_handler, listener = pipeline
+    logging.getLogger(f"tc.{mode}").removeHandler(queue_handler)
+    if listener._thread is not None and listener._thread is not threading.current_thread():
+        listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+def logging_stats(mode: str = "default"):
+    """非同步日誌狀態：(佇列中筆數, 累計丟棄筆數)；同步模式返回 None"""
+    pipeline = _pipelines.get(mode)
+    if pipeline is None:
+        return None
+    queue_handler, _ = pipeline
+    return queue_handler.queue.qsize(), queue_handler.dropped
+
 def get_logger(name: str = "tc"):
     """獲取日誌器"""
-    return logging.getLogger(name)
\ No newline at end of file
+    return logging.getLogger(name)
@@ -1,34 +1,51 @@
 # config/network.py
 """
-UDP傳輸層
+網路傳輸層
+
+UDPTransport: 與控制器直接收發
+MulticastPublisher / MulticastUDPTransport: ingest 程序將已驗證的幀轉發到 multicast 組，
+本機任意數量的程序（日誌、狀態記錄、操作台）加入該組接收
+TCPTransport: 經串列轉 TCP 閘道連接的控制器，每個閘道一條持久連線，單一 selector 多工
 """
 
+import errno
+import heapq
+import random
+import selectors
 import socket
 import binascii
 import struct
-from typing import Protocol, Tuple, Optional
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Protocol, Tuple, Optional
 #from abc import ABC, abstractmethod
 
 
 # 避免 mode class 碰到Transport實例
-# 放便後續新增TCPTransport
+# UDPTransport / MulticastUDPTransport / TCPTransport 皆實作此接口
 class NetworkTransport(Protocol):
     """網絡傳輸協議接口"""
     def open(self) -> bool: ...
     def close(self) -> None: ...
     def send_data(self, data: bytes, addr: Optional[Tuple[str, int]] = None) -> bool: ...
     def receive_data(self) -> Tuple[bytes, Optional[Tuple[str, int]]]: ...
-    def process_buffer(self, data: bytes) -> list: ...
+    def process_buffer(self, data: bytes, errors=None) -> list: ...
+    
+    # 是否回覆控制器 ACK（multicast 訂閱端為 False）
+    sends_ack: bool
 
 class UDPTransport:
     """UDP傳輸層"""
     
+    sends_ack = True
+    
     def __init__(self, local_ip, local_port, 
                  server_ip, server_port, logger):
         self.local_addr = (local_ip, local_port)
         self.server_addr = (server_ip, server_port)
         self.socket = None
-        self.buffer = PacketBuffer(logger)
+        self.buffer = PacketBuffer(logger, datagram=True)
         self.logger = logger
     
     def open(self):
@@ -85,35 +102,46 @@ class UDPTransport:
             self.logger.error(f"發送數據失敗: {e}")
             return False
     
-    def process_buffer(self, data):
-        """處理緩衝區數據，返回完整封包列表"""
-        return self.buffer.feed(data)
+    def process_buffer(self, data, errors=None):
+        """處理緩衝區數據，返回完整封包列表（errors: FrameErrors，記錄 LEN 字段損毀的幀）"""
+        return self.buffer.feed(data, errors)
 
-# 待實現
 class MulticastUDPTransport:
-    """Multicast UDP傳輸層"""
+    """
+    Multicast UDP傳輸層（訂閱端）
+
+    加入 ingest 程序（MulticastPublisher）轉發的 multicast 組，接收已驗證的原始幀。
+    同一組可有任意數量的本機訂閱者，由核心複製分送，發送端只送一次。
+    ACK 已由 ingest 回覆控制器，訂閱端不回覆 ACK；指令以單播送往控制器。
+    """
+    
+    # 訂閱端不回覆 ACK
+    sends_ack = False
     
     def __init__(self, local_ip, local_port, 
                  server_ip, server_port, logger,
-                 multicast_group=None, multicast_ttl=1):
+                 multicast_group=None, multicast_ttl=1, receive_buffer=4 * 1024 * 1024):
         """
         初始化UDP傳輸層
         
         Args:
-            local_ip: 本地IP地址
-            local_port: 本地端口
-            server_ip: 服務器IP地址（或multicast地址）
-            server_port: 服務器端口
+            local_ip: 加入 multicast 組使用的介面IP（0.0.0.0 表示預設介面）
+            local_port: multicast 組端口
+            server_ip: 控制器IP（指令單播目標）
+            server_port: 控制器端口
             logger: 日誌記錄器
-            multicast_group: Multicast組地址（例如 "224.1.1.1"），None表示不使用multicast
+            multicast_group: Multicast組地址（例如 "239.255.13.1"），None表示不使用multicast
             multicast_ttl: Multicast TTL值（默認1，僅本地網絡）
+            receive_buffer: 接收緩衝區大小（bytes），突發流量時減少丟包
         """
         self.local_addr = (local_ip, local_port)
         self.server_addr = (server_ip, server_port)
         self.multicast_group = multicast_group
         self.multicast_ttl = multicast_ttl
+        self.receive_buffer = receive_buffer
         self.socket = None
-        self.buffer = PacketBuffer(logger)
+        self.send_socket = None
+        self.buffer = PacketBuffer(logger, datagram=True)
         self.logger = logger
     
     def open(self):
@@ -124,32 +152,28 @@ class MulticastUDPTransport:
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             
-            # 設置 SO_REUSEPORT（允許多個進程綁定同一端口）
+            # 允許多個訂閱者綁定同一端口
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             try:
                 self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
             except (AttributeError, OSError):
                 # Windows 或舊版 Linux 不支持
                 pass
             
-            # 如果是 multicast 接收者
+            try:
+                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.receive_buffer)
+            except OSError:
+                pass
+            
             if self.multicast_group:
-                # 設置 socket 選項
-                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                
-                # 綁定到端口（對於multicast，可以綁定到 0.0.0.0 或特定接口）
-                self.socket.bind(('', self.local_addr[1]))
+                # 綁定組地址，只接收該組的數據（Windows 不允許，改綁定所有介面）
+                try:
+                    self.socket.bind((self.multicast_group, self.local_addr[1]))
+                except OSError:
+                    self.socket.bind(('', self.local_addr[1]))
                 
                 # 加入 multicast 組
-                multicast_addr = socket.inet_aton(self.multicast_group)
-                interface = socket.inet_aton(self.local_addr[0] if self.local_addr[0] != '0.0.0.0' else '0.0.0.0')
-                membership = struct.pack('4s4s', multicast_addr, interface)
-                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
-                
-                # 設置 multicast TTL（用於發送）
-                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.multicast_ttl)
-                
-                # 設置 multicast loopback（是否接收自己發送的數據）
-                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, self._membership())
                 
                 self.logger.info(f"開啟UDP Multicast連接: 組={self.multicast_group}, 端口={self.local_addr[1]}")
             else:
@@ -162,6 +186,9 @@ class MulticastUDPTransport:
             return True
         except Exception as e:
             self.logger.error(f"開啟UDP連接失敗: {e}")
+            if self.socket:
+                self.socket.close()
+                self.socket = None
             return False
     
     def close(self):
@@ -170,16 +197,17 @@ class MulticastUDPTransport:
             # 如果是 multicast，離開組
             if self.multicast_group:
                 try:
-                    multicast_addr = socket.inet_aton(self.multicast_group)
-                    interface = socket.inet_aton(self.local_addr[0] if self.local_addr[0] != '0.0.0.0' else '0.0.0.0')
-                    membership = struct.pack('4s4s', multicast_addr, interface)
-                    self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_DROP_MEMBERSHIP, membership)
+                    self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_DROP_MEMBERSHIP, self._membership())
                 except Exception as e:
                     self.logger.warning(f"離開multicast組失敗: {e}")
             
             self.socket.close()
             self.socket = None
             self.logger.info("UDP連接已關閉")
+        
+        if self.send_socket:
+            self.send_socket.close()
+            self.send_socket = None
     
     def receive_data(self):
         """接收數據"""
@@ -196,39 +224,445 @@ class MulticastUDPTransport:
             return b"", None
     
     def send_data(self, data, addr: Optional[Tuple[str, int]] = None):
-        """發送數據"""
+        """
+        發送數據（單播，預設送往控制器）
+
+        使用獨立的未綁定 socket，不從 multicast 組地址發送
+        """
         if not self.socket:
             self.logger.error("尚未開啟UDP連接")
             return False
         
-        # 如果指定了地址，使用指定地址；否則使用 server_addr
         target_addr = addr if addr is not None else self.server_addr
         
-        # 如果是 multicast，確保使用 multicast 地址
-        if self.multicast_group and target_addr[0] != self.multicast_group:
-            target_addr = (self.multicast_group, target_addr[1])
-        
         try:
-            self.socket.sendto(data, target_addr)
+            if self.send_socket is None:
+                self.send_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.send_socket.sendto(data, target_addr)
             return True
         except Exception as e:
             self.logger.error(f"發送數據失敗: {e}")
             return False
     
-    def process_buffer(self, data):
-        """處理緩衝區數據，返回完整封包列表"""
-        return self.buffer.feed(data)
+    def process_buffer(self, data, errors=None):
+        """處理緩衝區數據，返回完整封包列表（errors: FrameErrors，記錄 LEN 字段損毀的幀）"""
+        return self.buffer.feed(data, errors)
+    
+    def _membership(self) -> bytes:
+        """IP_ADD_MEMBERSHIP / IP_DROP_MEMBERSHIP 參數"""
+        return struct.pack(
+            '4s4s',
+            socket.inet_aton(self.multicast_group),
+            socket.inet_aton(self.local_addr[0] or '0.0.0.0'),
+        )
+
+
+class MulticastPublisher:
+    """
+    Multicast 轉發端（ingest 程序使用）
+
+    將已驗證的原始幀（不重新編碼）送往 multicast 組，每幀一次 sendto
+    """
+    
+    def __init__(self, multicast_group, port, logger, interface="0.0.0.0", multicast_ttl=1):
+        """
+        初始化轉發端
+        
+        Args:
+            multicast_group: Multicast組地址
+            port: Multicast組端口
+            logger: 日誌記錄器
+            interface: 發送介面IP（0.0.0.0 表示預設介面，本機測試使用 127.0.0.1）
+            multicast_ttl: Multicast TTL值（默認1，僅本地網絡）
+        """
+        self.group_addr = (multicast_group, port)
+        self.interface = interface
+        self.multicast_ttl = multicast_ttl
+        self.socket = None
+        self.logger = logger
+        
+        # 統計
+        self.published = 0
+        self.failed = 0
+    
+    def open(self):
+        """開啟轉發 socket"""
+        if self.socket:
+            self.close()
+        
+        try:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.multicast_ttl)
+            
+            # 本機訂閱者需要 loopback
+            self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            if self.interface != "0.0.0.0":
+                self.socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                       socket.inet_aton(self.interface))
+            
+            self.logger.info(f"開啟Multicast轉發: 組={self.group_addr[0]}, 端口={self.group_addr[1]}")
+            return True
+        except Exception as e:
+            self.logger.error(f"開啟Multicast轉發失敗: {e}")
+            self.socket = None
+            return False
+    
+    def close(self):
+        """關閉轉發 socket"""
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+            self.logger.info(f"Multicast轉發已關閉: 已轉發 {self.published} 筆, 失敗 {self.failed} 筆")
+    
+    def publish(self, frame: bytes) -> bool:
+        """轉發原始幀"""
+        if not self.socket:
+            return False
+        try:
+            self.socket.sendto(frame, self.group_addr)
+            self.published += 1
+            return True
+        except OSError:
+            # 不在接收熱路徑記錄日誌，只計數
+            self.failed += 1
+            return False
+
+
+class TCPConnection:
+    """單一閘道的持久連線（每條連線獨立的 PacketBuffer 重組串流）"""
+    
+    def __init__(self, addr: Tuple[str, int], logger):
+        self.addr = addr
+        self.sock: Optional[socket.socket] = None
+        self.state = "idle"            # idle / connecting / connected
+        self.buffer = PacketBuffer(logger)
+        self.out = bytearray()         # 尚未送出的數據
+        self.failures = 0              # 連續連線失敗次數（退避用）
+        self.generation = 0            # 每次連線遞增，用於忽略過期的計時項目
+
+
+class TCPTransport:
+    """
+    TCP傳輸層（串列轉 TCP 閘道）
+
+    - 對每個閘道維持一條持久連線，斷線後以指數退避（含隨機抖動）重連
+    - 所有連線註冊在同一個 selector，由接收執行緒呼叫 receive_data 驅動
+    - receive_data 返回單一連線的數據塊，接著的 process_buffer 使用該連線的緩衝區
+      （與接收迴圈 receive_data -> process_buffer 的呼叫順序一致）
+    """
+    
+    sends_ack = True
+    
+    def __init__(self, server_ip, server_port, logger,
+                 endpoints: Optional[Iterable[Tuple[str, int]]] = None,
+                 connect_timeout: float = 5.0,
+                 backoff_initial: float = 1.0,
+                 backoff_max: float = 60.0):
+        """
+        初始化TCP傳輸層
+        
+        Args:
+            server_ip: 預設閘道IP（send_data 未指定地址時使用）
+            server_port: 預設閘道端口
+            logger: 日誌記錄器
+            endpoints: 所有閘道地址（None 表示只有預設閘道）
+            connect_timeout: 連線逾時（秒）
+            backoff_initial: 首次重連等待（秒）
+            backoff_max: 重連等待上限（秒）
+        """
+        self.server_addr = (server_ip, server_port)
+        self.logger = logger
+        self.connect_timeout = connect_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        
+        addrs = list(endpoints) if endpoints else [self.server_addr]
+        self.connections: Dict[Tuple[str, int], TCPConnection] = {
+            tuple(addr): TCPConnection(tuple(addr), logger) for addr in addrs
+        }
+        
+        self.selector: Optional[selectors.BaseSelector] = None
+        self.lock = threading.RLock()
+        
+        # (時間, 序號, 連線, generation, 類型) 重連與連線逾時計時
+        self.timers: List[Tuple[float, int, TCPConnection, int, str]] = []
+        self.timer_seq = 0
+        
+        # 已讀取但尚未交給接收迴圈的數據
+        self.pending: deque = deque()
+        self.current: Optional[TCPConnection] = None
+        
+        # 統計
+        self.reconnects = 0
+    
+    def open(self):
+        """建立所有連線（非阻塞，連線結果於 receive_data 中處理）"""
+        if self.selector:
+            self.close()
+        
+        self.selector = selectors.DefaultSelector()
+        with self.lock:
+            for conn in self.connections.values():
+                self._connect(conn)
+        self.logger.info(f"開啟TCP傳輸: {len(self.connections)} 個閘道")
+        return True
+    
+    def close(self):
+        """關閉所有連線"""
+        if not self.selector:
+            return
+        with self.lock:
+            for conn in self.connections.values():
+                self._drop(conn)
+                conn.failures = 0
+            self.timers.clear()
+            self.pending.clear()
+            self.selector.close()
+            self.selector = None
+        self.logger.info("TCP連接已關閉")
+    
+    def connected_count(self) -> int:
+        """目前已連線的閘道數"""
+        return sum(1 for conn in self.connections.values() if conn.state == "connected")
+    
+    # ============= 接收 =============
+    
+    def receive_data(self, timeout: float = 1.0):
+        """
+        接收數據
+
+        Returns:
+            (數據, 閘道地址)，逾時返回 (b"", None)
+        """
+        if not self.selector:
+            return b"", None
+        
+        if not self.pending:
+            self._poll(timeout)
+        
+        if not self.pending:
+            return b"", None
+        
+        conn, data = self.pending.popleft()
+        self.current = conn
+        return data, conn.addr
+    
+    def process_buffer(self, data, errors=None):
+        """處理緩衝區數據（使用最近一次 receive_data 的連線緩衝區）"""
+        if self.current is None:
+            return []
+        return self.current.buffer.feed(data, errors)
+    
+    def _poll(self, timeout: float):
+        """處理到期計時並等待 I/O 事件"""
+        now = time.monotonic()
+        self._run_timers(now)
+        
+        if self.timers:
+            timeout = max(0.0, min(timeout, self.timers[0][0] - now))
+        
+        try:
+            events = self.selector.select(timeout)
+        except OSError as e:
+            self.logger.error(f"selector 錯誤: {e}")
+            return
+        
+        for key, mask in events:
+            conn = key.data
+            with self.lock:
+                if conn.sock is not key.fileobj:
+                    continue
+                if conn.state == "connecting":
+                    self._finish_connect(conn)
+                    continue
+                if mask & selectors.EVENT_WRITE:
+                    self._flush(conn)
+                # _flush 可能已經 _fail（conn.sock 為 None），在鎖內重新確認並取得 socket
+                if conn.sock is not key.fileobj:
+                    continue
+                sock = conn.sock
+            if mask & selectors.EVENT_READ:
+                self._read(conn, sock)
+    
+    def _read(self, conn: TCPConnection, sock: socket.socket):
+        """
+        讀取連線數據（不持有 lock）
+
+        發送執行緒可能同時 _fail 並關閉 sock（recv 引發 OSError），
+        只有 conn.sock 仍為同一個 socket 時才處理失敗，避免重複排程重連
+        """
+        try:
+            data = sock.recv(65536)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            with self.lock:
+                if conn.sock is sock:
+                    self._fail(conn, f"讀取失敗: {e}")
+            return
+        
+        if not data:
+            with self.lock:
+                if conn.sock is sock:
+                    self._fail(conn, "閘道關閉連線")
+            return
+        self.pending.append((conn, data))
+    
+    # ============= 發送 =============
+    
+    def send_data(self, data, addr: Optional[Tuple[str, int]] = None):
+        """發送數據到指定閘道（未送完的部分於可寫時補送）"""
+        target_addr = tuple(addr) if addr is not None else self.server_addr
+        conn = self.connections.get(target_addr)
+        if conn is None:
+            self.logger.error(f"未設定的TCP閘道: {target_addr[0]}:{target_addr[1]}")
+            return False
+        
+        with self.lock:
+            if conn.state != "connected":
+                self.logger.warning(f"TCP閘道未連線，略過發送: {target_addr[0]}:{target_addr[1]}")
+                return False
+            
+            if conn.out:
+                conn.out += data
+                return True
+            
+            try:
+                sent = conn.sock.send(data)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError as e:
+                self._fail(conn, f"發送失敗: {e}")
+                return False
+            
+            if sent < len(data):
+                conn.out += data[sent:]
+                self.selector.modify(conn.sock, selectors.EVENT_READ | selectors.EVENT_WRITE, conn)
+            return True
+    
+    def _flush(self, conn: TCPConnection):
+        """補送未送完的數據（需持有 lock）"""
+        try:
+            sent = conn.sock.send(conn.out)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._fail(conn, f"發送失敗: {e}")
+            return
+        
+        del conn.out[:sent]
+        if not conn.out:
+            self.selector.modify(conn.sock, selectors.EVENT_READ, conn)
+    
+    # ============= 連線管理（需持有 lock） =============
+    
+    def _connect(self, conn: TCPConnection):
+        """發起非阻塞連線"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        
+        conn.sock = sock
+        conn.state = "connecting"
+        conn.generation += 1
+        
+        err = sock.connect_ex(conn.addr)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035):
+            self._fail(conn, f"連線失敗: {errno.errorcode.get(err, err)}")
+            return
+        
+        self.selector.register(sock, selectors.EVENT_WRITE, conn)
+        self._schedule(conn, self.connect_timeout, "timeout")
+    
+    def _finish_connect(self, conn: TCPConnection):
+        """連線完成（可寫事件）"""
+        err = conn.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err:
+            self._fail(conn, f"連線失敗: {errno.errorcode.get(err, err)}")
+            return
+        
+        if conn.failures:
+            self.reconnects += 1
+        conn.state = "connected"
+        conn.failures = 0
+        conn.generation += 1  # 取消連線逾時計時
+        conn.buffer.buffer.clear()
+        self.selector.modify(conn.sock, selectors.EVENT_READ, conn)
+        self.logger.info(f"TCP閘道已連線: {conn.addr[0]}:{conn.addr[1]}")
+    
+    def _fail(self, conn: TCPConnection, reason: str):
+        """連線失敗或中斷：關閉並排程重連"""
+        was_connected = conn.state == "connected"
+        self._drop(conn)
+        
+        delay = min(self.backoff_max, self.backoff_initial * (2 ** conn.failures))
+        delay *= random.uniform(0.5, 1.0)  # 抖動，避免大量閘道同時重連
+        conn.failures += 1
+        self._schedule(conn, delay, "reconnect")
+        
+        # 斷線與首次失敗記錄警告，持續失敗不重複記錄，避免大量日誌
+        if was_connected or conn.failures == 1:
+            self.logger.warning(f"TCP閘道 {conn.addr[0]}:{conn.addr[1]} {reason}，{delay:.1f} 秒後重連")
+    
+    def _drop(self, conn: TCPConnection):
+        """關閉連線 socket"""
+        if conn.sock is not None:
+            try:
+                self.selector.unregister(conn.sock)
+            except (KeyError, ValueError):
+                pass
+            conn.sock.close()
+        conn.sock = None
+        conn.state = "idle"
+        conn.generation += 1
+        conn.out.clear()
+    
+    def _schedule(self, conn: TCPConnection, delay: float, kind: str):
+        """排程計時項目"""
+        self.timer_seq += 1
+        heapq.heappush(self.timers, (time.monotonic() + delay, self.timer_seq, conn, conn.generation, kind))
+    
+    def _run_timers(self, now: float):
+        """處理到期的重連與連線逾時"""
+        with self.lock:
+            while self.timers and self.timers[0][0] <= now:
+                _, _, conn, generation, kind = heapq.heappop(self.timers)
+                if generation != conn.generation:
+                    continue
+                if kind == "timeout" and conn.state == "connecting":
+                    self._fail(conn, "連線逾時")
+                elif kind == "reconnect" and conn.state == "idle":
+                    self._connect(conn)
+
+
+# 最小幀長度（ACK：DLE ACK SEQ ADDR(2) LEN(2) CKS）
+MIN_FRAME_SIZE = 8
 
 
 class PacketBuffer:
-    """封包緩衝與切割（支持 DLE+STX/ACK）"""
+    """
+    封包緩衝與切割（支持 DLE+STX/ACK）
+
+    datagram=True（UDP / multicast）時每個 datagram 各自切割：結尾不完整的幀直接返回
+    （解析端歸類為幀不完整），不等待下一個 datagram；LEN 字段損毀時不會吞掉之後的 datagram。
+    串流（TCP）跨次呼叫重組。
+    STX 的 LEN 字段小於最小幀長度時記錄為 length 錯誤，跳過該 DLE 繼續尋找下一個幀開頭。
+    """
     
-    def __init__(self, logger):
+    def __init__(self, logger, datagram: bool = False):
         self.buffer = bytearray()
         self.logger = logger
+        self.datagram = datagram
     
-    def feed(self, data):
-        """喂入數據，返回完整封包列表"""
+    def feed(self, data, errors=None):
+        """
+        喂入數據，返回完整封包列表
+
+        Args:
+            data: 收到的數據
+            errors: FrameErrors（None 表示不計數）
+        """
         self.buffer.extend(data)
         packets = []
         
@@ -251,6 +685,13 @@ class PacketBuffer:
                 if len(self.buffer) < 7:
                     break
                 total = int.from_bytes(self.buffer[5:7], 'big')
+                if total < MIN_FRAME_SIZE:
+                    # LEN 字段損毀：不可依此長度切割（LEN=0 時緩衝區不會前進）
+                    if errors is not None:
+                        errors.record("length", bytes(self.buffer[:7]), int.from_bytes(self.buffer[3:5], 'big'),
+                                      f"LEN 字段 {total} 小於最小幀長度 {MIN_FRAME_SIZE}")
+                    self.buffer = self.buffer[1:]
+                    continue
             elif packet_type == 'ACK':
                 total = 8  # DLE ACK SEQ ADDR(2) LEN(2) CKS
             else:
@@ -264,6 +705,11 @@ class PacketBuffer:
            
             self.buffer = self.buffer[total:]
         
+        if self.datagram and self.buffer:
+            if self.buffer[0] == 0xAA:
+                packets.append(bytes(self.buffer))
+            self.buffer.clear()
+        
         return packets
     
     def _find_packet_start(self):
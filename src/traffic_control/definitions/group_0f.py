@@ -5,23 +5,30 @@ from utils import int_to_binary_list
 from config.constants import HARDWARE_STATUS_MAP, ERROR_CODE_MAP
 
 
+def _format_hardware_bits(byte_value, bit_offset):
+    """格式化單一 byte 的硬體狀態位（bit_offset: 0=低位元組, 8=高位元組）"""
+    status_bits = int_to_binary_list(byte_value)
+    return [
+        f"   狀態 {bit_pos}: {description}"
+        for bit_pos, description in HARDWARE_STATUS_MAP
+        if bit_offset <= bit_pos < bit_offset + 8 and status_bits[bit_pos - bit_offset]
+    ]
+
+# 高低位元組分開查表（2 x 256 項）
+_HARDWARE_LOW_LINES = [_format_hardware_bits(value, 0) for value in range(256)]
+_HARDWARE_HIGH_LINES = [_format_hardware_bits(value, 8) for value in range(256)]
+_HARDWARE_NORMAL_LINES = ["   狀態: 系統正常"]
+
+
 def format_0f04_hardware_status(hardware_status):
     """格式化0F04硬體狀態為字符串列表"""
-    # 將 16 bits 轉換為二進制列表（低位在前）
     low_byte = hardware_status & 0xFF
     high_byte = (hardware_status >> 8) & 0xFF
-    status_bits = int_to_binary_list(low_byte) + int_to_binary_list(high_byte)
-    
-    formatted_lines = []
-      
-    for bit_pos, description in HARDWARE_STATUS_MAP:
-        if bit_pos < len(status_bits) and status_bits[bit_pos]:
-            formatted_lines.append(f"   狀態 {bit_pos}: {description}")
     
-    if not formatted_lines:
-        formatted_lines.append("   狀態: 系統正常")
+    if not hardware_status & 0xFFFF:
+        return list(_HARDWARE_NORMAL_LINES)
     
-    return formatted_lines
+    return _HARDWARE_LOW_LINES[low_byte] + _HARDWARE_HIGH_LINES[high_byte]
 
 
 # 0F 群組封包定義
@@ -93,6 +100,7 @@ F0_GROUP_DEFINITIONS = {
         "group": "0F",
         "command": 0x04,
         "log_modes": ["receive"],
+        "suppress_repeats": True,  # 內容未變化時略過日誌
         "fields": [
             {
                 "name": "硬體狀態碼",
@@ -18,6 +18,7 @@ F5_GROUP_DEFINITIONS = {
         "group": "5F",
         "command": 0x03,
         "log_modes": ["receive"],
+        "suppress_repeats": True,  # 內容未變化時略過日誌
         
         # 统一字段列表，按順序定義，使用 index 表示位置
         "fields": [
@@ -31,7 +32,7 @@ F5_GROUP_DEFINITIONS = {
             # 專門類型解析器
             {"name": "燈號狀態列表", "index": 8, 
             "type": "signal_status_list", 
-            "count_from":lambda fields: fields.get("岔路數目", 0),
+            "count_from": "岔路數目",
             "description": "燈號狀態列表"}
         ],   
         "validation": {
@@ -107,7 +108,7 @@ F5_GROUP_DEFINITIONS = {
                 "index": 6,
                 "type": "list",
                 "item_type": "uint8",
-                "count_from": lambda fields: fields.get("岔路數目", 0) * fields.get("綠燈分相數目", 0),
+                "count_from": "岔路數目 * 綠燈分相數目",
                 "description": "燈號狀態列表（每個分相包含 SignalCount 個狀態，共 SubPhaseCount 個分相）"
             }
         ],
@@ -180,7 +181,7 @@ F5_GROUP_DEFINITIONS = {
             # 專門類型解析器
             {
             "name": "燈號狀態列表", "index": 6, "type": "signal_status_list",  
-            "count_from": lambda fields: fields.get("岔路數目", 0) * fields.get("綠燈分相數目", 0),
+            "count_from": "岔路數目 * 綠燈分相數目",
             "description": "燈號狀態列表"
             }
         ],
@@ -364,7 +365,7 @@ F5_GROUP_DEFINITIONS = {
                 "index": 4,
                 "type": "list",
                 "item_type": "uint8",
-                "count_from":lambda fields: fields.get("綠燈分相數目", 0) * 6,  
+                "count_from": "綠燈分相數目 * 6",  
                 "description": "分相基本參數列表（每個分相：MinGreen(1) + MaxGreen(2) + Yellow(1) + AllRed(1) + PedGreenFlash(1) + PedRed(1)）"
             }
         ],
@@ -527,7 +528,7 @@ F5_GROUP_DEFINITIONS = {
             # sub_phase_count
             {"name": "綠燈分相數", "index": 5, "type": "uint8"},
             # green_times
-            {"name": "各分相綠燈時間", "index": 6, "type": "list", "item_type": "uint16", "count_from": lambda fields: fields.get("綠燈分相數", 0)},
+            {"name": "各分相綠燈時間", "index": 6, "type": "list", "item_type": "uint16", "count_from": "綠燈分相數"},
             # cycle_time
             {"name": "週期秒數", "index": None, "type": "uint16"},
             # offset
@@ -604,14 +605,14 @@ F5_GROUP_DEFINITIONS = {
             
             # time_segment_list
             # 專門類型解析器 
-            {"name": "時段列表", "index": 4, "type": "time_segment_list", "count_from": lambda fields: fields.get("時段數量", 0)},
+            {"name": "時段列表", "index": 4, "type": "time_segment_list", "count_from": "時段數量"},
             
             # num_weekday
             {"name": "星期數量", "index": None, "type": "uint8"},
             
             # weekday(num_weekday)
             # 專門類型解析器
-            {"name": "星期列表", "index": None, "type": "weekday_list", "count_from": lambda fields: fields.get("星期數量", 0)},
+            {"name": "星期列表", "index": None, "type": "weekday_list", "count_from": "星期數量"},
         ],
         
         "validation": {
@@ -630,6 +631,7 @@ F5_GROUP_DEFINITIONS = {
         "group": "5F",
         "command": 0x0C,
         "log_modes": ["receive"],
+        "suppress_repeats": True,  # 內容未變化時略過日誌
         "fields": [
             # control_strategy
             {"name": "控制策略", "index": 2, "type": "uint8", "mapping": CONTROL_STRATEGY_MAP},
@@ -0,0 +1,233 @@
+"""
+資料檔封包定義與編譯快取
+
+除了 group_5f.py / group_0f.py，definitions/ 目錄下的 *.json 也會被載入，
+新增指令只需加入資料檔，不需修改 Python：
+
+    {
+        "5F99": {
+            "name": "範例回報",
+            "reply_type": "主動回報",
+            "needs_ack": true,
+            "group": "5F",
+            "command": "0x99",
+            "log_modes": ["receive"],
+            "fields": [
+                {"name": "控制策略", "index": 2, "type": "uint8", "mapping": "CONTROL_STRATEGY_MAP"},
+                {"name": "數量", "index": 3, "type": "uint8"},
+                {"name": "數值列表", "index": 4, "type": "list", "count_from": "數量 * 2"}
+            ],
+            "validation": {"type": "min_length", "value": 4}
+        }
+    }
+
+- command 可為整數或 "0x.." 字串
+- mapping / post_process 以名稱引用 NAMED_REFERENCES，mapping 亦可為 {"0x01": "..."} 物件
+- count_from 為計數表達式（字段名稱、整數與 + - * //）
+
+編譯時較耗時的映射表（0x00~0xFF 預先映射結果）以內容雜湊為鍵寫入使用者快取目錄
+（$XDG_CACHE_HOME/traffic_control，預設 ~/.cache/traffic_control），重新啟動時內容未變則直接使用。
+快取為純 JSON 資料（不使用 pickle，讀取快取不會執行任何程式碼），格式不符時忽略並重新編譯。
+"""
+
+import glob
+import hashlib
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from config.constants import (
+    BEGIN_END_STATUS_MAP,
+    CONTROL_STRATEGY_MAP,
+    ERROR_CODE_MAP,
+    FIELD_OPERATION_MAP,
+    PLAN_ID_MAP,
+)
+from definitions.group_0f import format_0f04_hardware_status
+
+# 資料檔目錄（預設與內建定義相同）
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 快取格式版本（結構改變時遞增）
+CACHE_VERSION = 2
+
+# 編譯快取目錄（每個使用者固定位置，與目前工作目錄無關）
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "traffic_control",
+)
+
+# 映射表長度（uint8 的 0x00~0xFF）
+MAPPING_TABLE_SIZE = 256
+
+# 資料檔可引用的映射與後處理函數
+NAMED_REFERENCES = {
+    "CONTROL_STRATEGY_MAP": CONTROL_STRATEGY_MAP,
+    "ERROR_CODE_MAP": ERROR_CODE_MAP,
+    "FIELD_OPERATION_MAP": FIELD_OPERATION_MAP,
+    "BEGIN_END_STATUS_MAP": BEGIN_END_STATUS_MAP,
+    "PLAN_ID_MAP": PLAN_ID_MAP,
+    "format_0f04_hardware_status": format_0f04_hardware_status,
+}
+
+
+# ============= 資料檔 =============
+
+def find_data_files(directory: str = DATA_DIR) -> List[str]:
+    """列出目錄下的定義資料檔（依名稱排序，後者覆蓋前者）"""
+    return sorted(glob.glob(os.path.join(directory, "*.json")))
+
+
+def load_data_file(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    載入定義資料檔
+
+    Returns:
+        {指令碼: 定義 dict}，格式與 group_5f.py 相同
+
+    Raises:
+        ValueError: 檔案格式或引用錯誤
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"無法讀取定義檔 {path}: {e}")
+
+    if not isinstance(data, dict):
+        raise ValueError(f"定義檔 {path} 頂層必須為物件")
+
+    definitions = {}
+    for cmd_code, definition in data.items():
+        cmd_code = cmd_code.upper()
+        if len(cmd_code) != 4 or any(c not in "0123456789ABCDEF" for c in cmd_code):
+            raise ValueError(f"定義檔 {path}: 無效的指令碼 {cmd_code}")
+
+        definition = dict(definition)
+        if isinstance(definition.get("command"), str):
+            definition["command"] = int(definition["command"], 0)
+        definition["fields"] = [
+            _resolve_field(field, path, cmd_code) for field in definition.get("fields", [])
+        ]
+        definitions[cmd_code] = definition
+
+    return definitions
+
+
+def _resolve_field(field: Dict[str, Any], path: str, cmd_code: str) -> Dict[str, Any]:
+    """解析字段中的名稱引用"""
+    field = dict(field)
+
+    mapping = field.get("mapping")
+    if isinstance(mapping, str):
+        field["mapping"] = _lookup_reference(mapping, path, cmd_code)
+    elif isinstance(mapping, dict):
+        field["mapping"] = {int(key, 0): value for key, value in mapping.items()}
+
+    post_process = field.get("post_process")
+    if isinstance(post_process, str):
+        field["post_process"] = _lookup_reference(post_process, path, cmd_code)
+
+    return field
+
+
+def _lookup_reference(name: str, path: str, cmd_code: str) -> Any:
+    """查詢 NAMED_REFERENCES"""
+    if name not in NAMED_REFERENCES:
+        raise ValueError(f"定義檔 {path}: {cmd_code} 引用未知名稱 {name}")
+    return NAMED_REFERENCES[name]
+
+
+# ============= 編譯快取 =============
+
+def content_hash(definitions: Dict[str, Dict[str, Any]], data_files: Iterable[str]) -> str:
+    """
+    計算定義內容雜湊
+
+    涵蓋資料檔、內建定義模組、被引用函數所在模組及編譯器本身的原始碼，
+    任一改變都會產生新的雜湊，避免載入過期的映射表。
+    """
+    sources = {
+        sys.modules["definitions.group_5f"].__file__,
+        sys.modules["definitions.group_0f"].__file__,
+        sys.modules["packet.compiled_definition"].__file__,
+    }
+    for definition in definitions.values():
+        for field in definition.get("fields", []):
+            for value in (field.get("mapping"), field.get("post_process")):
+                module = sys.modules.get(getattr(value, "__module__", None) or "")
+                if callable(value) and module is not None and getattr(module, "__file__", None):
+                    sources.add(module.__file__)
+
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in sorted(sources) + list(data_files):
+        with open(path, "rb") as f:
+            digest.update(os.path.basename(path).encode("utf-8"))
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir: str, key: str) -> str:
+    """快取檔路徑"""
+    return os.path.join(cache_dir, f"definitions-{key[:16]}.json")
+
+
+def read_cache(cache_dir: Optional[str], key: str) -> Optional[Dict[str, Dict[str, tuple]]]:
+    """
+    讀取編譯快取（不存在、無法讀取或格式不符時返回 None）
+
+    Returns:
+        {指令碼: {字段名稱: 映射表}}
+    """
+    if not cache_dir:
+        return None
+    try:
+        with open(cache_path(cache_dir, key), "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key or not isinstance(cached.get("tables"), dict):
+        return None
+
+    tables = {}
+    for cmd_code, fields in cached["tables"].items():
+        if not isinstance(fields, dict):
+            return None
+        for name, table in fields.items():
+            if not isinstance(table, list) or len(table) != MAPPING_TABLE_SIZE:
+                return None
+        tables[cmd_code] = {name: tuple(table) for name, table in fields.items()}
+    return tables
+
+
+def write_cache(cache_dir: Optional[str], key: str, tables: Dict[str, Dict[str, tuple]]) -> bool:
+    """
+    寫入編譯快取（暫存檔 + os.replace，避免讀到寫一半的檔案）
+
+    映射表含無法以 JSON 表示的值時不寫入
+    """
+    if not cache_dir:
+        return False
+
+    path = cache_path(cache_dir, key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        data = json.dumps({"key": key, "tables": tables}, ensure_ascii=False)
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except (OSError, TypeError, ValueError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+    # 清除其他版本的快取
+    for old in glob.glob(os.path.join(cache_dir, "definitions-*")):
+        if old != path and not old.endswith(".tmp"):
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return True
@@ -3,10 +3,15 @@
 
 """
 import argparse
-from config.network import UDPTransport
+from config.network import UDPTransport, MulticastUDPTransport, MulticastPublisher, TCPTransport
 from config.config import TCConfig
-from config.log_setup import setup_logging
-from mode import Receive, Command
+from config.log_setup import setup_logging, setup_packet_log, setup_quarantine, LOG_QUEUE_SIZE, LOG_FLUSH_INTERVAL
+from mode import Receive, Command, Relay
+from packet.shm_ring import ShmRingWriter, DEFAULT_RING_NAME
+from packet.rate_limit import RateLimiter, CONTROLLER_RATE, CONTROLLER_BURST, GLOBAL_RATE, GLOBAL_BURST
+from packet.renderer import OUTPUT_FORMATS
+from packet.capture import CaptureWriter
+from packet.metrics import MetricsServer, METRICS_HOST
 
 
 
@@ -16,41 +21,244 @@ def main():
     
     parser.add_argument(
         '-m',
-        choices=['receive', 'command'],
+        choices=['receive', 'command', 'relay'],
         default='command',
-        help='運行模式: receive=只接收, command=命令模式'
+        help='運行模式: receive=只接收, command=命令模式, relay=轉發控制器與 BackServer'
+    )
+    
+    parser.add_argument(
+        '--local-ack',
+        action='store_true',
+        help='轉發模式由 relay 直接回覆控制器 ACK（丟棄 BackServer 的 ACK）'
+    )
+    
+    parser.add_argument(
+        '-t', '--transport',
+        choices=['udp', 'multicast', 'tcp'],
+        default='udp',
+        help='傳輸方式: udp=直接接收控制器, multicast=訂閱 ingest 程序轉發的 multicast 組, tcp=連線串列轉 TCP 閘道'
+    )
+    
+    parser.add_argument(
+        '--endpoint',
+        action='append',
+        default=[],
+        metavar='HOST:PORT',
+        help='TCP 閘道地址（可重複指定，預設為設備配置的控制器地址）'
+    )
+    
+    parser.add_argument(
+        '--publish',
+        action='store_true',
+        help='將已驗證的幀轉發到 multicast 組（ingest 程序使用，udp 或 tcp 傳輸）'
+    )
+    
+    parser.add_argument(
+        '--shm',
+        nargs='?',
+        const=DEFAULT_RING_NAME,
+        metavar='NAME',
+        help=f'將收到的幀寫入共享記憶體環狀緩衝區供同機程序讀取（預設名稱 {DEFAULT_RING_NAME}）'
+    )
+    
+    parser.add_argument(
+        '--ring-force',
+        action='store_true',
+        help='同名共享記憶體仍由其他程序使用時也取代（預設拒絕啟動）'
+    )
+    
+    parser.add_argument(
+        '--capture',
+        metavar='PATH',
+        help='將收到的原始 datagram 附加到擷取檔（以 python -m benchmark.replay 重播）'
+    )
+    
+    parser.add_argument(
+        '--controller-rate',
+        type=float,
+        default=CONTROLLER_RATE,
+        help=f'每個控制器每秒指令數上限，超出時排隊（0 表示不限，預設 {CONTROLLER_RATE:g}）'
+    )
+    
+    parser.add_argument('--controller-burst', type=float, default=CONTROLLER_BURST, help='每個控制器可連續送出的指令數')
+    
+    parser.add_argument(
+        '--global-rate',
+        type=float,
+        default=GLOBAL_RATE,
+        help=f'全部控制器合計每秒指令數上限（0 表示不限，預設 {GLOBAL_RATE:g}）'
+    )
+    
+    parser.add_argument('--global-burst', type=float, default=GLOBAL_BURST, help='全域可連續送出的指令數')
+    
+    parser.add_argument(
+        '--log-queue',
+        type=int,
+        default=LOG_QUEUE_SIZE,
+        help=f'非同步日誌佇列上限，滿時丟棄並計數（0 表示同步寫入，預設 {LOG_QUEUE_SIZE}）'
+    )
+    
+    parser.add_argument(
+        '--log-flush',
+        type=float,
+        default=LOG_FLUSH_INTERVAL,
+        help=f'日誌批次寫入間隔秒數（預設 {LOG_FLUSH_INTERVAL:g}）'
+    )
+    
+    parser.add_argument(
+        '--log-format',
+        choices=OUTPUT_FORMATS,
+        default='text',
+        help='封包日誌格式: text=多行顯示（主日誌）, json=logs/<模式>.packets.jsonl, csv=logs/<模式>.packets/<指令碼>.csv'
+    )
+    
+    parser.add_argument(
+        '--quarantine',
+        default='logs/quarantine.log',
+        metavar='PATH',
+        help='錯誤幀隔離檔（超過 5MB 輪替，保留 3 個舊檔；預設 logs/quarantine.log）'
+    )
+    
+    parser.add_argument('--no-quarantine', action='store_true', help='錯誤幀只計數，不寫入隔離檔')
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        default=0,
+        metavar='PORT',
+        help='在本機 HTTP 端口提供 Prometheus 格式指標（GET /metrics；預設 0 不啟用）'
+    )
+    
+    parser.add_argument('--metrics-host', default=METRICS_HOST, help=f'指標端口監聽地址（預設 {METRICS_HOST}）')
+    
+    parser.add_argument('--group', help='multicast 組地址（預設取自設備配置）')
+    parser.add_argument('--group-port', type=int, help='multicast 組端口（預設取自設備配置）')
+    parser.add_argument(
+        '--interface',
+        default='0.0.0.0',
+        help='multicast 介面IP（本機測試使用 127.0.0.1）'
     )
     
     args = parser.parse_args()
     
+    if args.publish and args.transport == 'multicast':
+        parser.error('--publish 不能搭配 multicast 傳輸')
+    if (args.publish or args.shm or args.capture) and args.m == 'relay':
+        parser.error('--publish / --shm / --capture 不能搭配轉發模式')
+    
+    config = TCConfig(3)
+    group = args.group or config.get_multicast_group()
+    group_port = args.group_port or config.get_multicast_port()
+    
     # 日誌實例
-    logger = setup_logging(log_file=f"{args.m}.log", mode=args.m)    
+    logger = setup_logging(log_file=f"{args.m}.log", mode=args.m,
+                           queue_size=args.log_queue, flush_interval=args.log_flush)
+    if args.log_format != 'text':
+        # json / csv：封包記錄另寫機器可讀檔案
+        setup_packet_log(args.log_format, mode=args.m, queue_size=args.log_queue, flush_interval=args.log_flush)
     
     # 網絡實例
-    network=UDPTransport(
-        local_ip=TCConfig(3).get_transserver_ip(),
-        local_port=TCConfig(3).get_transserver_port(),
-        server_ip=TCConfig(3).get_tc_ip(),
-        server_port=TCConfig(3).get_tc_port(),
-        logger=logger
-    )
+    if args.transport == 'multicast':
+        network = MulticastUDPTransport(
+            local_ip=args.interface,
+            local_port=group_port,
+            server_ip=config.get_tc_ip(),
+            server_port=config.get_tc_port(),
+            logger=logger,
+            multicast_group=group
+        )
+    elif args.transport == 'tcp':
+        endpoints = [_parse_endpoint(parser, value) for value in args.endpoint]
+        network = TCPTransport(
+            server_ip=config.get_tc_ip(),
+            server_port=config.get_tc_port(),
+            logger=logger,
+            endpoints=endpoints or None
+        )
+    else:
+        network=UDPTransport(
+            local_ip=config.get_transserver_ip(),
+            local_port=config.get_transserver_port(),
+            server_ip=config.get_tc_ip(),
+            server_port=config.get_tc_port(),
+            logger=logger
+        )
     
-    if args.m == 'receive':
-        # 接收模式（只接收數據）
-        receiver = Receive(device_id=3, mode="receive", network=network, logger=logger)
+    # multicast 轉發（ingest）
+    publisher = None
+    if args.publish:
+        publisher = MulticastPublisher(group, group_port, logger, interface=args.interface)
+    
+    # 共享記憶體環狀緩衝區
+    try:
+        ring = ShmRingWriter(args.shm, force=args.ring_force) if args.shm else None
+    except FileExistsError as e:
+        parser.error(f"{e}（確認沒有其他接收程序後可加上 --ring-force）")
+    
+    # 原始流量擷取
+    try:
+        capture = CaptureWriter(args.capture) if args.capture else None
+    except ValueError as e:
+        parser.error(f"{e}（請改用其他 --capture 路徑）")
+    if capture and capture.truncated:
+        logger.warning(f"擷取檔最後一筆記錄不完整，已截掉 {capture.truncated} bytes: {args.capture}")
+    
+    # 錯誤幀隔離檔（背景執行緒寫入）
+    quarantine = None if args.no_quarantine else setup_quarantine(args.quarantine)
+    
+    # 指標端口（由模式啟動時開啟）
+    metrics_server = MetricsServer(args.metrics_port, args.metrics_host, logger) if args.metrics_port else None
+    
+    if args.m == 'relay':
+        # 轉發模式（上行、下行雙線程）
+        server_network = UDPTransport(
+            local_ip="0.0.0.0",
+            local_port=0,
+            server_ip=config.get_backserver_ip(),
+            server_port=config.get_backserver_port(),
+            logger=logger
+        )
+        relay = Relay(device_id=3, mode="relay", network=network, logger=logger,
+                      server_network=server_network, local_ack=args.local_ack, quarantine=quarantine,
+                      metrics_server=metrics_server)
         
+        if not relay.start():
+            print("啟動轉發模式失敗")
+            return
+    
+    elif args.m == 'receive':
+        # 接收模式（只接收數據）
+        receiver = Receive(device_id=3, mode="receive", network=network, logger=logger, publisher=publisher,
+                           ring=ring, log_format=args.log_format, capture=capture, quarantine=quarantine,
+                           metrics_server=metrics_server)
+    
         if not receiver.start():
             print("啟動接收模式失敗")
             return
-
-    else:   
+    
+    else:
         # 命令模式（接收+命令雙線程）
-        interface = Command(device_id=3, mode="command", network=network, logger=logger)
+        rate_limiter = None
+        if args.controller_rate > 0 or args.global_rate > 0:
+            rate_limiter = RateLimiter(args.controller_rate, args.controller_burst,
+                                       args.global_rate, args.global_burst)
         
+        interface = Command(device_id=3, mode="command", network=network, logger=logger, publisher=publisher,
+                            ring=ring, rate_limiter=rate_limiter, log_format=args.log_format,
+                            capture=capture, quarantine=quarantine, metrics_server=metrics_server)
+    
         if not interface.start():
             print("啟動命令模式失敗")
             return
 
 
+def _parse_endpoint(parser, value):
+    """解析 HOST:PORT"""
+    host, _, port = value.rpartition(':')
+    if not host or not port.isdigit():
+        parser.error(f'無效的閘道地址: {value} (應為 HOST:PORT)')
+    return (host, int(port))
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -2,7 +2,7 @@
 
 """
 交通控制系統指令下傳介面
-基類架構：Base -> Command, Receive
+基類架構：Base -> Command, Receive, Relay
 """
 
 import threading
@@ -11,19 +11,32 @@ from typing import Optional
 import binascii
 
 from config.config import TCConfig
-from config.log_setup import get_logger
+from config.log_setup import get_logger, logging_stats
 from config.network import NetworkTransport
 
 from packet.center import PacketCenter
+from packet.metrics import render_prometheus
+from packet.relay import FrameRelay, RELAY_REPORT_INTERVAL
 
 from command.session_manager import SessionManager
 from command.step_processor import StepProcessor
 
+# 定義資料檔檢查間隔（秒）
+DEFINITION_WATCH_INTERVAL = 2.0
+
+# export-steps 預設匯出檔
+STEPS_EXPORT_PATH = "steps.npz"
+
+# steps 指令顯示的最近週期 / 綠燈筆數
+STEPS_SHOW_LAST = 5
+
 
 class Base:
     """基類：提供共同的初始化和接收功能"""
 
-    def __init__(self, device_id=3, mode = "receive", network: Optional[NetworkTransport] = None, logger=None):
+    def __init__(self, device_id=3, mode = "receive", network: Optional[NetworkTransport] = None, logger=None,
+                 publisher=None, ring=None, rate_limiter=None, log_format="text", capture=None, quarantine=None,
+                 metrics_server=None):
         
         self.mode = mode
         
@@ -44,12 +57,24 @@ class Base:
             network=self.network,
             config=self.config,
             tc_id=self.tc_id,
-            logger=self.logger
+            logger=self.logger,
+            publisher=publisher,
+            ring=ring,
+            rate_limiter=rate_limiter,
+            log_format=log_format,
+            quarantine=quarantine
         )
         
+        # 原始 datagram 擷取（CaptureWriter，重播用）
+        self.capture = capture
+        
+        # 本機 HTTP 指標端口（MetricsServer）
+        self.metrics_server = metrics_server
+        
         # 執行緒控制
         self.running = False
         self.receive_thread = None
+        self.watch_thread = None
         
         self.logger.info(f"系統初始化完成 - {mode}模式")
 
@@ -57,36 +82,84 @@ class Base:
     def start(self):
         """啟動系統"""
         if not self.network.open():
-            self.logger.error("開啟 UDP 連接失敗")
+            self.logger.error("開啟網路連接失敗")
             return False
         
+        if self.center.publisher and not self.center.publisher.open():
+            self.logger.error("開啟 Multicast 轉發失敗")
+            self.network.close()
+            return False
+        
+        if self.metrics_server and not self.metrics_server.open(self.render_metrics):
+            self.network.close()
+            if self.center.publisher:
+                self.center.publisher.close()
+            return False
+        
+        # 發送執行緒（ACK 與指令依優先序送出）
+        self.center.outbound.start()
+        
         self.running = True
+        
+        # 定義資料檔變更時熱重載（不中斷接收執行緒）
+        self.watch_thread = threading.Thread(
+            target=self._definition_watch_loop,
+            name="DefinitionWatchThread",
+            daemon=True
+        )
+        self.watch_thread.start()
         return True
     
     def stop(self):
         """停止系統"""
         self.running = False
+        if self.center.outbound:
+            self.center.outbound.stop()
+        self.center.bus.stop()
         if self.network:
             self.network.close()
+        if self.center.publisher:
+            self.center.publisher.close()
+        if self.center.ring:
+            self.center.ring.close()
+            self.center.ring = None
+        if self.capture:
+            self.capture.close()
+            self.logger.info(f"擷取檔已關閉: {self.capture.path} ({self.capture.records} 筆)")
+        if self.metrics_server:
+            self.metrics_server.close()
         self.logger.info("系統已停止")
     
+    def render_metrics(self) -> str:
+        """Prometheus 文字格式指標（指標端口每次請求時呼叫）"""
+        return render_prometheus(self.center, self.mode)
+    
     def _receive_loop(self):
         """封包接收迴圈"""
         self.logger.info("接收線程已啟動")
+        metrics = self.center.metrics
         
         while self.running:
             try:
                 data, addr = self.network.receive_data()
                 if addr and data:
+                    received_ns = time.perf_counter_ns()
+                    
+                    if self.capture:
+                        self.capture.record(data, addr)
                     
                     # 處理緩衝區，獲取完整幀列表
-                    frames = self.network.process_buffer(data)
+                    frames = self.network.process_buffer(data, self.center.parser.errors)
+                    metrics.datagrams += 1
+                    metrics.bytes += len(data)
+                    metrics.frames += len(frames)
                     
                     for frame in frames:
                         # 解析封包
-                        self.center.process(self.center.parse(frame), addr)
-                
-                time.sleep(0.01)
+                        self.center.process(self.center.parse(frame), addr, received_ns)
+                else:
+                    # receive_data 已阻塞等待，只在未取得數據時短暫休眠
+                    time.sleep(0.01)
                 
             except Exception as e:
                 if self.running:
@@ -95,12 +168,29 @@ class Base:
         
         self.logger.info("接收線程已停止")
     
+    def _definition_watch_loop(self):
+        """定義資料檔監看迴圈"""
+        while self.running:
+            time.sleep(DEFINITION_WATCH_INTERVAL)
+            result = self.center.packet_def.reload_if_changed()
+            if result:
+                self._log_reload(*result)
+    
+    def _log_reload(self, success: bool, message: str):
+        """記錄定義重新載入結果"""
+        if success:
+            self.logger.info(message)
+        else:
+            self.logger.error(message)
+    
 
 
 class Receive(Base):
     """接收模式：只接收數據，不發送命令"""
-    def __init__(self, device_id=3, mode: str = "receive" , network: NetworkTransport = None, logger=None):
-        super().__init__(device_id, mode, network, logger)
+    def __init__(self, device_id=3, mode: str = "receive" , network: NetworkTransport = None, logger=None,
+                 publisher=None, ring=None, log_format="text", capture=None, quarantine=None, metrics_server=None):
+        super().__init__(device_id, mode, network, logger, publisher, ring, log_format=log_format, capture=capture,
+                         quarantine=quarantine, metrics_server=metrics_server)
 
     def start(self):
         """啟動接收模式"""
@@ -127,13 +217,124 @@ class Receive(Base):
         
         return True
     
+
+class Relay(Base):
+    """轉發模式：控制器 <-> BackServer，驗證後原封不動轉發"""
+    
+    def __init__(self, device_id=3, mode: str = "relay", network: NetworkTransport = None, logger=None,
+                 server_network: NetworkTransport = None, local_ack: bool = False, quarantine=None,
+                 metrics_server=None):
+        """
+        Args:
+            network: 面向控制器的傳輸層
+            server_network: 面向 BackServer 的傳輸層（send_data 預設送往 BackServer）
+            local_ack: 是否由 relay 直接回覆控制器 ACK
+            quarantine: 錯誤幀隔離檔 logger
+            metrics_server: 本機 HTTP 指標端口
+        """
+        super().__init__(device_id, mode, network, logger, quarantine=quarantine, metrics_server=metrics_server)
+        
+        self.server_network = server_network
+        self.relay = FrameRelay(
+            center=self.center,
+            controller_net=network,
+            server_net=server_network,
+            local_ack=local_ack,
+            default_controller_addr=(self.config.get_tc_ip(), self.config.get_tc_port()),
+            mode=mode
+        )
+        self.downstream_thread = None
+        self.report_thread = None
+    
+    def start(self):
+        """啟動轉發模式"""
+        if not super().start():
+            return False
+        
+        if not self.server_network.open():
+            self.logger.error("開啟 BackServer 連接失敗")
+            self.stop()
+            return False
+        
+        self.receive_thread = threading.Thread(
+            target=self._relay_loop,
+            args=(self.network, self.relay.upstream),
+            name="RelayUpstreamThread",
+            daemon=True
+        )
+        self.downstream_thread = threading.Thread(
+            target=self._relay_loop,
+            args=(self.server_network, self.relay.downstream),
+            name="RelayDownstreamThread",
+            daemon=True
+        )
+        self.report_thread = threading.Thread(
+            target=self._report_loop,
+            name="RelayReportThread",
+            daemon=True
+        )
+        self.receive_thread.start()
+        self.downstream_thread.start()
+        self.report_thread.start()
+        
+        try:
+            self.logger.info(
+                f"轉發模式已啟動 - 本地ACK: {'是' if self.relay.local_ack else '否'}, "
+                f"延遲預算 {self.relay.latency_budget_us}us"
+            )
+            self.receive_thread.join()
+        
+        except KeyboardInterrupt:
+            self.logger.info("退出轉發模式")
+        
+        finally:
+            self.stop()
+        
+        return True
+    
+    def stop(self):
+        """停止系統"""
+        super().stop()
+        if self.server_network:
+            self.server_network.close()
+    
+    def _relay_loop(self, source: NetworkTransport, handler):
+        """轉發迴圈（上行或下行各一個執行緒）"""
+        self.logger.info(f"{threading.current_thread().name} 已啟動")
+        
+        while self.running:
+            try:
+                data, addr = source.receive_data()
+                if addr and data:
+                    handler(data, addr, time.perf_counter_ns())
+                else:
+                    time.sleep(0.001)
+            except Exception as e:
+                if self.running:
+                    self.logger.error(f"轉發錯誤: {e}", exc_info=True)
+                time.sleep(0.1)
+    
+    def _report_loop(self):
+        """定期輸出轉發統計"""
+        while self.running:
+            time.sleep(RELAY_REPORT_INTERVAL)
+            report = self.relay.collect_report(force=True)
+            if self.relay.over_budget():
+                self.logger.warning(f"{report} - 超出延遲預算")
+            else:
+                self.logger.info(report)
+            self.relay.reset_latency()
+
         
 class Command(Base):
     """指令下傳介面類：接收+命令雙線程，使用 seq 追蹤命令狀態"""
     
-    def __init__(self, device_id=3, mode="command", network: NetworkTransport = None, logger=None):
+    def __init__(self, device_id=3, mode="command", network: NetworkTransport = None, logger=None,
+                 publisher=None, ring=None, rate_limiter=None, log_format="text", capture=None, quarantine=None,
+                 metrics_server=None):
         
-        super().__init__(device_id, mode, network, logger)
+        super().__init__(device_id, mode, network, logger, publisher, ring, rate_limiter, log_format, capture,
+                         quarantine, metrics_server)
 
         self.packet_def = self.center.packet_def
 
@@ -232,6 +433,14 @@ class Command(Base):
                     self._show_help()
                 elif user_input.lower() == 'status':
                     self._show_status()
+                elif user_input.lower() == 'reload':
+                    success, message = self.packet_def.reload()
+                    self._log_reload(success, message)
+                    print(message)
+                elif user_input.lower().split()[0] == 'steps':
+                    self._show_steps(user_input.split()[1:])
+                elif user_input.lower().split()[0] == 'export-steps':
+                    self._export_steps(user_input.split()[1:])
                 else:
                     self._execute_command(user_input)
                         
@@ -275,7 +484,7 @@ class Command(Base):
     def _show_help(self):
         """顯示說明"""
         print(f"交通控制系統指令下傳介面 - TC{self.tc_id:03d}")
-        print(f"可用指令: help, status, quit")
+        print(f"可用指令: help, status, reload, steps <控制器>, export-steps [檔名], quit")
         
         # 動態獲取可執行命令
         executable_commands = {}
@@ -297,12 +506,61 @@ class Command(Base):
         """顯示系統狀態"""     
         print(f"\n系統狀態:")
         print(f"  控制器ID: TC{self.tc_id:03d}")
+        for line in self.center.metrics.summary():
+            print(f"  {line}")
+        outbound = self.center.outbound
+        if outbound:
+            acks, retransmits, commands = outbound.depth()
+            print(f"  發送佇列: ACK {acks}, 重送 {retransmits}, 指令 {commands}")
+            print(f"  已發送: ACK {outbound.sent[0]}, 重送 {outbound.sent[1]}, 指令 {outbound.sent[2]}, "
+                  f"失敗 {sum(outbound.failed)}, 放棄重送 {outbound.expired}")
+            print(f"  {outbound.stats_summary()}")
+            print(f"  待確認指令: {len(outbound.awaiting)}, ACK 往返: {outbound.ack_rtt.summary()}")
+            for (ip, port), count in outbound.controller_depths().items():
+                print(f"    {ip}:{port} 待送 {count}")
+        for name, delivered, pending, dropped, errors in self.center.bus.stats():
+            print(f"  訂閱者 {name}: 已處理 {delivered}, 佇列 {pending}, 丟棄 {dropped}, 錯誤 {errors}")
+        step_store = self.center.step_store
+        print(f"  步階記錄: {len(step_store.series)} 個控制器, "
+              f"{sum(len(series) for series in list(step_store.series.values()))} 筆")
+        log_stats = logging_stats(self.mode)
+        if log_stats:
+            print(f"  日誌佇列: {log_stats[0]} 筆, 已丟棄 {log_stats[1]}")
+        for line in self.center.parser.errors.summary():
+            print(f"  {line}")
+        quarantine_stats = logging_stats("quarantine")
+        if quarantine_stats:
+            print(f"  隔離檔佇列: {quarantine_stats[0]} 筆, 已丟棄 {quarantine_stats[1]}")
 
         
 
-
-
-
-
-
-
+    def _show_steps(self, args):
+        """顯示控制器的 5F03 步階時序（最近的週期長度與各分相綠燈秒數）"""
+        if not args or not args[0].isdigit():
+            print("用法: steps <控制器編號>")
+            return
+        tc_id = int(args[0])
+        series = self.center.step_store.get(tc_id)
+        if series is None or not len(series):
+            print(f"TC{tc_id:03d} 尚無步階記錄")
+            return
+        print(f"TC{tc_id:03d} 步階記錄 {len(series)} 筆")
+        cycles = series.cycle_lengths()
+        if cycles:
+            print(f"  週期長度(秒): {', '.join(f'{value:.1f}' for value in cycles[-STEPS_SHOW_LAST:])}")
+        greens = series.green_durations()
+        if greens:
+            print(f"  綠燈秒數: {', '.join(f'分相{sub} {value:.1f}' for sub, value in greens[-STEPS_SHOW_LAST:])}")
+        for timestamp_ns, phase_order, sub_phase, step, step_sec in series.step_history(STEPS_SHOW_LAST):
+            print(f"  時相 0x{phase_order:02X} 分相 {sub_phase} 步階 {step} ({step_sec}s)")
+
+    def _export_steps(self, args):
+        """匯出步階時序為 .npz"""
+        path = args[0] if args else STEPS_EXPORT_PATH
+        step_store = self.center.step_store
+        try:
+            step_store.export_npz(path)
+        except OSError as e:
+            print(f"匯出失敗: {e}")
+            return
+        print(f"已匯出 {len(step_store.series)} 個控制器的步階記錄: {path}")
@@ -0,0 +1,177 @@
+"""
+封包訂閱分派（pub/sub bus）
+
+消費者以（指令碼集合, 控制器集合）過濾條件訂閱已解析的封包：
+- 分派依 (cmd_key, tc_id) 查預先計算的訂閱者列表，不逐一比對過濾條件；
+  訂閱或取消訂閱時以新的空表替換（copy-on-write），各鍵於第一次出現時計算
+- 每個訂閱者收到同一個 Packet 物件（不複製），訂閱者不應修改封包
+- queue_size > 0 的訂閱者有自己的有界佇列與執行緒，慢的訂閱者不影響接收執行緒與其他訂閱者；
+  佇列滿時丟棄並計數
+- queue_size = 0 的訂閱者直接在接收執行緒呼叫（只用於固定且極短的處理，例如步階記錄）
+"""
+
+import queue
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from config.log_setup import get_logger
+
+# 訂閱者預設佇列上限（筆）
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+_STOP = object()
+
+
+def _cmd_key(cmd_code: Union[str, int]) -> int:
+    """指令碼（"5F03" 或 0x5F03）-> cmd_key"""
+    return int(cmd_code, 16) if isinstance(cmd_code, str) else cmd_code
+
+
+class Subscription:
+    """單一訂閱"""
+
+    def __init__(self, callback: Callable, cmd_keys: Optional[frozenset], tc_ids: Optional[frozenset],
+                 queue_size: int, name: str, logger):
+        self.callback = callback
+        self.cmd_keys = cmd_keys        # None 表示全部指令
+        self.tc_ids = tc_ids            # None 表示全部控制器
+        self.name = name
+        self.logger = logger
+
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.reported = 0               # 已記錄警告的丟棄筆數
+
+        self.queue: Optional[queue.Queue] = None
+        self.thread = None
+        if queue_size > 0:
+            self.queue = queue.Queue(queue_size)
+            self.thread = threading.Thread(target=self._run, name=f"Subscriber-{name}", daemon=True)
+            self.thread.start()
+            self.deliver = self._enqueue
+        else:
+            self.deliver = self._call
+
+    def matches(self, cmd_key: int, tc_id: int) -> bool:
+        """是否符合過濾條件"""
+        return ((self.cmd_keys is None or cmd_key in self.cmd_keys)
+                and (self.tc_ids is None or tc_id in self.tc_ids))
+
+    def _call(self, packet):
+        """呼叫訂閱者（例外只計數與記錄，不影響其他訂閱者）"""
+        try:
+            self.callback(packet)
+            self.delivered += 1
+        except Exception as e:
+            self.errors += 1
+            self.logger.error(f"訂閱者 {self.name} 處理 {packet.cmd_code} 失敗: {e}")
+
+    def _enqueue(self, packet):
+        """放入訂閱者佇列（滿時丟棄並計數，不阻塞）"""
+        try:
+            self.queue.put_nowait(packet)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped - self.reported >= self.queue.maxsize:
+                self.logger.warning(f"訂閱者 {self.name} 佇列已滿，累計丟棄 {self.dropped} 筆")
+                self.reported = self.dropped
+
+    def _run(self):
+        """訂閱者執行緒"""
+        get = self.queue.get
+        call = self._call
+        while True:
+            packet = get()
+            if packet is _STOP:
+                break
+            call(packet)
+
+    def pending(self) -> int:
+        """佇列中筆數"""
+        return self.queue.qsize() if self.queue else 0
+
+    def stop(self, timeout: float = 1.0):
+        """停止訂閱者執行緒（處理完佇列中已有的封包）"""
+        if self.thread is None:
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self.logger.warning(f"訂閱者 {self.name} 佇列未清空，捨棄 {self.pending()} 筆")
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        self.thread = None
+
+
+class PacketBus:
+    """封包訂閱分派"""
+
+    def __init__(self, mode: str = "receive"):
+        self.logger = get_logger(f"tc.{mode}")
+        self.subscriptions: Tuple[Subscription, ...] = ()
+        # (cmd_key, tc_id) -> 訂閱者 deliver 函數列表（依需要計算）
+        self.routes: Dict[Tuple[int, int], Tuple[Callable, ...]] = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, callback: Callable, cmd_codes: Optional[Iterable[Union[str, int]]] = None,
+                  tc_ids: Optional[Iterable[int]] = None, queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+                  name: Optional[str] = None) -> Subscription:
+        """
+        訂閱封包
+
+        Args:
+            callback: 訂閱者（packet -> None）
+            cmd_codes: 指令碼（"5F03" 或 0x5F03），None 表示全部
+            tc_ids: 控制器編號，None 表示全部
+            queue_size: 佇列上限（0 表示在接收執行緒直接呼叫）
+            name: 名稱（日誌與狀態顯示）
+
+        Returns:
+            Subscription（取消訂閱用）
+        """
+        subscription = Subscription(
+            callback,
+            frozenset(_cmd_key(code) for code in cmd_codes) if cmd_codes is not None else None,
+            frozenset(tc_ids) if tc_ids is not None else None,
+            queue_size,
+            name or getattr(callback, "__qualname__", repr(callback)),
+            self.logger,
+        )
+        with self.lock:
+            self.subscriptions += (subscription,)
+            self.routes = {}
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """取消訂閱（處理完佇列中已有的封包）"""
+        with self.lock:
+            self.subscriptions = tuple(s for s in self.subscriptions if s is not subscription)
+            self.routes = {}
+        subscription.stop()
+
+    def publish(self, packet):
+        """分派封包給符合條件的訂閱者"""
+        routes = self.routes
+        key = (packet.cmd_key, packet.tc_id)
+        targets = routes.get(key)
+        if targets is None:
+            targets = routes[key] = self._route(*key)
+        for deliver in targets:
+            deliver(packet)
+
+    def _route(self, cmd_key: int, tc_id: int) -> Tuple[Callable, ...]:
+        """計算符合 (cmd_key, tc_id) 的訂閱者"""
+        return tuple(s.deliver for s in self.subscriptions if s.matches(cmd_key, tc_id))
+
+    def stop(self):
+        """停止所有訂閱者執行緒"""
+        with self.lock:
+            subscriptions, self.subscriptions = self.subscriptions, ()
+            self.routes = {}
+        for subscription in subscriptions:
+            subscription.stop()
+
+    def stats(self) -> List[Tuple[str, int, int, int, int]]:
+        """各訂閱者 (名稱, 已處理, 佇列中, 丟棄, 錯誤)"""
+        return [(s.name, s.delivered, s.pending(), s.dropped, s.errors) for s in self.subscriptions]
@@ -0,0 +1,185 @@
+"""
+原始流量擷取檔
+
+接收執行緒將收到的原始 datagram（切割成幀之前）連同接收時間與來源地址附加到二進制檔，
+供 benchmark/replay.py 以原速、N 倍速或最快速度重播，重現現場負載。
+
+檔案格式（little endian）：
+    標頭 16 bytes: magic(4) "TCCP" version(2) 保留(2) 建立時間 ns(8)
+    記錄: receive_ns(8) ipv4(4) port(2) length(2) data(length)
+
+- 寫入端以大緩衝區附加，不逐筆 flush；程序異常結束時最後一筆可能不完整，讀取端略過，
+  寫入端重新開啟時檢查標頭並截掉不完整的尾端後再附加
+- 讀取端以 mmap 存取，不預先讀入或建立索引，數 GB 的檔案也可立即開始
+"""
+
+import mmap
+import os
+import socket
+import struct
+import time
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+MAGIC = b"TCCP"
+VERSION = 1
+
+FILE_HEADER = struct.Struct("<4sHHq")
+RECORD_HEADER = struct.Struct("<q4sHH")
+
+# 寫入緩衝區大小（bytes）
+WRITE_BUFFER = 1 << 20
+
+_NO_ADDR = b"\x00\x00\x00\x00"
+
+
+class CaptureRecord(NamedTuple):
+    """擷取檔中的一筆 datagram"""
+    receive_ns: int                 # 接收時間（time.time_ns）
+    addr: Tuple[str, int]           # 來源地址
+    data: bytes
+
+
+def _check_header(data, path: str):
+    """檢查檔案標頭，返回建立時間 ns"""
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"不是擷取檔: {path}")
+    magic, version, _, created_ns = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"不是擷取檔或版本不符: {path}")
+    return created_ns
+
+
+def _complete_end(data, size: int) -> int:
+    """最後一筆完整記錄的結尾位置（之後的 bytes 為中斷時寫到一半的記錄）"""
+    unpack = RECORD_HEADER.unpack_from
+    header_size = RECORD_HEADER.size
+    offset = FILE_HEADER.size
+    while offset + header_size <= size:
+        end = offset + header_size + unpack(data, offset)[3]
+        if end > size:
+            break
+        offset = end
+    return offset
+
+
+class CaptureWriter:
+    """擷取檔寫入者（接收執行緒使用）"""
+
+    def __init__(self, path: str):
+        """
+        開啟擷取檔（已存在時附加）
+
+        已存在的檔案先檢查標頭，並截掉最後一筆不完整的記錄（上次程序異常結束），
+        避免之後附加的記錄從錯誤的位置開始而無法讀取。
+
+        Args:
+            path: 擷取檔路徑
+
+        Raises:
+            ValueError: 已存在的檔案不是擷取檔或版本不符
+        """
+        self.path = path
+        # 開啟時截掉的不完整尾端（bytes）
+        self.truncated = 0
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.truncated = self._repair(path)
+        self.file = open(path, "ab", buffering=WRITE_BUFFER)
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, VERSION, 0, time.time_ns()))
+        self.records = 0
+        self.bytes = 0
+
+    @staticmethod
+    def _repair(path: str) -> int:
+        """檢查既有檔案並截到最後一筆完整記錄，返回截掉的 bytes"""
+        with open(path, "r+b") as f:
+            size = os.fstat(f.fileno()).st_size
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _check_header(data, path)
+                end = _complete_end(data, size)
+            if end < size:
+                f.truncate(end)
+        return size - end
+
+    def record(self, data: bytes, addr: Optional[Tuple[str, int]], receive_ns: Optional[int] = None):
+        """附加一筆 datagram"""
+        if self.file is None:
+            return
+        ip, port = _NO_ADDR, 0
+        if addr:
+            try:
+                ip, port = socket.inet_aton(addr[0]), addr[1]
+            except OSError:
+                pass
+        write = self.file.write
+        write(RECORD_HEADER.pack(receive_ns or time.time_ns(), ip, port, len(data)))
+        write(data)
+        self.records += 1
+        self.bytes += RECORD_HEADER.size + len(data)
+
+    def flush(self):
+        if self.file:
+            self.file.flush()
+
+    def close(self):
+        """寫出緩衝區並關閉"""
+        if self.file:
+            self.file.close()
+            self.file = None
+
+
+class CaptureReader:
+    """擷取檔讀取者（mmap）"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: 擷取檔路徑
+
+        Raises:
+            ValueError: 不是擷取檔或版本不符
+        """
+        self.path = path
+        self.size = os.path.getsize(path)
+        if self.size < FILE_HEADER.size:
+            raise ValueError(f"不是擷取檔: {path}")
+
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.created_ns = _check_header(self.map, path)
+        except ValueError:
+            self.map.close()
+            raise
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        return self.records()
+
+    def records(self) -> Iterator[CaptureRecord]:
+        """依序讀取記錄（最後一筆不完整時停止）"""
+        data = self.map
+        size = self.size
+        unpack = RECORD_HEADER.unpack_from
+        header_size = RECORD_HEADER.size
+        addrs = {}
+        offset = FILE_HEADER.size
+        while offset + header_size <= size:
+            receive_ns, ip, port, length = unpack(data, offset)
+            start = offset + header_size
+            end = start + length
+            if end > size:
+                break
+            addr = addrs.get((ip, port))
+            if addr is None:
+                addr = addrs[(ip, port)] = (socket.inet_ntoa(ip), port)
+            yield CaptureRecord(receive_ns, addr, data[start:end])
+            offset = end
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -4,6 +4,7 @@
 """
 
 import threading
+import time
 import binascii
 from typing import Tuple, Optional, Set
 
@@ -11,6 +12,10 @@ from packet.packet_parser import PacketParser
 from packet.packet_builder import PacketBuilder
 from packet.packet_processor import PacketProcessor
 from packet.packet_definition import PacketDefinition
+from packet.step_store import StepStore
+from packet.outbound import OutboundScheduler
+from packet.bus import PacketBus
+from packet.metrics import Metrics
 
 from utils import encode
 from config.log_setup import get_logger
@@ -20,19 +25,40 @@ from config.log_setup import get_logger
 class PacketCenter:
     """封包處理中心"""
     
-    def __init__(self, mode="receive", network=None, config=None, tc_id=None, logger=None):
+    def __init__(self, mode="receive", network=None, config=None, tc_id=None, logger=None, publisher=None,
+                 ring=None, rate_limiter=None, log_format="text", quarantine=None):
         
         self.logger = get_logger(f"tc.{mode}")
         
         self.packet_def = PacketDefinition()
         
         # 將 packet_def 注入到各個組件
-        self.parser = PacketParser(mode=mode, packet_def=self.packet_def)
+        self.parser = PacketParser(mode=mode, packet_def=self.packet_def, quarantine=quarantine)
         self.builder = PacketBuilder(packet_def=self.packet_def)
-        self.processor = PacketProcessor(mode=mode, packet_def=self.packet_def)
+        self.processor = PacketProcessor(mode=mode, packet_def=self.packet_def, output=log_format)
+        
+        # 5F03 步階轉換時序資料
+        self.step_store = StepStore()
+        
+        # 封包訂閱分派：依（指令碼, 控制器）過濾，步階記錄在接收執行緒直接呼叫（不受日誌過濾影響）
+        self.bus = PacketBus(mode=mode)
+        self.bus.subscribe(self.step_store.record, cmd_codes=["5F03"], queue_size=0, name="步階記錄")
         
         self.network = network
         self.config = config  
+        
+        # 接收路徑計數（datagram / 幀 / 控制器最後收到 / ACK 回覆延遲）
+        self.metrics = Metrics()
+
+        # 發送排程：ACK > 重送 > 指令，由發送執行緒送出（指令受 rate_limiter 限速，ACK 送出後記錄回覆延遲）
+        self.outbound = OutboundScheduler(network, mode=mode, rate_limiter=rate_limiter,
+                                          ack_latency=self.metrics.ack_latency) if network else None
+        
+        # 已驗證幀的 multicast 轉發（ingest 程序使用）
+        self.publisher = publisher
+        
+        # 同機旁路程序使用的共享記憶體環狀緩衝區（ShmRingWriter）
+        self.ring = ring
         self.tc_id = tc_id    
         
         self.seq = 0
@@ -54,24 +80,25 @@ class PacketCenter:
             self.seq = (self.seq + 1) & 0xFF
             return self.seq
 
-    def send(self, frame: bytes, addr: Tuple[str, int], description: str = "") -> bool:
+    def send(self, frame: bytes, addr: Tuple[str, int], description: str = "", seq: Optional[int] = None) -> bool:
         """
-        發送封包
+        發送封包（排入發送排程的指令佇列）
         
         Args:
             frame: 封包字節數據
             addr: 發送地址 (ip, port)
             description: 封包描述（用於日誌）
+            seq: 指令 SEQ（逾時未收到 ACK 時重送）
             
         Returns:
-            是否發送成功
+            是否已排入發送
         """
         if not self.network:
             self.logger.error("網路未初始化")
             return False
         
         try:
-            if self.network.send_data(frame, addr):
+            if self.outbound.send_command(frame, addr, seq):
 
 
                 frame_hex = binascii.hexlify(frame).decode('ascii').upper()
@@ -118,26 +145,47 @@ class PacketCenter:
         # 獲取發送地址（用於 send 方法）
         addr = (self.config.get_tc_ip(), self.config.get_tc_port())
         
+        # 先登記待確認 seq，發送執行緒送出後 ACK 可能立即回到接收執行緒
+        with self.seq_lock:
+            self.pending_seqs.add(seq)
+        
         # 發送封包
-        if self.send(frame, addr, f"{description} (SEQ: {seq})"):
-            with self.seq_lock:
-                self.pending_seqs.add(seq)
-            return seq           
+        if self.send(frame, addr, f"{description} (SEQ: {seq})", seq=seq):
+            return seq
+        
+        with self.seq_lock:
+            self.pending_seqs.discard(seq)
+        self.outbound.acknowledge(seq)
         return None
 
-    def process(self, packet, addr):
+    def process(self, packet, addr, received_ns: Optional[int] = None):
         """
         處理封包並發送ACK 接收線程用
         
         Args:
             packet: 解析後的封包對象 Packet 類型
             addr: 發送地址 (ip, port)
+            received_ns: receive_data 返回時的 perf_counter_ns（ACK 回覆延遲與控制器最後收到時間）
         """
         if not packet:
             return False
+        
+        if received_ns is None:
+            received_ns = time.perf_counter_ns()
+        self.metrics.last_seen[packet.tc_id] = received_ns
+
+        # 轉發原始幀給 multicast 訂閱者（解析成功即為已驗證）
+        if self.publisher:
+            self.publisher.publish(packet.frame)
+        
+        # 寫入共享記憶體環狀緩衝區（固定成本，不等待讀取者）
+        if self.ring:
+            self.ring.publish_packet(packet)
 
         # 如果是ACK封包，檢查是否對應待確認的seq
         if packet.reply_type == "ACK":
+            if self.outbound:
+                self.outbound.acknowledge(packet.seq)
             with self.seq_lock:
                 if packet.seq in self.pending_seqs:                   
 
@@ -149,14 +197,11 @@ class PacketCenter:
                     self.pending_seqs.remove(packet.seq)
             return True
 
-        # 處理封包
-        self.processor.process(packet)
-
         ack_frame = encode(packet.seq, packet.tc_id, b"")
         
-        # 靜默發送ACK（不顯示日誌）
-        if self.network:
-            self.network.send_data(ack_frame, addr)
+        # 靜默發送ACK（排入最高優先佇列，先於解析顯示，不顯示日誌，multicast 訂閱端由 ingest 回覆）
+        if self.network and self.network.sends_ack:
+            self.outbound.send_ack(ack_frame, addr, received_ns)
             #ack_frame_hex = binascii.hexlify(ack_frame).decode('ascii').upper()
             #self.logger.info("="*60)
             #self.logger.info(f"ACK封包內容: {ack_frame_hex}")
@@ -164,6 +209,12 @@ class PacketCenter:
             #self.logger.info(f"對應指令: {packet.cmd_code}")
             #self.logger.info("="*60)
 
+        # 分派給訂閱者（同一個封包物件）
+        self.bus.publish(packet)
+
+        # 處理封包
+        self.processor.process(packet)
+
         return True
 
 
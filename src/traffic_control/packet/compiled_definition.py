@@ -0,0 +1,308 @@
+"""
+編譯後的封包定義
+
+PacketDefinition 啟動時將 definitions/ 中的原始 dict 編譯為不可變物件：
+字段名稱索引、固定位置與大小、已解析的 FIELD_TYPES 函數、預先計算的
+映射表、日誌模式位元遮罩、長度規則與字段記錄類型。
+接收熱路徑只讀取屬性，不再查詢原始 dict。
+
+原始 dict 中其餘鍵（steps、format、example 等）仍可透過 get() / [] 讀取。
+"""
+
+import ast
+import operator
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from packet.field_record import make_record_type
+
+# 日誌模式位元
+MODE_BITS = {
+    "receive": 0x01,
+    "command": 0x02,
+    "relay": 0x04,
+}
+
+# 群組名稱 -> 群組碼
+GROUP_CODES = {
+    "5F": 0x5F,
+    "0F": 0x0F,
+}
+
+
+def mode_bit(mode: str) -> int:
+    """模式名稱轉換為日誌模式位元（未知模式為 0）"""
+    return MODE_BITS.get(mode, 0)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledField:
+    """編譯後的字段定義"""
+    name: str
+    position: int                      # 在字段列表中的位置（記錄的位置索引）
+    index: Optional[int]               # PAYLOAD 固定位置（None 表示緊接前一字段）
+    type: str
+    size: Optional[int]                # 單一值 bytes 數（FIELD_TYPES.size）
+    item_type: Optional[str]
+    item_size: Optional[int]
+    builder: Optional[Callable]        # 值 -> bytes（list 為單一項目的 builder）
+    count_from: Optional[Callable]
+    mapping: Any                       # 原始映射（dict 或函數）
+    mapping_table: Optional[Tuple]     # 0x00~0xFF 預先映射結果
+    post_process: Optional[Callable]
+    raw: Mapping[str, Any]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """讀取原始定義（與 dict.get 相同語意）"""
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.raw[key]
+
+    def map_value(self, value: Any) -> Any:
+        """應用字段映射"""
+        if value is None or self.mapping is None:
+            return value
+        table = self.mapping_table
+        if table is not None and 0 <= value < len(table):
+            return table[value]
+        return _apply_mapping(self.mapping, value)
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledDefinition:
+    """編譯後的指令定義"""
+    cmd_code: str
+    cmd_key: int
+    name: Optional[str]
+    reply_type: Optional[str]
+    needs_ack: bool
+    group_code: Optional[int]
+    command: Optional[int]
+    fields: Tuple[CompiledField, ...]
+    field_map: Mapping[str, CompiledField]
+    log_mask: int
+    suppress_repeats: bool
+    min_length: int
+    max_length: Optional[int]
+    length_error: Optional[str]
+    record_type: type
+    raw: Mapping[str, Any]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """讀取原始定義（與 dict.get 相同語意）"""
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.raw[key]
+
+    def logs_in(self, bit: int) -> bool:
+        """是否在指定模式位元下記錄日誌"""
+        return bool(self.log_mask & bit)
+
+    def check_length(self, payload_length: int) -> Optional[str]:
+        """
+        依 validation 檢查 PAYLOAD 長度
+
+        Returns:
+            錯誤訊息（不符合時）或 None
+        """
+        if payload_length < self.min_length or (
+                self.max_length is not None and payload_length > self.max_length):
+            return self.length_error
+        return None
+
+
+# ============= 編譯 =============
+#
+# 編譯分兩段：
+#   build_spec   原始 dict -> 編譯規格（映射表為較耗時的計算，可由快取提供）
+#   instantiate  規格 -> CompiledDefinition（解析 FIELD_TYPES、計數表達式、記錄類型）
+
+def compile_definition(cmd_code: str, definition: Dict[str, Any],
+                       field_types: Dict[str, Dict[str, Any]]) -> CompiledDefinition:
+    """將原始定義 dict 編譯為 CompiledDefinition"""
+    return instantiate(build_spec(cmd_code, definition), field_types)
+
+
+def build_spec(cmd_code: str, definition: Dict[str, Any],
+               mapping_tables: Optional[Mapping[str, Tuple]] = None) -> Dict[str, Any]:
+    """
+    將原始定義轉換為編譯規格
+
+    Args:
+        mapping_tables: 快取的映射表 {字段名稱: 映射表}（沒有的字段重新計算）
+    """
+    min_length, max_length, length_error = 0, None, None
+    validation = definition.get("validation")
+    if validation:
+        value = validation.get("value", 0)
+        length_error = validation.get("error_message", f"{cmd_code}資料長度錯誤")
+        if validation.get("type") == "exact_length":
+            min_length, max_length = value, value
+        elif validation.get("type") == "min_length":
+            min_length = value
+
+    log_mask = 0
+    for mode in definition.get("log_modes", []):
+        if mode not in MODE_BITS:
+            raise ValueError(f"{cmd_code} log_modes 含未知模式: {mode}（可用: {', '.join(MODE_BITS)}）")
+        log_mask |= MODE_BITS[mode]
+
+    fields = []
+    for position, field in enumerate(definition.get("fields", [])):
+        field_type = field.get("type", "uint8")
+        count_from = field.get("count_from")
+        if isinstance(count_from, str):
+            compile_count_expression(count_from)  # 提早檢查語法
+
+        mapping = field.get("mapping")
+        mapping_table = None
+        if mapping is not None and field_type == "uint8":
+            mapping_table = (mapping_tables or {}).get(field["name"])
+            if mapping_table is None:
+                mapping_table = tuple(_apply_mapping(mapping, value) for value in range(256))
+
+        fields.append({
+            "name": field["name"],
+            "position": position,
+            "index": field.get("index"),
+            "type": field_type,
+            "item_type": field.get("item_type", "uint8") if field_type == "list" else None,
+            "count_from": count_from,
+            "mapping": mapping,
+            "mapping_table": mapping_table,
+            "post_process": field.get("post_process"),
+            "raw": field,
+        })
+
+    return {
+        "cmd_code": cmd_code,
+        "cmd_key": int(cmd_code, 16),
+        "name": definition.get("name"),
+        "reply_type": definition.get("reply_type"),
+        "needs_ack": definition.get("needs_ack", False),
+        "group_code": GROUP_CODES.get(definition.get("group")),
+        "command": definition.get("command"),
+        "fields": fields,
+        "log_mask": log_mask,
+        "suppress_repeats": bool(definition.get("suppress_repeats")),
+        "min_length": min_length,
+        "max_length": max_length,
+        "length_error": length_error,
+        "raw": definition,
+    }
+
+
+def mapping_tables(spec: Dict[str, Any]) -> Dict[str, Tuple]:
+    """編譯規格中的映射表 {字段名稱: 映射表}（寫入快取用）"""
+    return {field["name"]: field["mapping_table"] for field in spec["fields"] if field["mapping_table"] is not None}
+
+
+def instantiate(spec: Dict[str, Any], field_types: Dict[str, Dict[str, Any]]) -> CompiledDefinition:
+    """由編譯規格建立 CompiledDefinition"""
+    fields = tuple(_instantiate_field(field, field_types) for field in spec["fields"])
+
+    return CompiledDefinition(
+        cmd_code=spec["cmd_code"],
+        cmd_key=spec["cmd_key"],
+        name=spec["name"],
+        reply_type=spec["reply_type"],
+        needs_ack=spec["needs_ack"],
+        group_code=spec["group_code"],
+        command=spec["command"],
+        fields=fields,
+        field_map=MappingProxyType({field.name: field for field in fields}),
+        log_mask=spec["log_mask"],
+        suppress_repeats=spec["suppress_repeats"],
+        min_length=spec["min_length"],
+        max_length=spec["max_length"],
+        length_error=spec["length_error"],
+        record_type=make_record_type(spec["cmd_code"], [field.name for field in fields]),
+        raw=MappingProxyType(spec["raw"]),
+    )
+
+
+def _instantiate_field(spec: Dict[str, Any], field_types: Dict[str, Dict[str, Any]]) -> CompiledField:
+    """由字段規格建立 CompiledField"""
+    type_def = field_types.get(spec["type"]) or {}
+    item_type = spec["item_type"]
+    item_def = (field_types.get(item_type) or {}) if item_type else {}
+
+    count_from = spec["count_from"]
+    if isinstance(count_from, str):
+        count_from = compile_count_expression(count_from)
+
+    return CompiledField(
+        name=spec["name"],
+        position=spec["position"],
+        index=spec["index"],
+        type=spec["type"],
+        size=type_def.get("size", 1) if type_def else None,
+        item_type=item_type,
+        item_size=item_def.get("size", 1) if item_def else None,
+        builder=(item_def if item_type else type_def).get("builder"),
+        count_from=count_from,
+        mapping=spec["mapping"],
+        mapping_table=spec["mapping_table"],
+        post_process=spec["post_process"],
+        raw=MappingProxyType(spec["raw"]),
+    )
+
+
+# ============= 計數表達式 =============
+
+_BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv,
+}
+
+
+@lru_cache(maxsize=None)
+def compile_count_expression(expression: str) -> Callable[[Mapping[str, Any]], int]:
+    """
+    編譯計數表達式為函數
+
+    支援字段名稱、整數常數與 + - * //，字段未解析時視為 0
+    例如 "岔路數目 * 綠燈分相數目"、"綠燈分相數目 * 6"
+
+    Raises:
+        ValueError: 表達式含不支援的語法
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"計數表達式語法錯誤: {expression} ({e})")
+    return _compile_node(tree.body, expression)
+
+
+def _compile_node(node: ast.AST, expression: str) -> Callable[[Mapping[str, Any]], int]:
+    """將 AST 節點轉換為函數"""
+    if isinstance(node, ast.Name):
+        name = node.id
+        return lambda fields: fields.get(name) or 0
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, int):
+        value = node.value
+        return lambda fields: value
+
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+        op = _BINARY_OPERATORS[type(node.op)]
+        left = _compile_node(node.left, expression)
+        right = _compile_node(node.right, expression)
+        return lambda fields: op(left(fields), right(fields))
+
+    raise ValueError(f"計數表達式不支援的語法: {expression}")
+
+
+def _apply_mapping(mapping: Any, value: int) -> Any:
+    """應用 dict 或函數映射"""
+    if isinstance(mapping, dict):
+        return mapping.get(value, f"未知(0x{value:02X})")
+    if callable(mapping):
+        return mapping(value)
+    return value
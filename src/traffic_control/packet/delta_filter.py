@@ -0,0 +1,68 @@
+"""
+重複回報過濾器
+
+號誌控制器會持續主動回報（5F03/5F0C/0F04），多數內容與上一筆相同。
+以 (控制器, 指令鍵) 為鍵記錄上一筆 PAYLOAD，內容未變化時略過格式化與日誌，
+並定期彙總回報略過的筆數。ACK 由 PacketCenter 照常發送，不受影響。
+"""
+
+import time
+from typing import Dict, Tuple, Optional
+
+
+class DeltaFilter:
+    """重複回報過濾器"""
+
+    def __init__(self, report_interval: float = 60.0):
+        """
+        初始化過濾器
+
+        Args:
+            report_interval: 略過筆數彙總回報間隔（秒）
+        """
+        self.report_interval = report_interval
+
+        # (tc_id, cmd_key) -> 上一筆 PAYLOAD
+        self.last_payloads: Dict[Tuple[int, int], bytes] = {}
+
+        # (tc_id, cmd_key) -> 本期間略過筆數
+        self.suppressed: Dict[Tuple[int, int], int] = {}
+
+        self.last_report = time.monotonic()
+
+    def is_repeat(self, packet) -> bool:
+        """判斷封包內容是否與該控制器同指令的上一筆相同"""
+        key = (packet.tc_id, packet.cmd_key)
+        payload = packet.payload
+
+        if self.last_payloads.get(key) == payload:
+            self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            return True
+
+        self.last_payloads[key] = payload
+        return False
+
+    def reset(self, tc_id: Optional[int] = None):
+        """清除比對基準（指定控制器或全部）"""
+        if tc_id is None:
+            self.last_payloads.clear()
+            return
+        for key in [key for key in self.last_payloads if key[0] == tc_id]:
+            del self.last_payloads[key]
+
+    def collect_report(self) -> Optional[str]:
+        """到達回報間隔時返回略過筆數彙總，並重新計數"""
+        now = time.monotonic()
+        if now - self.last_report < self.report_interval:
+            return None
+
+        self.last_report = now
+        if not self.suppressed:
+            return None
+
+        parts = [
+            f"TC{tc_id:03d} {cmd_key:04X} x{count}"
+            for (tc_id, cmd_key), count in sorted(self.suppressed.items())
+        ]
+        self.suppressed.clear()
+        return f"略過重複回報: {', '.join(parts)}"
@@ -0,0 +1,106 @@
+"""
+字段記錄
+
+為每個指令碼產生一個 __slots__ 記錄類型，以位置存放解析後的字段值，
+並提供按名稱存取（get / [] / 屬性），只有需要時才轉換為 dict。
+"""
+
+from typing import Any, Dict, List, Tuple
+
+
+class FieldRecord:
+    """字段記錄基類（子類由 make_record_type 產生）"""
+    __slots__ = ()
+
+    # 子類填入
+    _names: Tuple[str, ...] = ()          # 原始字段名稱（定義順序）
+    _attrs: Dict[str, str] = {}           # 字段名稱 -> slot 名稱
+    _setters: Tuple[Any, ...] = ()        # 位置 -> slot descriptor
+
+    def __init__(self):
+        for setter in self._setters:
+            setter.__set__(self, None)
+
+    def __setitem__(self, key, value):
+        """按位置（int）或名稱（str）寫入"""
+        if isinstance(key, int):
+            self._setters[key].__set__(self, value)
+        else:
+            setattr(self, self._attrs[key], value)
+
+    def __getitem__(self, key):
+        """按位置（int）或名稱（str）讀取"""
+        if isinstance(key, int):
+            return self._setters[key].__get__(self)
+        attr = self._attrs.get(key)
+        if attr is None:
+            raise KeyError(key)
+        return getattr(self, attr)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """按名稱讀取（與 dict.get 相同語意）"""
+        attr = self._attrs.get(name)
+        if attr is None:
+            return default
+        return getattr(self, attr)
+
+    def __contains__(self, name) -> bool:
+        return name in self._attrs
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def keys(self):
+        return self._names
+
+    def values(self) -> List[Any]:
+        return [setter.__get__(self) for setter in self._setters]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        return list(zip(self._names, self.values()))
+
+    def as_dict(self) -> Dict[str, Any]:
+        """轉換為 dict（中文字段名 -> 值）"""
+        return dict(zip(self._names, self.values()))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.as_dict()!r})"
+
+
+class EmptyRecord(FieldRecord):
+    """無字段定義（未定義指令或 ACK）"""
+    __slots__ = ()
+
+
+EMPTY_RECORD = EmptyRecord()
+
+
+def make_record_type(cmd_code: str, field_names: List[str]) -> type:
+    """
+    產生指令碼專用的記錄類型
+
+    Args:
+        cmd_code: 指令碼（用於類型名稱）
+        field_names: 字段名稱（定義順序）
+
+    Returns:
+        FieldRecord 子類
+    """
+    attrs = {}
+    for i, name in enumerate(field_names):
+        attrs[name] = name if name.isidentifier() and not name.startswith("_") else f"_f{i}"
+
+    slot_names = tuple(attrs[name] for name in field_names)
+    record_type = type(
+        f"Record{cmd_code}",
+        (FieldRecord,),
+        {"__slots__": slot_names},
+    )
+    record_type._names = tuple(field_names)
+    record_type._attrs = attrs
+    record_type._setters = tuple(record_type.__dict__[slot] for slot in slot_names)
+    return record_type
+
@@ -0,0 +1,120 @@
+"""
+錯誤幀統計與隔離
+
+PacketParser 只在失敗的分支呼叫 FrameErrors.record（正常幀不經過任何統計程式碼，無錯誤時零成本）：
+- 依（控制器, 原因）累計筆數，status 顯示
+- 設定隔離檔（config.log_setup.setup_quarantine）時，原始幀連同原因記錄到隔離檔；
+  記錄為延遲格式化物件，十六進制轉換與寫入都在背景執行緒，佇列滿時丟棄並計數
+
+控制器編號取自幀的 ADDR 字段（幀太短時為 -1；損毀的幀 ADDR 也可能損毀）。
+轉發模式的上行、下行執行緒共用同一個 FrameErrors，計數在鎖內更新（只在錯誤分支取得鎖）。
+"""
+
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from utils import FrameError, decode
+
+# 原因 -> 說明
+REASONS = {
+    "short": "長度不足",
+    "format": "格式錯誤",
+    "checksum": "校驗和錯誤",
+    "truncated": "幀不完整",
+    "length": "PAYLOAD 長度不符定義",
+    "unknown": "未定義指令碼",
+    "field": "字段解析失敗",
+}
+
+UNKNOWN_TC = -1
+
+
+def frame_addr(frame: bytes) -> int:
+    """幀的 ADDR 字段（長度不足時返回 -1）"""
+    return int.from_bytes(frame[3:5], "big") if len(frame) >= 5 else UNKNOWN_TC
+
+
+def classify(frame: bytes) -> Tuple[str, str]:
+    """未通過快速驗證（utils.verify_frame）的幀的原因與說明（只在錯誤分支呼叫）"""
+    try:
+        decode(frame)
+    except FrameError as e:
+        return e.reason, str(e)
+    return "format", "LEN 字段與幀長度不符"
+
+
+class QuarantineEntry:
+    """隔離檔的一筆記錄（寫出時才格式化）"""
+
+    __slots__ = ("reason", "tc_id", "detail", "frame")
+
+    def __init__(self, reason: str, tc_id: int, detail: str, frame: bytes):
+        self.reason = reason
+        self.tc_id = tc_id
+        self.detail = detail
+        self.frame = frame
+
+    def __str__(self):
+        return f"{self.reason} TC{self.tc_id:03d} {self.detail} | {self.frame.hex().upper()}"
+
+
+class FrameErrors:
+    """錯誤幀計數（接收 / 轉發執行緒在鎖內寫入，其他執行緒讀取快照）"""
+
+    def __init__(self, quarantine: Optional[logging.Logger] = None):
+        """
+        Args:
+            quarantine: 隔離檔 logger（None 表示只計數）
+        """
+        self.quarantine = quarantine
+        # (控制器, 原因) -> 筆數
+        self.counts: Dict[Tuple[int, str], int] = {}
+        self.lock = threading.Lock()
+
+    def record(self, reason: str, frame: bytes, tc_id: int = UNKNOWN_TC, detail: str = ""):
+        """記錄一筆錯誤幀"""
+        key = (tc_id, reason)
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+        if self.quarantine is not None:
+            self.quarantine.info(QuarantineEntry(reason, tc_id, detail, frame))
+
+    def record_invalid(self, frame: bytes):
+        """記錄未通過快速驗證的幀（轉發路徑，分類後記錄）"""
+        reason, detail = classify(frame)
+        self.record(reason, frame, frame_addr(frame), detail)
+
+    def snapshot(self) -> Dict[Tuple[int, str], int]:
+        """(控制器, 原因) -> 筆數 的複本"""
+        with self.lock:
+            return dict(self.counts)
+
+    def total(self) -> int:
+        return sum(self.snapshot().values())
+
+    def by_reason(self) -> Dict[str, int]:
+        """原因 -> 筆數"""
+        totals: Dict[str, int] = {}
+        for (_, reason), count in self.snapshot().items():
+            totals[reason] = totals.get(reason, 0) + count
+        return totals
+
+    def by_controller(self) -> List[Tuple[int, Dict[str, int]]]:
+        """[(控制器, {原因: 筆數})]，依錯誤總數由多到少"""
+        controllers: Dict[int, Dict[str, int]] = {}
+        for (tc_id, reason), count in self.snapshot().items():
+            controllers.setdefault(tc_id, {})[reason] = count
+        return sorted(controllers.items(), key=lambda item: -sum(item[1].values()))
+
+    def summary(self, limit: int = 5) -> List[str]:
+        """status 顯示用（總計一行，錯誤最多的 limit 個控制器各一行）"""
+        if not self.counts:
+            return ["錯誤幀: 0"]
+        reasons = ", ".join(f"{REASONS.get(reason, reason)} {count}" for reason, count in self.by_reason().items())
+        lines = [f"錯誤幀: {self.total()} ({reasons})"]
+        for tc_id, counts in self.by_controller()[:limit]:
+            name = f"TC{tc_id:03d}" if tc_id != UNKNOWN_TC else "未知"
+            detail = ", ".join(f"{REASONS.get(reason, reason)} {count}" for reason, count in counts.items())
+            lines.append(f"  {name}: {detail}")
+        return lines
@@ -0,0 +1,295 @@
+"""
+執行指標（metrics）
+
+接收 / 解析 / ACK / 指令路徑的計數與固定區間直方圖：
+- 熱路徑只做整數累加與 bisect，不取鎖、不配置物件；每個計數只由一個執行緒寫入
+  （接收執行緒或發送執行緒），讀取端（status、HTTP）直接讀取，可能落後一筆
+- 佇列深度、待確認指令、重送、錯誤幀等各組件既有的統計在讀取時才收集
+
+render_prometheus 輸出 Prometheus 文字格式，MetricsServer 在本機 HTTP 端口提供 /metrics：
+
+    python main.py -m receive --metrics-port 9108
+    curl http://127.0.0.1:9108/metrics
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.log_setup import get_logger, logging_stats
+from packet.frame_errors import UNKNOWN_TC
+
+# ACK 回覆延遲（收到 datagram 到 ACK 送出）直方圖區間上限（微秒）
+ACK_BUCKETS_US = (50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+# 指令 ACK 往返（最後一次送出到收到 ACK）直方圖區間上限（微秒）
+COMMAND_RTT_BUCKETS_US = (1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000, 1000000, 2000000)
+
+METRICS_HOST = "127.0.0.1"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 發送優先序（outbound.PRIORITY_*）的標籤值
+PRIORITY_LABELS = ("ack", "retransmit", "command")
+
+# status 顯示最久未收到的控制器數
+STALEST_CONTROLLERS = 3
+
+
+class LatencyStats:
+    """固定區間延遲直方圖"""
+
+    def __init__(self, buckets_us: Tuple[int, ...]):
+        self.bounds_ns = [bound * 1000 for bound in buckets_us]
+        self.buckets_us = buckets_us
+        self.counts = array("Q", [0]) * (len(buckets_us) + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, elapsed_ns: int):
+        """記錄一筆延遲"""
+        self.counts[bisect_left(self.bounds_ns, elapsed_ns)] += 1
+        self.count += 1
+        self.total_ns += elapsed_ns
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+
+    def percentile(self, q: float) -> Optional[float]:
+        """百分位數上界（微秒），超出最大區間時返回 max"""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return float(self.buckets_us[i]) if i < len(self.buckets_us) else self.max_ns / 1000
+        return self.max_ns / 1000
+
+    def summary(self) -> str:
+        """p50 / p99 / max 摘要"""
+        if not self.count:
+            return "無資料"
+        return (f"p50<={self.percentile(0.5):.0f}us p99<={self.percentile(0.99):.0f}us "
+                f"max={self.max_ns / 1000:.0f}us（{self.count} 筆）")
+
+    def reset(self):
+        """清除統計"""
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class Metrics:
+    """接收路徑計數（接收執行緒寫入）"""
+
+    def __init__(self):
+        self.datagrams = 0
+        self.bytes = 0
+        self.frames = 0
+        # 控制器編號 -> 最後收到的 perf_counter_ns（讀取時換算為 unix 時間）
+        self.last_seen: Dict[int, int] = {}
+        self.ack_latency = LatencyStats(ACK_BUCKETS_US)
+        # rates() 上次呼叫時的 (時間, datagram, 幀, bytes)
+        self._last_rates = (time.perf_counter(), 0, 0, 0)
+
+    def rates(self) -> Tuple[float, float, float]:
+        """上次呼叫以來每秒 datagram、幀、bytes"""
+        now = time.perf_counter()
+        last, datagrams, frames, size = self._last_rates
+        current = (now, self.datagrams, self.frames, self.bytes)
+        self._last_rates = current
+        elapsed = max(now - last, 1e-9)
+        return ((current[1] - datagrams) / elapsed, (current[2] - frames) / elapsed,
+                (current[3] - size) / elapsed)
+
+    def last_seen_times(self) -> Dict[int, float]:
+        """控制器編號 -> 最後收到的 unix 時間"""
+        offset = time.time() - time.perf_counter_ns() / 1e9
+        return {tc_id: offset + seen / 1e9 for tc_id, seen in list(self.last_seen.items())}
+
+    def summary(self) -> List[str]:
+        """status 顯示用"""
+        datagram_rate, frame_rate, byte_rate = self.rates()
+        lines = [
+            f"接收: datagram {self.datagrams} ({datagram_rate:.1f}/s), 幀 {self.frames} ({frame_rate:.1f}/s), "
+            f"{self.bytes} bytes ({byte_rate:.0f}/s)",
+            f"ACK 回覆延遲: {self.ack_latency.summary()}",
+        ]
+        seen = self.last_seen_times()
+        if seen:
+            now = time.time()
+            stalest = sorted(seen.items(), key=lambda item: item[1])[:STALEST_CONTROLLERS]
+            detail = ", ".join(f"TC{tc_id:03d} {now - at:.1f}s 前" for tc_id, at in stalest)
+            lines.append(f"控制器: {len(seen)} 個，最久未收到 {detail}")
+        return lines
+
+
+# ============= Prometheus 文字格式 =============
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Exposition:
+    """Prometheus 文字格式輸出（每個指標名稱一個 HELP / TYPE）"""
+
+    def __init__(self, labels: Dict[str, str]):
+        self.labels = labels
+        self.lines: List[str] = []
+
+    def family(self, name: str, kind: str, help_text: str, samples: Iterable[Tuple[Dict, float]]):
+        """一個指標的全部樣本：[(標籤, 值)]"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels({**self.labels, **labels})} {value}")
+
+    def single(self, name: str, kind: str, help_text: str, value: float):
+        self.family(name, kind, help_text, [({}, value)])
+
+    def histogram(self, name: str, help_text: str, stats: LatencyStats):
+        """延遲直方圖（秒；區間計數轉為累計）"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        counts = list(stats.counts)
+        cumulative = 0
+        for bound, count in zip(stats.buckets_us, counts):
+            cumulative += count
+            self.lines.append(f"{name}_bucket{_labels({**self.labels, 'le': bound / 1e6})} {cumulative}")
+        cumulative += counts[-1]
+        self.lines.append(f"{name}_bucket{_labels({**self.labels, 'le': '+Inf'})} {cumulative}")
+        self.lines.append(f"{name}_sum{_labels(self.labels)} {stats.total_ns / 1e9}")
+        self.lines.append(f"{name}_count{_labels(self.labels)} {cumulative}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+def _frame_errors(counts: Dict[Tuple[int, str], int], metrics: Metrics) -> Dict[Tuple[int, str], int]:
+    """錯誤幀計數；未收到過正常幀的控制器（多為 ADDR 損毀）併入 -1，避免標籤數量無限增加"""
+    merged: Dict[Tuple[int, str], int] = {}
+    known = metrics.last_seen
+    for (tc_id, reason), count in counts.items():
+        key = (tc_id if tc_id in known else UNKNOWN_TC, reason)
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def render_prometheus(center, mode: str) -> str:
+    """收集 PacketCenter 各組件的指標，返回 Prometheus 文字格式"""
+    out = _Exposition({"mode": mode})
+    metrics = center.metrics
+
+    out.single("tc_datagrams_received_total", "counter", "收到的 datagram 數", metrics.datagrams)
+    out.single("tc_received_bytes_total", "counter", "收到的 bytes", metrics.bytes)
+    out.single("tc_frames_received_total", "counter", "切割出的幀數（含錯誤幀）", metrics.frames)
+    out.family("tc_frame_errors_total", "counter", "錯誤幀數（依控制器與原因，控制器 -1 表示未知）",
+               [({"controller": tc_id, "reason": reason}, count)
+                for (tc_id, reason), count in sorted(_frame_errors(center.parser.errors.snapshot(), metrics).items())])
+    out.histogram("tc_ack_latency_seconds", "收到 datagram 到 ACK 送出", metrics.ack_latency)
+    out.family("tc_controller_last_seen_timestamp_seconds", "gauge", "控制器最後收到幀的 unix 時間",
+               [({"controller": tc_id}, f"{at:.3f}") for tc_id, at in sorted(metrics.last_seen_times().items())])
+
+    outbound = center.outbound
+    if outbound:
+        out.family("tc_frames_sent_total", "counter", "送出的幀數（依優先序）",
+                   [({"priority": label}, count) for label, count in zip(PRIORITY_LABELS, outbound.sent)])
+        out.family("tc_send_failures_total", "counter", "發送失敗數（依優先序）",
+                   [({"priority": label}, count) for label, count in zip(PRIORITY_LABELS, outbound.failed)])
+        out.single("tc_retransmits_total", "counter", "重送的指令數", outbound.sent[1])
+        out.single("tc_commands_expired_total", "counter", "重送後仍未收到 ACK 而放棄的指令數", outbound.expired)
+        out.single("tc_pending_commands", "gauge", "等待 ACK 的指令數", len(outbound.awaiting))
+        out.family("tc_outbound_queue_depth", "gauge", "發送佇列長度（依優先序）",
+                   [({"priority": label}, depth) for label, depth in zip(PRIORITY_LABELS, outbound.depth())])
+        out.histogram("tc_command_ack_rtt_seconds", "指令最後一次送出到收到 ACK", outbound.ack_rtt)
+
+    bus_stats = center.bus.stats()
+    out.family("tc_subscriber_queue_depth", "gauge", "訂閱者佇列長度",
+               [({"subscriber": name}, pending) for name, _, pending, _, _ in bus_stats])
+    out.family("tc_subscriber_dropped_total", "counter", "訂閱者佇列滿時丟棄的封包數",
+               [({"subscriber": name}, dropped) for name, _, _, dropped, _ in bus_stats])
+
+    log_queues = [(name, stats) for name, stats in (("log", logging_stats(mode)),
+                                                    ("quarantine", logging_stats("quarantine"))) if stats]
+    out.family("tc_log_queue_depth", "gauge", "非同步日誌佇列長度",
+               [({"queue": name}, stats[0]) for name, stats in log_queues])
+    out.family("tc_log_dropped_total", "counter", "非同步日誌佇列滿時丟棄的記錄數",
+               [({"queue": name}, stats[1]) for name, stats in log_queues])
+    return out.text()
+
+
+# ============= HTTP 端口 =============
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        try:
+            body = self.server.render().encode("utf-8")
+        except Exception as e:
+            self.server.logger.error(f"指標輸出錯誤: {e}", exc_info=True)
+            self.send_error(500)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """不記錄每次請求"""
+
+
+class MetricsServer:
+    """本機 HTTP 指標端口（背景執行緒）"""
+
+    def __init__(self, port: int, host: str = METRICS_HOST, logger=None):
+        """
+        Args:
+            port: 監聽端口
+            host: 監聽地址（預設只接受本機）
+        """
+        self.host = host
+        self.port = port
+        self.logger = logger if logger else get_logger("tc")
+        self.server = None
+        self.thread = None
+
+    def open(self, render: Callable[[], str]) -> bool:
+        """開始提供指標（render 每次請求時呼叫）"""
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        except OSError as e:
+            self.logger.error(f"開啟指標端口失敗 {self.host}:{self.port}: {e}")
+            return False
+        self.server.daemon_threads = True
+        self.server.render = render
+        self.server.logger = self.logger
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="MetricsThread", daemon=True)
+        self.thread.start()
+        self.logger.info(f"指標端口: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
@@ -0,0 +1,344 @@
+"""
+發送排程（outbound scheduler）
+
+所有送往控制器的幀經由同一個排程器，依優先序送出：
+- ACK：最高優先，預設由呼叫端（接收執行緒）立即送出，不進入任何佇列
+- 重送：已送出但逾時未收到 ACK 的指令
+- 指令：新指令
+
+重送與指令依控制器分別排隊，由專用發送執行緒分批送出，每送一筆都重新從最高優先序取出，
+控制器之間輪流；大量指令不會延遲 ACK 到控制器的重送計時器之後。
+
+設定 RateLimiter 時，重送與指令需取得該控制器與全域的 token 才送出；
+超出限制時留在佇列中等待（不失敗），只阻擋該控制器，其他控制器照常送出。
+
+inline_ack=False 時 ACK 也排入佇列由發送執行緒送出（仍最優先、不受速率限制）；
+CPython 下多一次執行緒切換（GIL 交接），ACK 延遲較立即送出高，見 benchmark/outbound.py。
+ACK 回覆延遲（收到 datagram 到 ACK 送出）在實際送出之後才記錄，排入佇列不算送出。
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Optional, Tuple
+
+from config.log_setup import get_logger
+from packet.metrics import COMMAND_RTT_BUCKETS_US, LatencyStats
+
+# 優先序（數字小者優先）
+PRIORITY_ACK = 0
+PRIORITY_RETRANSMIT = 1
+PRIORITY_COMMAND = 2
+
+PRIORITY_NAMES = ("ACK", "重送", "指令")
+
+# 每批最多送出的幀數（之後重新檢查重送逾時）
+SEND_BATCH_SIZE = 64
+
+# 指令未收到 ACK 的重送逾時（秒）與最多重送次數
+RETRANSMIT_TIMEOUT = 1.0
+MAX_RETRANSMITS = 2
+
+
+class ControllerQueue:
+    """單一控制器的待送幀：(frame, seq, 排入時間)"""
+
+    __slots__ = ("retransmits", "commands")
+
+    def __init__(self):
+        self.retransmits: deque = deque()
+        self.commands: deque = deque()
+
+    def __len__(self):
+        return len(self.retransmits) + len(self.commands)
+
+
+class OutboundScheduler:
+    """優先序發送排程器"""
+
+    def __init__(self, network, mode: str = "receive", batch_size: int = SEND_BATCH_SIZE,
+                 retransmit_timeout: float = RETRANSMIT_TIMEOUT, max_retransmits: int = MAX_RETRANSMITS,
+                 inline_ack: bool = True, rate_limiter=None, ack_latency: Optional[LatencyStats] = None):
+        """
+        初始化排程器
+
+        Args:
+            network: 傳輸層（send_data）
+            mode: 模式（日誌名稱）
+            batch_size: 每批最多送出的幀數
+            retransmit_timeout: 指令重送逾時（秒）
+            max_retransmits: 最多重送次數
+            inline_ack: ACK 由呼叫端立即送出（False 時排入最高優先佇列）
+            rate_limiter: RateLimiter（None 表示不限速）
+            ack_latency: ACK 回覆延遲統計（None 表示不記錄）
+        """
+        self.logger = get_logger(f"tc.{mode}")
+        self.network = network
+        self.batch_size = batch_size
+        self.retransmit_timeout = retransmit_timeout
+        self.max_retransmits = max_retransmits
+        self.inline_ack = inline_ack
+        self.rate_limiter = rate_limiter
+        self.ack_latency = ack_latency
+
+        # ACK 佇列：(frame, addr, 收到 datagram 的 perf_counter_ns)
+        self.acks: deque = deque()
+        # 控制器地址 -> ControllerQueue（依序輪流）
+        self.controllers: "OrderedDict[Tuple[str, int], ControllerQueue]" = OrderedDict()
+        self.cond = threading.Condition()
+
+        # 等待 ACK 的指令：seq -> [frame, addr, 送出時間（None 表示尚在佇列）, 已重送次數]
+        self.awaiting: Dict[int, list] = {}
+
+        self.running = False
+        self.thread = None
+
+        # 統計
+        self.sent = [0, 0, 0]
+        self.failed = [0, 0, 0]
+        self.expired = 0
+        self.dropped = 0
+        self.limited = 0            # 因速率限制而等待的次數
+        self.wait_count = 0         # 經佇列送出的指令（含重送）筆數
+        self.wait_total = 0.0       # 排入到送出的累計等待（秒）
+        self.wait_max = 0.0
+        self.ack_rtt = LatencyStats(COMMAND_RTT_BUCKETS_US)   # 最後一次送出到收到 ACK
+
+    # ============= 排入佇列 =============
+
+    def send_ack(self, frame: bytes, addr: Tuple[str, int], received_ns: Optional[int] = None):
+        """
+        送出 ACK（接收執行緒使用）
+
+        Args:
+            frame: ACK 幀
+            addr: 控制器地址
+            received_ns: 收到 datagram 的 perf_counter_ns（提供時於送出後記錄 ACK 回覆延遲）
+        """
+        if self.inline_ack or not self.running:
+            return self._send_ack(frame, addr, received_ns)
+        with self.cond:
+            self.acks.append((frame, addr, received_ns))
+            self.cond.notify()
+        return True
+
+    def send_command(self, frame: bytes, addr: Tuple[str, int], seq: Optional[int] = None) -> bool:
+        """
+        排入新指令（超出速率限制時排隊等待，不失敗）
+
+        Args:
+            frame: 指令幀
+            addr: 控制器地址
+            seq: 指令 SEQ（提供時逾時未收到 ACK 會重送）
+
+        Returns:
+            是否已排入（或未啟動時已送出）
+        """
+        if not self.running:
+            return self._send(PRIORITY_COMMAND, frame, addr)
+
+        with self.cond:
+            if seq is not None and self.retransmit_timeout > 0:
+                self.awaiting[seq] = [frame, addr, None, 0]
+            self._queue_for(addr).commands.append((frame, seq, time.monotonic()))
+            self.cond.notify()
+        return True
+
+    def acknowledge(self, seq: int) -> bool:
+        """收到 ACK，停止重送並記錄往返時間；返回是否為等待中的指令"""
+        with self.cond:
+            entry = self.awaiting.pop(seq, None)
+        if entry is None:
+            return False
+        if entry[2] is not None:
+            self.ack_rtt.record(int((time.monotonic() - entry[2]) * 1e9))
+        return True
+
+    def _queue_for(self, addr: Tuple[str, int]) -> ControllerQueue:
+        """取得控制器佇列（需持有 cond）"""
+        queue = self.controllers.get(addr)
+        if queue is None:
+            queue = self.controllers[addr] = ControllerQueue()
+        return queue
+
+    # ============= 發送執行緒 =============
+
+    def start(self):
+        """啟動發送執行緒"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._send_loop, name="SendThread", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 1.0):
+        """停止發送執行緒（送完已排入的 ACK，捨棄未送出的指令）"""
+        if not self.running:
+            return
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def depth(self) -> Tuple[int, int, int]:
+        """各優先序佇列長度"""
+        with self.cond:
+            retransmits = sum(len(queue.retransmits) for queue in self.controllers.values())
+            commands = sum(len(queue.commands) for queue in self.controllers.values())
+            return len(self.acks), retransmits, commands
+
+    def controller_depths(self) -> Dict[Tuple[str, int], int]:
+        """各控制器待送筆數（不含空佇列）"""
+        with self.cond:
+            return {addr: len(queue) for addr, queue in self.controllers.items() if len(queue)}
+
+    def _send_loop(self):
+        """依優先序分批送出"""
+        while True:
+            item = None
+            with self.cond:
+                while True:
+                    self._collect_retransmits()
+                    item, wait = self._pop(time.monotonic())
+                    if item is not None or not self.running:
+                        break
+                    self.cond.wait(self._wait_timeout(wait))
+
+            if item is None:
+                break
+
+            # 每送一筆都重新從最高優先序取出，ACK 最多等待一筆正在發送的低優先幀
+            sent = 0
+            while item is not None:
+                self._send_item(*item)
+                sent += 1
+                if sent >= self.batch_size:
+                    break
+                with self.cond:
+                    item, _ = self._pop(time.monotonic())
+
+        with self.cond:
+            dropped = sum(len(queue) for queue in self.controllers.values())
+            self.controllers.clear()
+            self.awaiting.clear()
+        if dropped:
+            self.dropped += dropped
+            self.logger.warning(f"發送執行緒停止，捨棄 {dropped} 筆未送出指令")
+
+    def _pop(self, now: float):
+        """
+        取出下一筆可送出的幀（需持有 cond）
+
+        Returns:
+            ((priority, frame, addr, seq, 排入時間, 收到 datagram 的 perf_counter_ns), None)
+            或 (None, 最短限速等待秒數或 None)
+        """
+        if self.acks:
+            frame, addr, received_ns = self.acks.popleft()
+            return (PRIORITY_ACK, frame, addr, None, None, received_ns), None
+        if not self.running:
+            # 停止時只送出 ACK
+            return None, None
+
+        limiter = self.rate_limiter
+        shortest = None
+        for priority, attr in ((PRIORITY_RETRANSMIT, "retransmits"), (PRIORITY_COMMAND, "commands")):
+            for addr, queue in self.controllers.items():
+                pending = getattr(queue, attr)
+                if not pending:
+                    continue
+                if limiter:
+                    wait = limiter.acquire(addr, now)
+                    if wait > 0:
+                        if shortest is None or wait < shortest:
+                            shortest = wait
+                        continue
+                frame, seq, enqueued = pending.popleft()
+                # 送出後移到最後，控制器之間輪流
+                self.controllers.move_to_end(addr)
+                return (priority, frame, addr, seq, enqueued, None), None
+
+        if shortest is not None:
+            self.limited += 1
+        return None, shortest
+
+    def _send_item(self, priority: int, frame: bytes, addr: Tuple[str, int], seq: Optional[int],
+                   enqueued: Optional[float], received_ns: Optional[int]):
+        """送出一筆；ACK 記錄回覆延遲，指令記錄等待時間與重送計時起點"""
+        if priority == PRIORITY_ACK:
+            self._send_ack(frame, addr, received_ns)
+            return
+
+        self._send(priority, frame, addr)
+        if enqueued is None:
+            return
+
+        now = time.monotonic()
+        waited = now - enqueued
+        self.wait_count += 1
+        self.wait_total += waited
+        if waited > self.wait_max:
+            self.wait_max = waited
+
+        if seq is not None:
+            with self.cond:
+                entry = self.awaiting.get(seq)
+                if entry is not None and entry[0] is frame:
+                    entry[2] = now
+
+    def _wait_timeout(self, limited: Optional[float]) -> Optional[float]:
+        """等待時間：速率限制解除或需檢查重送逾時時醒來（需持有 cond）"""
+        timeout = limited
+        if any(entry[2] is not None for entry in self.awaiting.values()):
+            check = max(0.01, self.retransmit_timeout / 4)
+            timeout = check if timeout is None else min(timeout, check)
+        return timeout
+
+    def _collect_retransmits(self):
+        """逾時未收到 ACK 的指令排入重送佇列（需持有 cond）"""
+        if not self.awaiting or not self.running:
+            return
+        now = time.monotonic()
+        deadline = now - self.retransmit_timeout
+        for seq, entry in list(self.awaiting.items()):
+            frame, addr, sent_at, retries = entry
+            if sent_at is None or sent_at > deadline:
+                continue
+            if retries >= self.max_retransmits:
+                del self.awaiting[seq]
+                self.expired += 1
+                self.logger.warning(f"指令未收到確認，放棄重送: Seq=0x{seq:02X}")
+                continue
+            entry[2] = None
+            entry[3] = retries + 1
+            self._queue_for(addr).retransmits.append((frame, seq, now))
+            self.logger.info(f"重送指令: Seq=0x{seq:02X} (第 {retries + 1} 次)")
+
+    def _send_ack(self, frame: bytes, addr: Tuple[str, int], received_ns: Optional[int]) -> bool:
+        """送出 ACK，成功送出後記錄回覆延遲"""
+        ok = self._send(PRIORITY_ACK, frame, addr)
+        if ok and received_ns is not None and self.ack_latency is not None:
+            self.ack_latency.record(time.perf_counter_ns() - received_ns)
+        return ok
+
+    def _send(self, priority: int, frame: bytes, addr: Tuple[str, int]) -> bool:
+        """送出一筆並統計"""
+        try:
+            ok = self.network.send_data(frame, addr)
+        except Exception as e:
+            self.logger.error(f"發送{PRIORITY_NAMES[priority]}失敗: {e}")
+            ok = False
+        if ok:
+            self.sent[priority] += 1
+        else:
+            self.failed[priority] += 1
+        return ok
+
+    def stats_summary(self) -> str:
+        """等待與限速統計摘要"""
+        average = self.wait_total / self.wait_count * 1000 if self.wait_count else 0.0
+        limiter = f", 限制 {self.rate_limiter.describe()}" if self.rate_limiter else ""
+        return (f"指令等待: 平均 {average:.1f}ms, 最長 {self.wait_max * 1000:.1f}ms"
+                f"（{self.wait_count} 筆）, 限速等待 {self.limited} 次, 停止時捨棄 {self.dropped}{limiter}")
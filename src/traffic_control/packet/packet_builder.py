@@ -7,13 +7,14 @@
 import logging
 from typing import Dict, Any, Optional, Protocol
 from utils import encode
+from packet.compiled_definition import CompiledDefinition, CompiledField
 
 
 # ============= Protocol 接口 =============
 
 class PacketDefinitionProtocol(Protocol):
     """封包定義協議接口"""
-    def get_definition(self, cmd_code: str) -> Optional[Dict[str, Any]]: ...
+    def get_definition(self, cmd_code: str) -> Optional[CompiledDefinition]: ...
     def get_field_type(self, field_type: str) -> Optional[Dict[str, Any]]: ...
 
 
@@ -25,22 +26,17 @@ class FieldBuilder:
     def __init__(self, packet_def: PacketDefinitionProtocol):
         self.packet_def = packet_def
     
-    def build_field(self, field: Dict[str, Any], value: Any) -> bytes:
+    def build_field(self, field: CompiledField, value: Any) -> bytes:
         """構建單個字段為字節（完全使用 FIELD_TYPES）"""
-        field_type = field.get("type")
-        
-        # list : item_type
-        # 其他 : field_type
-        target_type = field.get("item_type", field_type) if field_type == "list" else field_type
-        
-        # 從 FIELD_TYPES 獲取 builder
-        # 類型固定lambda函數
-        type_def = self.packet_def.get_field_type(target_type)
-
-        builder = type_def["builder"] if type_def else b""
+        # FIELD_TYPES 的 builder（編譯時已解析）
+        # list : item_type 的 builder
+        # 其他 : field_type 的 builder
+        builder = field.builder
+        if builder is None:
+            return b""
         
         # list 類型：遍歷構建；單一類型：直接構建
-        if field_type == "list":
+        if field.type == "list":
             return b"".join(builder(item) for item in value) if isinstance(value, list) else b""
         return builder(value)
        
@@ -76,31 +72,23 @@ class PacketBuilder:
             self.logger.error(f"構建封包失敗: {e}", exc_info=True)
             return None
     
-    def _build_payload(self, definition: Dict[str, Any], fields: Dict[str, Any]) -> Optional[bytes]:
+    def _build_payload(self, definition: CompiledDefinition, fields: Dict[str, Any]) -> Optional[bytes]:
         """構建PAYLOAD字段"""
         payload = bytearray()
         
         # 添加群組碼和命令碼
-        group = definition.get("group")
-        command = definition.get("command")
-        
-        if group == "5F":
-            payload.append(0x5F)
-        elif group == "0F":
-            payload.append(0x0F)
-        else:
-            self.logger.error(f"未知群組: {group}")
+        if definition.group_code is None:
+            self.logger.error(f"未知群組: {definition.get('group')}")
             return None
         
-        payload.append(command)
+        payload.append(definition.group_code)
+        payload.append(definition.command)
         
         # 構建字段
-        for field in definition["fields"]:
+        for field in definition.fields:
             
-            field_name = field["name"]
-            if field_name in fields:
-                field_bytes = self.field_builder.build_field(field, fields[field_name])
+            if field.name in fields:
+                field_bytes = self.field_builder.build_field(field, fields[field.name])
                 payload.extend(field_bytes)
         
         return bytes(payload)
-        
\ No newline at end of file
@@ -4,48 +4,191 @@
 負責定義封包的格式和解析方式
 """
 
-from typing import Dict, Any, Optional, Protocol
+import os
+import threading
+from typing import Dict, Any, List, NamedTuple, Optional, Protocol, Tuple
 from definitions.group_5f import F5_GROUP_DEFINITIONS
 from definitions.group_0f import F0_GROUP_DEFINITIONS
+from definitions.loader import (
+    DEFAULT_CACHE_DIR,
+    content_hash,
+    find_data_files,
+    load_data_file,
+    read_cache,
+    write_cache,
+)
 from utils import binary_list_to_int
+from packet.compiled_definition import CompiledDefinition, CompiledField, build_spec, instantiate, mapping_tables
 
 
 # ============= Protocol 接口 =============
 
 class PacketDefinitionProtocol(Protocol):
     """封包定義協議接口"""
-    def get_definition(self, cmd_code: str) -> Optional[Dict[str, Any]]: ...
+    def get_definition(self, cmd_code: str) -> Optional[CompiledDefinition]: ...
+    def get_definition_by_key(self, cmd_key: int) -> Optional[CompiledDefinition]: ...
     def get_field_type(self, field_type: str) -> Optional[Dict[str, Any]]: ...
-    def get_field_definition(self, definition: Dict[str, Any], field_name: str) -> Optional[Dict[str, Any]]: ...
+    def get_field_definition(self, definition: CompiledDefinition, field_name: str) -> Optional[CompiledField]: ...
     def parse_input(self, value_str: str, field_def: Dict[str, Any], param_name: str) -> int: ...
 
 
 # ============= 封包定義器 =============
 
+class DefinitionSet(NamedTuple):
+    """一次載入的定義集（不可變，重新載入時整組替換）"""
+    definitions: Dict[str, CompiledDefinition]             # 指令碼 -> 編譯後定義
+    definitions_by_key: Dict[int, CompiledDefinition]      # 指令鍵（群組碼 << 8 | 命令碼）-> 編譯後定義
+    raw_definitions: Dict[str, Dict[str, Any]]
+    content_key: str
+    cache_hit: bool
+
+
 class PacketDefinition:
-    """封包定義"""
+    """
+    封包定義（啟動時將原始 dict 與資料檔編譯為 CompiledDefinition）
+
+    reload() 在背景重新編譯後以單一賦值替換 DefinitionSet，接收執行緒不需暫停，
+    讀取端不會看到新舊混合的定義；已解析的封包保留原本的 definition 參考，不受替換影響。
+    """
+    
+    def __init__(self, data_files: Optional[List[str]] = None, cache_dir: Optional[str] = DEFAULT_CACHE_DIR):
+        """
+        初始化封包定義
+
+        Args:
+            data_files: 定義資料檔列表（None 表示 definitions/*.json）
+            cache_dir: 編譯快取目錄（預設為使用者快取目錄，None 表示不使用快取）
+        """
+        # 未指定時每次載入重新掃描 definitions/*.json（可新增檔案）
+        self.scan_data_dir = data_files is None
+        self.data_files = find_data_files() if self.scan_data_dir else list(data_files)
+        self.cache_dir = cache_dir
+        self.field_types = FIELD_TYPES
+        
+        self.reload_lock = threading.Lock()
+        self.data_mtimes: Dict[str, Optional[int]] = {}
+        self.current: Optional[DefinitionSet] = None
+        
+        self._load()
     
-    def __init__(self):
-        self.definitions = {
+    # 目前定義集的各欄位（每次讀取取同一個 DefinitionSet 的欄位）
+    
+    @property
+    def definitions(self) -> Dict[str, CompiledDefinition]:
+        return self.current.definitions
+    
+    @property
+    def definitions_by_key(self) -> Dict[int, CompiledDefinition]:
+        return self.current.definitions_by_key
+    
+    @property
+    def raw_definitions(self) -> Dict[str, Dict[str, Any]]:
+        return self.current.raw_definitions
+    
+    @property
+    def content_key(self) -> Optional[str]:
+        return self.current.content_key if self.current else None
+    
+    @property
+    def cache_hit(self) -> bool:
+        return self.current.cache_hit
+    
+    def _load(self):
+        """載入並編譯所有定義，完成後一次替換"""
+        if self.scan_data_dir:
+            self.data_files = find_data_files()
+        mtimes = self._data_mtimes()
+        
+        raw_definitions = {
             **F5_GROUP_DEFINITIONS,
             **F0_GROUP_DEFINITIONS
         }
-        self.field_types = FIELD_TYPES
+        for path in self.data_files:
+            raw_definitions.update(load_data_file(path))
+        
+        # 內容未變化時直接使用快取的映射表
+        key = content_hash(raw_definitions, self.data_files)
+        tables = read_cache(self.cache_dir, key)
+        cache_hit = tables is not None
+        specs = {
+            cmd_code: build_spec(cmd_code, definition, tables.get(cmd_code) if cache_hit else None)
+            for cmd_code, definition in raw_definitions.items()
+        }
+        if not cache_hit:
+            write_cache(self.cache_dir, key, {cmd_code: mapping_tables(spec) for cmd_code, spec in specs.items()})
+        
+        # 指令碼 -> 編譯後定義
+        definitions = {
+            cmd_code: instantiate(spec, self.field_types)
+            for cmd_code, spec in specs.items()
+        }
+        
+        # 指令鍵（群組碼 << 8 | 命令碼）-> 編譯後定義
+        definitions_by_key = {
+            definition.cmd_key: definition for definition in definitions.values()
+        }
+        
+        # 單一賦值替換整組定義（讀取端不需鎖）
+        self.current = DefinitionSet(definitions, definitions_by_key, raw_definitions, key, cache_hit)
+        self.data_mtimes = mtimes
     
-    def get_definition(self, cmd_code: str) -> Optional[Dict[str, Any]]:
+    def reload(self) -> Tuple[bool, str]:
+        """
+        重新載入定義（含重新掃描資料檔目錄）
+
+        失敗時保留目前的定義集
+
+        Returns:
+            (是否成功, 訊息)
+        """
+        with self.reload_lock:
+            previous = self.content_key
+            try:
+                self._load()
+            except Exception as e:
+                return False, f"定義重新載入失敗，沿用目前定義: {e}"
+            
+            if self.content_key == previous:
+                return True, "定義內容未變更"
+            return True, f"定義已重新載入: {len(self.definitions)} 個指令 ({self.content_key[:8]})"
+    
+    def reload_if_changed(self) -> Optional[Tuple[bool, str]]:
+        """資料檔新增、刪除或修改時重新載入，未變化時返回 None"""
+        if self.data_mtimes == self._data_mtimes():
+            return None
+        return self.reload()
+    
+    def _data_mtimes(self) -> Dict[str, Optional[int]]:
+        """資料檔修改時間（掃描模式下包含目錄中新增的檔案）"""
+        paths = find_data_files() if self.scan_data_dir else self.data_files
+        mtimes = {}
+        for path in paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+    
+    def get_definition(self, cmd_code: str) -> Optional[CompiledDefinition]:
         """獲取封包定義"""
-        return self.definitions.get(cmd_code)
+        return self.current.definitions.get(cmd_code)
+    
+    def get_definition_by_key(self, cmd_key: int) -> Optional[CompiledDefinition]:
+        """以指令鍵獲取封包定義"""
+        return self.current.definitions_by_key.get(cmd_key)
+    
+    def get_cmd_code(self, cmd_key: int) -> str:
+        """指令鍵轉換為指令碼字串（如 0x5F03 -> "5F03"）"""
+        definition = self.current.definitions_by_key.get(cmd_key)
+        return definition.cmd_code if definition is not None else f"{cmd_key:04X}"
     
     def get_field_type(self, field_type: str) -> Optional[Dict[str, Any]]:
         """獲取字段類型定義"""
         return self.field_types.get(field_type)
     
-    def get_field_definition(self, definition: Dict[str, Any], field_name: str) -> Optional[Dict[str, Any]]:
+    def get_field_definition(self, definition: CompiledDefinition, field_name: str) -> Optional[CompiledField]:
         """從指令定義中獲取指定字段的定義"""
-        for field in definition.get("fields", []):
-            if field.get("name") == field_name:
-                return field
-        return None
+        return definition.field_map.get(field_name)
     
     def parse_input(self, value_str: str, field_def: Dict[str, Any], param_name: str) -> int:
         """從用戶輸入字符串解析參數值"""
@@ -73,6 +216,10 @@ class PacketDefinition:
 
 # ============= 輔助函數 =============
 
+def cmd_key(cmd_code: str) -> int:
+    """指令碼字串轉換為 16 位元指令鍵（如 "5F03" -> 0x5F03）"""
+    return int(cmd_code, 16)
+
 def _raise_value_error(param_name: str, value_str: str, expected_format: str):
     """拋出格式錯誤"""
     raise ValueError(f"{param_name} 格式錯誤: {value_str} (應為{expected_format})")
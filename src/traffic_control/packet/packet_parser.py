@@ -3,10 +3,14 @@
 """
 import binascii
 import datetime
+import time
 from dataclasses import dataclass, field
 from typing import Dict, Any, Optional, List, NamedTuple, Tuple
-from utils import decode, int_to_binary_list
+from utils import FrameError, decode, int_to_binary_list
 from config.log_setup import get_logger
+from packet.field_record import FieldRecord, EMPTY_RECORD
+from packet.compiled_definition import CompiledDefinition, CompiledField
+from packet.frame_errors import FrameErrors, frame_addr
 
 # ============= 數據結構 =============
 
@@ -19,19 +23,45 @@ class DecodedFrame:
     len: int
     payload: Optional[bytes] = None
 
-@dataclass
+@dataclass(slots=True)
 class Packet:
-    """封包數據結構"""
+    """封包數據結構（原始資料與接收時間的字串延遲產生）"""
     seq: int  # 序列號
     tc_id: int  # 號誌控制器ID
     length: int  # 欄位長度
     cmd_code: Optional[str] = None  # 指令編號
+    cmd_key: int = -1  # 指令鍵（群組碼 << 8 | 命令碼）
     command: Optional[str] = None  # 指令 "name"
     reply_type: Optional[str] = None  # 訊息型態(ACK, 設定, 查詢, 設定回報, 查詢回報, 主動回報)
     needs_ack: bool = False
-    raw_packet: Optional[str] = None  # 原始封包
-    receive_time: Optional[str] = None  # 接收時間
-    extra_fields: Dict[str, Any] = field(default_factory=dict) # 中文
+    frame: bytes = b""  # 原始封包
+    receive_ns: int = 0  # 接收時間 (time.time_ns)
+    payload: bytes = b""  # 反溢出後的 PAYLOAD（比對重複回報用）
+    record: FieldRecord = EMPTY_RECORD  # 解析字段（按位置存放，中文字段名存取）
+    definition: Optional[CompiledDefinition] = field(default=None, repr=False, compare=False)  # 指令定義
+    _raw_packet: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _receive_time: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def extra_fields(self) -> Dict[str, Any]:
+        """解析字段的 dict 快照（中文字段名 -> 值）"""
+        return self.record.as_dict()
+
+    @property
+    def raw_packet(self) -> str:
+        """原始封包（十六進制字串）"""
+        if self._raw_packet is None:
+            self._raw_packet = binascii.hexlify(self.frame).decode('ascii')
+        return self._raw_packet
+
+    @property
+    def receive_time(self) -> str:
+        """接收時間（ISO 格式字串）"""
+        if self._receive_time is None:
+            seconds, nanos = divmod(self.receive_ns, 1_000_000_000)
+            stamp = datetime.datetime.fromtimestamp(seconds).replace(microsecond=nanos // 1000)
+            self._receive_time = stamp.isoformat()
+        return self._receive_time
 
 
 # ============= 協議特殊結構定義 =============
@@ -49,14 +79,22 @@ class TimeSegment(NamedTuple):
         return {"hour": self.hour, "minute": self.minute, "plan_id": self.plan_id}
 
 class SignalMap:
-    """號誌位置圖 - 封裝二進制表示"""
+    """號誌位置圖 - 封裝二進制表示（0x00~0xFF 使用共用實例，見 from_byte）"""
+    __slots__ = ("value", "binary_list", "text")
+
     def __init__(self, value: int):
         self.value = value
         self.binary_list = int_to_binary_list(value)
+        self.text = f"0x{self.value:02X} = {self.binary_list}"
+    
+    @classmethod
+    def from_byte(cls, value: int) -> "SignalMap":
+        """獲取共用實例（值不可變）"""
+        return _SIGNAL_MAPS[value] if 0 <= value <= 0xFF else cls(value)
     
     def __str__(self):
         """格式化顯示"""
-        return f"0x{self.value:02X} = {self.binary_list}"
+        return self.text
     
     def __int__(self):
         """轉換為整數"""
@@ -65,6 +103,67 @@ class SignalMap:
     def __repr__(self):
         return f"SignalMap(0x{self.value:02X})"
 
+_SIGNAL_MAPS = [SignalMap(value) for value in range(256)]
+
+
+def _describe_signal_status(status_byte: int) -> str:
+    """單一燈號狀態 byte 的描述"""
+    status_list = int_to_binary_list(status_byte)
+    
+    # 提取行人燈位
+    pedgreen_bit = status_list[6]
+    pedred_bit = status_list[7]
+    
+    # 判斷行人燈狀態
+    if pedgreen_bit and pedred_bit:
+        ped_status = "行人綠燈閃爍"
+    elif pedgreen_bit:
+        ped_status = "行人綠燈"
+    elif pedred_bit:
+        ped_status = "行人紅燈"
+    else:
+        ped_status = None
+    
+    # 構建狀態描述
+    status_parts = []
+    
+    # 車道燈狀態
+    if status_list[0]:
+        status_parts.append("全紅")
+    elif status_list[1]:
+        status_parts.append("黃燈")
+    elif status_list[2]:
+        status_parts.append("綠燈")
+    
+    # 轉向燈狀態
+    turn_parts = []
+    if status_list[3]:
+        turn_parts.append("左轉")
+    if status_list[4]:
+        turn_parts.append("直行")
+    if status_list[5]:
+        turn_parts.append("右轉")
+    if turn_parts:
+        status_parts.append("、".join(turn_parts))
+    
+    # 行人燈狀態
+    if ped_status:
+        status_parts.append(ped_status)
+    
+    # 組合最終描述
+    return "、".join(status_parts) if status_parts else "未知"
+
+# 燈號狀態描述表（256 項）
+SIGNAL_STATUS_TEXT = [_describe_signal_status(value) for value in range(256)]
+
+# 方向 1~16 的完整顯示行（方向 x 256 項），超出範圍時即時組字串
+_STATUS_LINE_DIRECTIONS = 16
+_STATUS_LINES = [
+    [f"   方向 {i}: {text}" for text in SIGNAL_STATUS_TEXT]
+    for i in range(1, _STATUS_LINE_DIRECTIONS + 1)
+]
+
+
 class SignalStatusList:
     """燈號狀態列表 - 封裝格式化邏輯"""
     def __init__(self, status_bytes: List[int]):
@@ -72,64 +171,19 @@ class SignalStatusList:
         self.formatted_lines = self._format_statuses()
     
     def _format_statuses(self) -> List[str]:
-        """格式化狀態列表"""
-        formatted_statuses = []
-        
-        for i, status_byte in enumerate(self.status_bytes, 1):
-            status_list = int_to_binary_list(status_byte)
-            
-            # 提取行人燈位
-            pedgreen_bit = status_list[6] if len(status_list) > 6 else 0
-            pedred_bit = status_list[7] if len(status_list) > 7 else 0
-            
-            # 判斷行人燈狀態
-            if pedgreen_bit and pedred_bit:
-                ped_status = "行人綠燈閃爍"
-            elif pedgreen_bit:
-                ped_status = "行人綠燈"
-            elif pedred_bit:
-                ped_status = "行人紅燈"
-            else:
-                ped_status = None
-            
-            # 構建狀態描述
-            status_parts = []
-            
-            # 車道燈狀態
-            if len(status_list) > 0 and status_list[0]:
-                status_parts.append("全紅")
-            elif len(status_list) > 1 and status_list[1]:
-                status_parts.append("黃燈")
-            elif len(status_list) > 2 and status_list[2]:
-                status_parts.append("綠燈")
-            
-            # 轉向燈狀態
-            turn_parts = []
-            if len(status_list) > 3 and status_list[3]:
-                turn_parts.append("左轉")
-            if len(status_list) > 4 and status_list[4]:
-                turn_parts.append("直行")
-            if len(status_list) > 5 and status_list[5]:
-                turn_parts.append("右轉")
-            if turn_parts:
-                status_parts.append("、".join(turn_parts))
-            
-            # 行人燈狀態
-            if ped_status:
-                status_parts.append(ped_status)
-            
-            # 組合最終描述
-            status_desc = "、".join(status_parts) if status_parts else "未知"
-            formatted_statuses.append(f"   方向 {i}: {status_desc}")
-        
-        return formatted_statuses
+        """格式化狀態列表（查表）"""
+        return [
+            _STATUS_LINES[i][status_byte] if i < _STATUS_LINE_DIRECTIONS
+            else f"   方向 {i + 1}: {SIGNAL_STATUS_TEXT[status_byte]}"
+            for i, status_byte in enumerate(self.status_bytes)
+        ]
     
     def __str__(self):
         """字符串表示"""
         return "\n".join(self.formatted_lines)
     
     def __iter__(self):
-        """支持迭代（用於 format_packet_display）"""
+        """支持迭代（用於 renderer 逐行輸出）"""
         return iter(self.formatted_lines)
     
     def __len__(self):
@@ -144,11 +198,19 @@ class SignalStatusList:
 class PacketParser:
     """封包解析器"""
     
-    def __init__(self, packet_def, mode="receive"):
-
+    def __init__(self, packet_def, mode="receive", quarantine=None):
+        """
+        Args:
+            packet_def: 封包定義
+            mode: 模式
+            quarantine: 錯誤幀隔離檔 logger（config.log_setup.setup_quarantine，None 表示只計數）
+        """
         self.logger = get_logger(f"tc.{mode}")
         self.packet_def = packet_def
         self.field_parser = FieldParser(packet_def)
+        
+        # 錯誤幀計數（控制器 x 原因）與隔離檔，只在失敗的分支記錄
+        self.errors = FrameErrors(quarantine)
     
     def parse(self, frame: bytes) -> Optional[Packet]:
         """解析封包"""
@@ -166,51 +228,65 @@ class PacketParser:
                     length=decoded.len,
                     reply_type="ACK",
                     needs_ack=True,
-                    raw_packet=binascii.hexlify(frame).decode('ascii'),
-                    receive_time=datetime.datetime.now().isoformat()
+                    frame=frame,
+                    receive_ns=time.time_ns()
                 )
                        
             # STX 框處理
             if decoded.type == "STX":
 
-                if decoded.payload is None:
-                    self.logger.warning(f"封包內容為空: {binascii.hexlify(frame).decode('ascii').upper()}")
+                if len(decoded.payload) < 2:
+                    self.errors.record("short", frame, decoded.addr, "PAYLOAD 少於 2 bytes")
                     return None
 
-                # 構建指令碼
-                cmd_code = f"{decoded.payload[0]:02X}{decoded.payload[1]:02X}"
+                # 指令鍵（群組碼 << 8 | 命令碼）
+                payload = decoded.payload
+                key = (payload[0] << 8) | payload[1]
                               
                 # 創建基礎封包
                 packet = Packet(
                     seq=decoded.seq,
                     tc_id=decoded.addr,
                     length=decoded.len,
-                    cmd_code=cmd_code,
-                    raw_packet=binascii.hexlify(frame).decode('ascii'),
-                    receive_time=datetime.datetime.now().isoformat()
+                    cmd_code=self.packet_def.get_cmd_code(key),
+                    cmd_key=key,
+                    frame=frame,
+                    receive_ns=time.time_ns(),
+                    payload=payload
                 )
 
                 # 查找定義
-                definition = self.packet_def.get_definition(cmd_code)
+                definition = self.packet_def.get_definition_by_key(key)
                 
                 # 未定義的指令碼
                 if not definition:
-                    #self.logger.warning(f"未定義的指令碼: {cmd_code}")
-                    #self.logger.warning(f"未定義封包內容: {binascii.hexlify(frame).decode('ascii').upper()}")
-                    return packet               
+                    self.errors.record("unknown", frame, decoded.addr, packet.cmd_code)
+                    return packet
+                
+                # 長度檢查（解析字段前）；只計數與寫入隔離檔，不在接收執行緒逐筆記錄日誌
+                error_message = definition.check_length(len(payload))
+                if error_message:
+                    self.errors.record("length", frame, decoded.addr, f"{error_message}（{len(payload)} bytes）")
+                    return None
                 
-                # 其餘Packet 字段(command, reply_type, extra_fields)
+                # 其餘Packet 字段(command, reply_type, definition, record)
                 # 5F40 fields = []
-                packet.command = definition.get("name")
-                packet.reply_type = definition.get("reply_type")          
-                packet = self.field_parser.parse_fields(decoded.payload, definition["fields"], packet)
+                packet.definition = definition
+                packet.command = definition.name
+                packet.reply_type = definition.reply_type
+                packet.record = definition.record_type()
+                packet = self.field_parser.parse_fields(payload, definition, packet)
                 
                 return packet
             
             return None
             
+        except FrameError as e:
+            self.errors.record(e.reason, frame, frame_addr(frame), str(e))
+            return None
         except Exception as e:
-            #self.logger.error(f"解析失敗: {e}", exc_info=True)
+            # 通過校驗的幀解析失敗（字段資料與定義不符或解析器錯誤）
+            self.errors.record("field", frame, frame_addr(frame), f"{type(e).__name__}: {e}")
             return None
     
 # ============= 字段解析器 =============
@@ -234,31 +310,31 @@ class FieldParser:
             "signal_status_list": self._parse_signal_status_list,
         }  
 
-    def parse_fields(self, payload: bytes, fields: List[Dict[str, Any]], packet: Packet) -> Packet:
-        """解析字段"""
+
+    def parse_fields(self, payload: bytes, definition: CompiledDefinition, packet: Packet) -> Packet:
+        """解析字段（依封包取得的定義，定義集重新載入時不需重建）"""
         current_index = 0
+        record = packet.record
+        parsers = self.parsers
         
-        for field in fields:
-            field_name = field["name"]
-            field_type = field.get("type", "uint8")
-            field_index = field.get("index")
+        for field in definition.fields:
+            parser = parsers.get(field.type)
+            field_index = field.index
 
             
             # 計算實際索引位置
             actual_index = field_index if field_index is not None else current_index
             
-            # 獲取解析器
-            parser = self.parsers.get(field_type)
             if not parser:
-                packet.extra_fields[field_name] = None
+                record[field.position] = None
                 continue
             
             # 解析字段
             value, next_index= parser(payload, field, actual_index, packet)
             
-            # 存入額外字段
+            # 存入字段記錄（按位置）
             # mapping映射邏輯交給processor處理
-            packet.extra_fields[field_name] = value
+            record[field.position] = value
 
             
             # 更新索引（除非是動態字段）
@@ -268,15 +344,11 @@ class FieldParser:
         return packet
     
     # ============= 基礎類型解析器 =============
-    def _parse_uint(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_uint(self, payload: bytes, field: CompiledField, 
                    index: int, packet: Packet) -> Tuple[Optional[int], int]:
         """解析 uint8 或 uint16"""
-        field_type = field.get("type")
-        
-        # 從 FIELD_TYPES 獲取 size
-        type_def = self.packet_def.get_field_type(field_type)
-        
-        size = type_def.get("size", 1)
+        # FIELD_TYPES 的 size（編譯時已解析）
+        size = field.size
         
         if index + size > len(payload):
             return None, index + size
@@ -289,23 +361,20 @@ class FieldParser:
         
         return value, index + size
     
-    def _parse_list(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_list(self, payload: bytes, field: CompiledField, 
                    index: int, packet: Packet) -> Tuple[List[Any], int]:
         """解析列表字段"""
         
-        # 長度依賴於已解析的字段 packet.extra_fields(動態存取)
-        count_from = field.get("count_from")
+        # 長度依賴於已解析的字段 packet.record(動態存取)
+        count_from = field.count_from
 
-        count = int(count_from(packet.extra_fields)) if count_from else 0
+        count = int(count_from(packet.record)) if count_from else 0
 
         
-        item_type = field.get("item_type", "uint8")
         items = []
         current_index = index
         
-        type_def = self.packet_def.get_field_type(item_type)
-        
-        item_size = type_def.get("size", 1)
+        item_size = field.item_size
         
         for _ in range(count):
             if current_index + item_size > len(payload):
@@ -324,15 +393,15 @@ class FieldParser:
         return items, current_index
     
     # ============= 專門類型解析器 =============
-    def _parse_time_segment_list(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_time_segment_list(self, payload: bytes, field: CompiledField, 
                                 index: int, packet: Packet) -> Tuple[List[TimeSegment], int]:
         """
         解析時間片段列表 (Hour+Min+PlanID)(count)
         
         專門處理多個指令共用的時間片段結構
         """
-        count_from = field.get("count_from")
-        count = int(count_from(packet.extra_fields)) if count_from else 0
+        count_from = field.count_from
+        count = int(count_from(packet.record)) if count_from else 0
         
         segments = []
         current_index = index
@@ -350,15 +419,15 @@ class FieldParser:
         
         return segments, current_index
       
-    def _parse_weekday_list(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_weekday_list(self, payload: bytes, field: CompiledField, 
                            index: int, packet: Packet) -> Tuple[List[int], int]:
         """
         解析星期列表 Weekday(num_weekday)
         
         專門處理星期列表，帶驗證（1-7: 週一到週日, 11-17: 隔週休）
         """
-        count_from = field.get("count_from")
-        count = int(count_from(packet.extra_fields)) if count_from else 0
+        count_from = field.count_from
+        count = int(count_from(packet.record)) if count_from else 0
         weekdays = []
         current_index = index
         
@@ -377,19 +446,19 @@ class FieldParser:
 
      # ============= 輔助方法 =============
 
-    def _parse_signal_map(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_signal_map(self, payload: bytes, field: CompiledField, 
                          index: int, packet: Packet) -> Tuple[SignalMap, int]:
         """解析號誌位置圖"""
         if index >= len(payload):
-            return SignalMap(0), index + 1
+            return SignalMap.from_byte(0), index + 1
         value = payload[index]
-        return SignalMap(value), index + 1
+        return SignalMap.from_byte(value), index + 1
     
-    def _parse_signal_status_list(self, payload: bytes, field: Dict[str, Any], 
+    def _parse_signal_status_list(self, payload: bytes, field: CompiledField, 
                                   index: int, packet: Packet) -> Tuple[SignalStatusList, int]:
         """解析燈號狀態列表"""
-        count_from = field.get("count_from")
-        count = int(count_from(packet.extra_fields)) if count_from else 0
+        count_from = field.count_from
+        count = int(count_from(packet.record)) if count_from else 0
         
         status_bytes = []
         current_index = index
@@ -0,0 +1,99 @@
+"""
+發送速率限制（token bucket）
+
+每個控制器一個 bucket（慢速鏈路上連續指令會塞住控制器），另有全域 bucket
+（全部控制器同時推送時不佔滿上行鏈路）。一筆指令需同時取得兩者的 token。
+超出限制時由發送排程保留在佇列中等待，不視為失敗。
+"""
+
+import time
+from typing import Dict, Hashable, Optional
+
+# 預設：每個控制器每秒 5 筆（可連續 2 筆），全域每秒 200 筆（可連續 20 筆）
+CONTROLLER_RATE = 5.0
+CONTROLLER_BURST = 2
+GLOBAL_RATE = 200.0
+GLOBAL_BURST = 20
+
+
+class TokenBucket:
+    """token bucket：以固定速率補充，最多累積 burst 個"""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """取得 1 個 token 需等待的秒數（0 表示可立即取得）"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        """取走 1 個 token（呼叫前需確認 wait_time 為 0）"""
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """每控制器 + 全域速率限制"""
+
+    def __init__(self, controller_rate: float = CONTROLLER_RATE, controller_burst: float = CONTROLLER_BURST,
+                 global_rate: float = GLOBAL_RATE, global_burst: float = GLOBAL_BURST):
+        """
+        初始化限制器
+
+        Args:
+            controller_rate: 每個控制器每秒筆數（0 表示不限制）
+            controller_burst: 每個控制器可連續送出的筆數
+            global_rate: 全域每秒筆數（0 表示不限制）
+            global_burst: 全域可連續送出的筆數
+        """
+        self.controller_rate = controller_rate
+        self.controller_burst = max(1, controller_burst)
+        self.global_bucket = TokenBucket(global_rate, max(1, global_burst)) if global_rate > 0 else None
+        self.buckets: Dict[Hashable, TokenBucket] = {}
+
+    def wait_time(self, key: Hashable, now: float) -> float:
+        """控制器 key 送出下一筆需等待的秒數"""
+        wait = 0.0
+        if self.controller_rate > 0:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.controller_rate, self.controller_burst, now)
+            wait = bucket.wait_time(now)
+        if self.global_bucket:
+            wait = max(wait, self.global_bucket.wait_time(now))
+        return wait
+
+    def acquire(self, key: Hashable, now: float) -> float:
+        """
+        嘗試取得控制器 key 的發送許可
+
+        Returns:
+            0 表示已取得（同時扣除控制器與全域 token），否則為需等待的秒數
+        """
+        wait = self.wait_time(key, now)
+        if wait > 0:
+            return wait
+        if self.controller_rate > 0:
+            self.buckets[key].take()
+        if self.global_bucket:
+            self.global_bucket.take()
+        return 0.0
+
+    def describe(self) -> str:
+        """限制設定摘要"""
+        controller = f"{self.controller_rate:g}/s (burst {self.controller_burst:g})" if self.controller_rate > 0 else "不限"
+        bucket = self.global_bucket
+        total = f"{bucket.rate:g}/s (burst {bucket.burst:g})" if bucket else "不限"
+        return f"每控制器 {controller}, 全域 {total}"
@@ -0,0 +1,213 @@
+"""
+轉發（relay）
+
+位於控制器與中央 BackServer 之間：
+- 上行：控制器 -> BackServer，驗證後原封不動轉發（不重新編碼）
+- 下行：BackServer -> 控制器，依 ADDR 轉發到學習到的控制器地址
+- 本地 ACK（選用）：relay 直接回覆控制器 ACK，並丟棄 BackServer 回覆的 ACK
+- 只完整解析 relay 自身狀態需要的指令（預設 5F03/5F00/0F04），且在轉發之後
+
+轉發延遲（收到數據到送出完成）以固定區間直方圖統計，定期回報並與預算比較。
+"""
+
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from config.constants import ACK, STX
+from config.log_setup import get_logger
+from packet.metrics import LatencyStats
+from utils import encode, verify_frame
+
+# 轉發延遲預算（微秒）：單筆幀從 receive_data 返回到 send_data 完成
+RELAY_LATENCY_BUDGET_US = 100
+
+# relay 自身狀態需要完整解析的指令
+RELAY_PARSE_COMMANDS = ("5F03", "5F00", "0F04")
+
+# 統計回報間隔（秒）
+RELAY_REPORT_INTERVAL = 60.0
+
+# 延遲直方圖區間上限（微秒），最後一格為超出
+LATENCY_BUCKETS_US = (5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class FrameRelay:
+    """控制器 <-> BackServer 幀轉發"""
+
+    def __init__(self, center, controller_net, server_net, local_ack: bool = False,
+                 parse_commands: Iterable[str] = RELAY_PARSE_COMMANDS,
+                 default_controller_addr: Optional[Tuple[str, int]] = None,
+                 latency_budget_us: int = RELAY_LATENCY_BUDGET_US,
+                 mode: str = "relay"):
+        """
+        初始化轉發器
+
+        Args:
+            center: PacketCenter（解析與狀態記錄）
+            controller_net: 面向控制器的傳輸層
+            server_net: 面向 BackServer 的傳輸層（send_data 預設送往 BackServer）
+            local_ack: 是否由 relay 回覆控制器 ACK
+            parse_commands: 需要完整解析的指令碼
+            default_controller_addr: 尚未學習到控制器地址時的下行目標
+            latency_budget_us: 轉發延遲預算（微秒）
+        """
+        self.logger = get_logger(f"tc.{mode}")
+        self.center = center
+        self.controller_net = controller_net
+        self.server_net = server_net
+        self.local_ack = local_ack
+        self.parse_keys = frozenset(int(cmd_code, 16) for cmd_code in parse_commands)
+        self.default_controller_addr = default_controller_addr
+        self.latency_budget_us = latency_budget_us
+
+        # 控制器編號 -> 最近的來源地址（下行轉發使用）
+        self.controller_addrs: Dict[int, Tuple[str, int]] = {}
+
+        # (控制器編號, 指令鍵) -> 最近一筆完整解析的封包
+        self.latest: Dict[Tuple[int, int], object] = {}
+
+        # 統計
+        self.upstream_latency = LatencyStats(LATENCY_BUCKETS_US)
+        self.downstream_latency = LatencyStats(LATENCY_BUCKETS_US)
+        self.forwarded_up = 0
+        self.forwarded_down = 0
+        self.local_acks = 0
+        self.dropped_acks = 0
+        self.invalid = 0
+        self.unroutable = 0
+        self.last_report = time.monotonic()
+
+    # ============= 上行 =============
+
+    def upstream(self, data: bytes, addr: Tuple[str, int], received_ns: int):
+        """
+        控制器 -> BackServer
+
+        Args:
+            data: 收到的數據
+            addr: 控制器地址
+            received_ns: receive_data 返回時的 perf_counter_ns
+        """
+        frames = self.controller_net.process_buffer(data, self.center.parser.errors)
+        send = self.server_net.send_data
+        to_parse = None
+
+        metrics = self.center.metrics
+        metrics.datagrams += 1
+        metrics.bytes += len(data)
+        metrics.frames += len(frames)
+        last_seen = metrics.last_seen
+
+        for frame in frames:
+            if not verify_frame(frame):
+                self.invalid += 1
+                self.center.parser.errors.record_invalid(frame)
+                continue
+
+            tc_id = (frame[3] << 8) | frame[4]
+            self.controller_addrs[tc_id] = addr
+            last_seen[tc_id] = received_ns
+
+            send(frame)
+            self.forwarded_up += 1
+
+            if frame[1] == STX:
+                if self.local_ack:
+                    self.controller_net.send_data(encode(frame[2], tc_id, b""), addr)
+                    self.local_acks += 1
+                    metrics.ack_latency.record(time.perf_counter_ns() - received_ns)
+                # 指令鍵位於 PAYLOAD 前 2 bytes（群組碼不會是 DLE，不需反逸出）
+                if len(frame) > 10 and ((frame[7] << 8) | frame[8]) in self.parse_keys:
+                    if to_parse is None:
+                        to_parse = []
+                    to_parse.append(frame)
+
+        self.upstream_latency.record(time.perf_counter_ns() - received_ns)
+
+        # 完整解析在轉發之後，不計入轉發延遲
+        if to_parse:
+            for frame in to_parse:
+                self._update_state(frame)
+
+    def _update_state(self, frame: bytes):
+        """完整解析並更新 relay 自身狀態"""
+        packet = self.center.parse(frame)
+        if packet is None:
+            return
+        if packet.cmd_key == 0x5F03:
+            self.center.step_store.record(packet)
+        self.latest[(packet.tc_id, packet.cmd_key)] = packet
+
+    # ============= 下行 =============
+
+    def downstream(self, data: bytes, addr: Tuple[str, int], received_ns: int):
+        """
+        BackServer -> 控制器
+
+        Args:
+            data: 收到的數據
+            addr: BackServer 地址
+            received_ns: receive_data 返回時的 perf_counter_ns
+        """
+        frames = self.server_net.process_buffer(data, self.center.parser.errors)
+        send = self.controller_net.send_data
+
+        for frame in frames:
+            if not verify_frame(frame):
+                self.invalid += 1
+                self.center.parser.errors.record_invalid(frame)
+                continue
+
+            # 本地 ACK 時，BackServer 對上行幀的 ACK 不再轉發
+            if self.local_ack and frame[1] == ACK:
+                self.dropped_acks += 1
+                continue
+
+            tc_id = (frame[3] << 8) | frame[4]
+            target = self.controller_addrs.get(tc_id, self.default_controller_addr)
+            if target is None:
+                self.unroutable += 1
+                continue
+
+            send(frame, target)
+            self.forwarded_down += 1
+
+        self.downstream_latency.record(time.perf_counter_ns() - received_ns)
+
+    # ============= 統計 =============
+
+    def collect_report(self, force: bool = False) -> Optional[str]:
+        """到達回報間隔時返回統計摘要並重新計算延遲"""
+        now = time.monotonic()
+        if not force and now - self.last_report < RELAY_REPORT_INTERVAL:
+            return None
+        self.last_report = now
+
+        parts = [
+            f"上行 {self.forwarded_up}",
+            f"下行 {self.forwarded_down}",
+            f"本地ACK {self.local_acks}",
+            f"丟棄ACK {self.dropped_acks}",
+            f"無效 {self.invalid}",
+            f"無路由 {self.unroutable}",
+        ]
+        for name, stats in (("上行", self.upstream_latency), ("下行", self.downstream_latency)):
+            if stats.count:
+                parts.append(
+                    f"{name}延遲 p50<={stats.percentile(0.5):.0f}us "
+                    f"p99<={stats.percentile(0.99):.0f}us max={stats.max_ns / 1000:.0f}us"
+                )
+        return f"轉發統計: {', '.join(parts)} (預算 {self.latency_budget_us}us)"
+
+    def over_budget(self) -> bool:
+        """上行或下行 p99 是否超出延遲預算"""
+        for stats in (self.upstream_latency, self.downstream_latency):
+            p99 = stats.percentile(0.99)
+            if p99 is not None and p99 > self.latency_budget_us:
+                return True
+        return False
+
+    def reset_latency(self):
+        """清除延遲統計（每個回報週期）"""
+        self.upstream_latency.reset()
+        self.downstream_latency.reset()
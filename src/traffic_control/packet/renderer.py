@@ -0,0 +1,329 @@
+"""
+封包輸出模板
+
+每個指令碼依定義預先編譯一個模板（PacketTemplate）：各顯示字段的標籤、記錄位置、映射與轉換函數。
+同一筆解析後的封包可輸出三種格式，皆依模板一次附加完成（不再對已產生的字串 split / insert）：
+- text  多行人類可讀格式（日誌預設）
+- json  單行 JSON（映射後的文字、數字或結構化列表）
+- csv   單行 CSV（欄位順序見 csv_header，不同指令的欄位不同）
+
+定義以外的顯示規則（標籤、單位、十六進位、附加狀態行）集中在 DISPLAY_RULES；
+沒有規則的字段依定義通用顯示：套用 mapping，有 post_process 或為列表類型時逐行附加。
+定義重新載入後（定義物件不同）模板自動重新編譯。
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config.constants import WEEKDAY_MAP
+from packet.compiled_definition import CompiledDefinition, CompiledField
+from packet.packet_parser import SignalMap, SignalStatusList, SIGNAL_STATUS_TEXT
+
+OUTPUT_FORMATS = ("text", "json", "csv")
+
+SEPARATOR = "=" * 60
+
+# CSV 固定欄位（之後依模板字段順序，最後為原始資料）
+CSV_LEADING = ("receive_time", "tc_id", "seq", "cmd_code", "reply_type")
+CSV_TRAILING = ("raw",)
+
+
+# ============= 顯示規則 =============
+
+def _formatter(spec: str) -> Callable:
+    """格式字串 -> (值, packet) 轉換函數"""
+    fmt = spec.format
+    return lambda value, packet: fmt(value)
+
+
+# 以十六進位表示的代碼（text 與 JSON / CSV 相同）
+_HEX2 = _formatter("{:02X}")
+_HEX4 = _formatter("{:04X}")
+
+
+def _green_time_lines(green_times):
+    """各分相綠燈時間（5FC8）"""
+    return [f"分相 {i} 綠燈時間: {green_time} 秒" for i, green_time in enumerate(green_times, 1)]
+
+
+def _segment_lines(segments):
+    """時段列表（5FC6）"""
+    return [
+        f"時段 {i}: {segment.hour:02d}:{segment.minute:02d} (計畫ID: {segment.plan_id})"
+        for i, segment in enumerate(segments, 1)
+    ]
+
+
+def _weekday_names(weekdays, packet=None):
+    """星期列表（5FC6）"""
+    return [WEEKDAY_MAP.get(weekday, f"未知({weekday})") for weekday in weekdays]
+
+
+def _error_code_text(error_code, packet):
+    """錯誤碼文字（0F81）：以參數編號替換占位符 {xx}"""
+    param_num = packet.record.get("參數編號")
+    if param_num is None or not isinstance(error_code, str):
+        return error_code
+    return error_code.replace("{xx}", str(param_num))
+
+
+# 指令碼 -> 字段名稱 -> 規則
+#   label   顯示標籤（None 表示不輸出「標籤: 值」行，只輸出 lines）
+#   format  值的格式字串（只用於 text）
+#   text    (映射後的值, packet) -> 顯示值
+#   lines   原始值 -> 附加顯示行
+#   data    (映射後的值, packet) -> JSON / CSV 值
+#   const   定義以外的固定字段
+DISPLAY_RULES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "5F00": {
+        "控制策略狀態": {"label": "狀態"},
+    },
+    "5F03": {
+        "時相編號": {"text": _HEX2, "data": _HEX2},
+        "步階秒數": {"format": "{} 秒"},
+    },
+    "5FC3": {
+        "時相編號": {"text": _HEX2, "data": _HEX2},
+    },
+    "5FC0": {
+        "動態控制策略有效時間": {"label": "有效時間", "format": "{} 分鐘"},
+    },
+    "5FC8": {
+        "時相編號": {"text": _HEX2, "data": _HEX2},
+        "各分相綠燈時間": {"lines": _green_time_lines},
+        "週期秒數": {"format": "{} 秒"},
+        "時差秒數": {"format": "{} 秒"},
+    },
+    "5FC6": {
+        "時段列表": {"lines": _segment_lines},
+        "星期列表": {"lines": _weekday_names, "data": _weekday_names},
+    },
+    "0F04": {
+        "硬體狀態碼": {"format": "0x{:04X}"},
+    },
+    "0F80": {
+        "指令ID": {"text": _HEX4, "data": _HEX4},
+        "狀態": {"const": "設定成功"},
+    },
+    "0F81": {
+        "指令ID": {"text": _HEX4, "data": _HEX4},
+        "錯誤碼": {"text": _error_code_text, "data": _error_code_text},
+    },
+}
+
+
+# ============= 值轉換 =============
+
+def _item_lines(items):
+    """列表類型字段：每個項目一行"""
+    return [str(item) for item in items]
+
+
+def _data_value(value: Any) -> Any:
+    """轉換為可 JSON 序列化的值"""
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if isinstance(value, SignalMap):
+        return value.value
+    if isinstance(value, SignalStatusList):
+        return [SIGNAL_STATUS_TEXT[status] for status in value.status_bytes]
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [_data_value(item) for item in value]
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return str(value)
+
+
+def _csv_cell(value: Any) -> str:
+    """CSV 欄位（列表與結構以緊湊 JSON 表示）"""
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        text = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = str(value)
+    if any(char in text for char in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+# ============= 模板 =============
+
+class Column:
+    """模板中的一個字段"""
+
+    __slots__ = ("key", "label", "position", "mapping", "text", "lines", "data", "const")
+
+    def __init__(self, key: str, label: Optional[str], position: Optional[int] = None,
+                 mapping: Optional[Callable] = None, text: Optional[Callable] = None,
+                 lines: Optional[Callable] = None, data: Optional[Callable] = None, const: Any = None):
+        self.key = key                  # JSON / CSV 欄位名稱（定義中的字段名稱）
+        self.label = label              # text 顯示標籤
+        self.position = position        # 記錄位置（None 表示固定字段）
+        self.mapping = mapping
+        self.text = text
+        self.lines = lines
+        self.data = data
+        self.const = const
+
+    def append_text(self, out: List[str], values: List[Any], packet):
+        """附加 text 顯示行"""
+        raw = self.const if self.position is None else values[self.position]
+        if self.label is not None:
+            value = raw
+            if raw is not None:
+                if self.mapping is not None:
+                    value = self.mapping(raw)
+                if self.text is not None:
+                    value = self.text(value, packet)
+            out.append(f"{self.label}: {value}")
+        if self.lines is not None and raw is not None:
+            out.extend(self.lines(raw))
+
+    def value(self, values: List[Any], packet) -> Any:
+        """JSON / CSV 值"""
+        value = self.const if self.position is None else values[self.position]
+        if value is None:
+            return None
+        if self.mapping is not None:
+            value = self.mapping(value)
+        if self.data is not None:
+            return self.data(value, packet)
+        return _data_value(value)
+
+
+def _compile_column(field: CompiledField, rule: Dict[str, Any]) -> Column:
+    """依字段定義與顯示規則編譯字段"""
+    text = rule.get("text")
+    if text is None and "format" in rule:
+        text = _formatter(rule["format"])
+
+    is_list = field.type == "list" or field.type.endswith("_list")
+    lines = rule.get("lines")
+    if lines is None:
+        if field.post_process is not None:
+            lines = field.post_process
+        elif is_list:
+            lines = _item_lines
+
+    # 列表類型預設只輸出項目行
+    label = rule["label"] if "label" in rule else (None if is_list else field.name)
+
+    return Column(
+        key=field.name,
+        label=label,
+        position=field.position,
+        mapping=field.map_value if field.mapping is not None else None,
+        text=text,
+        lines=lines,
+        data=rule.get("data"),
+    )
+
+
+class PacketTemplate:
+    """單一指令碼的預編譯模板"""
+
+    __slots__ = ("definition", "cmd_code", "columns", "title", "command_line", "csv_header")
+
+    def __init__(self, definition: Optional[CompiledDefinition], cmd_code: str,
+                 rules: Dict[str, Dict[str, Any]]):
+        columns = []
+        if definition is not None:
+            columns = [_compile_column(field, rules.get(field.name, {})) for field in definition.fields]
+        for key, rule in rules.items():
+            if "const" in rule:
+                columns.append(Column(key, rule.get("label", key), const=rule["const"]))
+
+        self.definition = definition
+        self.cmd_code = cmd_code
+        self.columns: Tuple[Column, ...] = tuple(columns)
+        self.title = f"接收 {cmd_code} 封包: "
+        self.command_line = f"指令: {cmd_code}"
+        self.csv_header = CSV_LEADING + tuple(column.key for column in columns) + CSV_TRAILING
+
+
+class PacketRenderer:
+    """封包輸出：依指令碼快取模板，輸出 text / json / csv"""
+
+    def __init__(self, rules: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None):
+        """
+        Args:
+            rules: 顯示規則（預設 DISPLAY_RULES）
+        """
+        self.rules = DISPLAY_RULES if rules is None else rules
+        # cmd_key -> PacketTemplate
+        self.templates: Dict[int, PacketTemplate] = {}
+
+    def template(self, packet) -> PacketTemplate:
+        """取得封包的模板（定義已重新載入時重新編譯）"""
+        definition = packet.definition
+        if definition is None:
+            return PacketTemplate(None, packet.cmd_code or "未知", {})
+
+        template = self.templates.get(definition.cmd_key)
+        if template is None or template.definition is not definition:
+            template = PacketTemplate(definition, definition.cmd_code, self.rules.get(definition.cmd_code, {}))
+            self.templates[definition.cmd_key] = template
+        return template
+
+    def formatter(self, output: str = "text") -> Callable:
+        """返回指定格式的輸出函數（packet -> str）"""
+        if output not in OUTPUT_FORMATS:
+            raise ValueError(f"未知的輸出格式: {output}（可用: {', '.join(OUTPUT_FORMATS)}）")
+        return getattr(self, output)
+
+    def render(self, packet, output: str = "text") -> str:
+        """以指定格式輸出封包"""
+        return self.formatter(output)(packet)
+
+    def text(self, packet) -> str:
+        """多行人類可讀格式"""
+        template = self.template(packet)
+        raw = packet.raw_packet
+        out = [
+            SEPARATOR,
+            template.title + raw,
+            "=== 封包詳細資訊 ===",
+            f"序列號 (SEQ): 0x{packet.seq:02X}",
+            f"控制器編號: TC{packet.tc_id:03d}",
+            template.command_line,
+            f"訊息型態: {packet.reply_type}",
+        ]
+        values = packet.record.values()
+        for column in template.columns:
+            column.append_text(out, values, packet)
+        out.append(f"原始資料: {raw}")
+        out.append(f"接收時間: {packet.receive_time}")
+        out.append(SEPARATOR)
+        return "\n".join(out)
+
+    def json(self, packet) -> str:
+        """單行 JSON"""
+        template = self.template(packet)
+        values = packet.record.values()
+        return json.dumps({
+            "receive_time": packet.receive_time,
+            "tc_id": packet.tc_id,
+            "seq": packet.seq,
+            "cmd_code": template.cmd_code,
+            "command": packet.command,
+            "reply_type": packet.reply_type,
+            "fields": {column.key: column.value(values, packet) for column in template.columns},
+            "raw": packet.raw_packet,
+        }, ensure_ascii=False, separators=(",", ":"))
+
+    def csv(self, packet) -> str:
+        """單行 CSV（欄位見 csv_header）"""
+        template = self.template(packet)
+        values = packet.record.values()
+        cells = [packet.receive_time, str(packet.tc_id), str(packet.seq), template.cmd_code,
+                 _csv_cell(packet.reply_type)]
+        cells.extend(_csv_cell(column.value(values, packet)) for column in template.columns)
+        cells.append(packet.raw_packet)
+        return ",".join(cells)
+
+    def csv_header(self, packet) -> str:
+        """封包所屬指令的 CSV 標題列"""
+        return ",".join(self.template(packet).csv_header)
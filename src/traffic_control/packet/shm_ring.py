@@ -0,0 +1,296 @@
+"""
+共享記憶體環狀緩衝區
+
+接收端將原始幀與標頭資訊寫入 multiprocessing.shared_memory，同機的旁路程序
+（記錄器、分析、UI）附加後直接讀取記憶體，不需系統呼叫或 pickle。
+
+- 單一寫入者、任意數量讀取者；寫入者從不等待讀取者
+- 每個 slot 以序號（seqlock）保護：讀取前後序號一致才視為有效
+- 讀取者落後超過容量（被追上）時跳過並累計 lapped
+
+同名共享記憶體已存在時，只有建立者程序已不存在（殘留）才移除重建；
+仍在使用中時拒絕建立（force=True / --ring-force 強制取代）。
+
+記憶體配置：
+    標頭 64 bytes: magic(4) version(2) 保留(2) slot_count(4) slot_size(4) owner_pid(4) 保留(4) write_seq(8) 保留(32)
+    slot: seq(8) length(2) tc_id(2) cmd_key(2) frame_seq(1) flags(1) receive_ns(8) frame(...)
+"""
+
+import os
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import List, NamedTuple, Optional
+
+# 預設共享記憶體名稱
+DEFAULT_RING_NAME = "tc_packets"
+
+MAGIC = b"TCRB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIII")
+HEADER_SIZE = 64
+WRITE_SEQ_OFFSET = 24
+
+SLOT_HEADER = struct.Struct("<QHHHBBq")
+SLOT_SEQ = struct.Struct("<Q")
+# slot 標頭中序號之後的字段（length tc_id cmd_key frame_seq flags receive_ns）
+SLOT_META = struct.Struct("<HHHBBq")
+
+# 本程序 ShmRingWriter 建立的共享記憶體名稱（resource_tracker 已登記）
+_created = set()
+
+# flags
+FLAG_ACK = 0x01          # ACK 幀
+FLAG_TRUNCATED = 0x02    # 幀超出 slot 容量，只保存前段
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    附加到既有共享記憶體，不由 resource_tracker 追蹤
+
+    讀取者結束時 resource_tracker 不可移除寫入者的共享記憶體。Python 3.13 起以 track=False 附加；
+    之前的版本附加後立即 unregister（本程序建立的除外，重複登記不會增加記錄；
+    與寫入者共用 tracker 的 spawn 子程序中會一併取消寫入者的登記，
+    寫入者異常結束時改由下次建立時的殘留檢查移除）。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and name not in _created:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _owner_alive(name: str) -> bool:
+    """同名共享記憶體的建立者程序是否仍存在（格式不符或無法判斷時視為存在）"""
+    if os.name != "posix":
+        # Windows 的共享記憶體在所有 handle 關閉後即釋放，不會殘留
+        return True
+    shm = _attach(name)
+    try:
+        magic, version, _, _, _, owner_pid = HEADER.unpack_from(shm.buf, 0)
+    finally:
+        shm.close()
+    if magic != MAGIC or not owner_pid:
+        return True
+    try:
+        os.kill(owner_pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class RingEntry(NamedTuple):
+    """環狀緩衝區中的一筆幀"""
+    seq: int          # 環狀緩衝區序號（從 1 開始）
+    tc_id: int
+    cmd_key: int      # 指令鍵（ACK 幀為 0）
+    frame_seq: int    # 幀 SEQ
+    flags: int
+    receive_ns: int   # 接收時間（time.time_ns）
+    frame: bytes
+
+
+class ShmRingWriter:
+    """環狀緩衝區寫入者（接收端）"""
+
+    def __init__(self, name: str = DEFAULT_RING_NAME, slot_count: int = 16384, slot_size: int = 512,
+                 force: bool = False):
+        """
+        建立共享記憶體（同名殘留時先移除）
+
+        Args:
+            name: 共享記憶體名稱
+            slot_count: slot 數量（2 的次方）
+            slot_size: 每個 slot bytes 數（含 24 bytes 標頭）
+            force: 同名共享記憶體仍在使用中時也移除重建
+
+        Raises:
+            FileExistsError: 同名共享記憶體仍由其他程序使用
+        """
+        if slot_count & (slot_count - 1):
+            raise ValueError(f"slot_count 必須為 2 的次方: {slot_count}")
+        if slot_size <= SLOT_HEADER.size:
+            raise ValueError(f"slot_size 過小: {slot_size}")
+
+        size = HEADER_SIZE + slot_count * slot_size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if not force and _owner_alive(name):
+                raise FileExistsError(f"共享記憶體 {name} 仍由其他程序使用")
+            # 附加時登記、unlink 時取消登記（resource_tracker 記錄一致）
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            _created.discard(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created.add(name)
+
+        self.name = name
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.mask = slot_count - 1
+        self.capacity = slot_size - SLOT_HEADER.size
+        self.buf = self.shm.buf
+
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, 0, slot_count, slot_size, os.getpid())
+        SLOT_SEQ.pack_into(self.buf, WRITE_SEQ_OFFSET, 0)
+
+        self.write_seq = 0
+        self.truncated = 0
+
+    def publish(self, frame: bytes, tc_id: int, cmd_key: int, frame_seq: int,
+                receive_ns: int, flags: int = 0) -> int:
+        """
+        寫入一筆幀（不阻塞、不等待讀取者）
+
+        Returns:
+            環狀緩衝區序號
+        """
+        seq = self.write_seq + 1
+        offset = HEADER_SIZE + ((seq - 1) & self.mask) * self.slot_size
+        buf = self.buf
+
+        length = len(frame)
+        if length > self.capacity:
+            flags |= FLAG_TRUNCATED
+            frame = frame[:self.capacity]
+            self.truncated += 1
+
+        # seqlock：先標記寫入中（0），寫完內容與其餘標頭字段，序號為最後一個寫入，最後更新 write_seq
+        SLOT_SEQ.pack_into(buf, offset, 0)
+        data_offset = offset + SLOT_HEADER.size
+        buf[data_offset:data_offset + len(frame)] = frame
+        SLOT_META.pack_into(buf, offset + SLOT_SEQ.size, length, tc_id & 0xFFFF, cmd_key & 0xFFFF,
+                            frame_seq & 0xFF, flags, receive_ns)
+        SLOT_SEQ.pack_into(buf, offset, seq)
+        SLOT_SEQ.pack_into(buf, WRITE_SEQ_OFFSET, seq)
+
+        self.write_seq = seq
+        return seq
+
+    def publish_packet(self, packet) -> int:
+        """寫入已解析的 Packet（center.process 使用）"""
+        is_ack = packet.reply_type == "ACK"
+        return self.publish(
+            packet.frame,
+            packet.tc_id,
+            0 if is_ack else packet.cmd_key,
+            packet.seq,
+            packet.receive_ns,
+            FLAG_ACK if is_ack else 0,
+        )
+
+    def close(self, unlink: bool = True):
+        """關閉（預設同時移除共享記憶體）"""
+        self.buf = None
+        self.shm.close()
+        if unlink:
+            _created.discard(self.name)
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ShmRingReader:
+    """環狀緩衝區讀取者（旁路程序）"""
+
+    def __init__(self, name: str = DEFAULT_RING_NAME, start: str = "latest"):
+        """
+        附加到共享記憶體
+
+        Args:
+            name: 共享記憶體名稱
+            start: "latest" 從下一筆開始，"oldest" 從緩衝區中最舊的一筆開始
+
+        Raises:
+            FileNotFoundError: 寫入者尚未建立
+            ValueError: 格式不符
+        """
+        self.shm = _attach(name)
+
+        self.buf = self.shm.buf
+        magic, version, _, slot_count, slot_size, _ = HEADER.unpack_from(self.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f"共享記憶體 {name} 格式不符")
+
+        self.name = name
+        self.slot_count = slot_count
+        self.slot_size = slot_size
+        self.mask = slot_count - 1
+        self.capacity = slot_size - SLOT_HEADER.size
+
+        write_seq = self.write_seq()
+        if start == "oldest":
+            self.next_seq = max(1, write_seq - slot_count + 1)
+        else:
+            self.next_seq = write_seq + 1
+
+        # 被寫入者追上而遺失的筆數
+        self.lapped = 0
+
+    def write_seq(self) -> int:
+        """寫入者目前的序號"""
+        return SLOT_SEQ.unpack_from(self.buf, WRITE_SEQ_OFFSET)[0]
+
+    def backlog(self) -> int:
+        """尚未讀取的筆數"""
+        return max(0, self.write_seq() - self.next_seq + 1)
+
+    def read(self, max_items: Optional[int] = None) -> List[RingEntry]:
+        """
+        讀取所有（或最多 max_items 筆）新幀，不阻塞
+
+        Returns:
+            [RingEntry, ...]（依序號排列）
+        """
+        buf = self.buf
+        write_seq = SLOT_SEQ.unpack_from(buf, WRITE_SEQ_OFFSET)[0]
+        next_seq = self.next_seq
+
+        # 落後超過容量：直接跳到仍可能有效的最舊一筆
+        oldest = write_seq - self.slot_count + 1
+        if next_seq < oldest:
+            self.lapped += oldest - next_seq
+            next_seq = oldest
+
+        last = write_seq if max_items is None else min(write_seq, next_seq + max_items - 1)
+        entries = []
+        unpack_header = SLOT_HEADER.unpack_from
+        unpack_seq = SLOT_SEQ.unpack_from
+
+        while next_seq <= last:
+            offset = HEADER_SIZE + ((next_seq - 1) & self.mask) * self.slot_size
+            seq, length, tc_id, cmd_key, frame_seq, flags, receive_ns = unpack_header(buf, offset)
+            if seq != next_seq:
+                # 已被覆寫（或正在覆寫）
+                self.lapped += 1
+                next_seq += 1
+                continue
+
+            data_offset = offset + SLOT_HEADER.size
+            frame = bytes(buf[data_offset:data_offset + min(length, self.capacity)])
+
+            if unpack_seq(buf, offset)[0] != next_seq:
+                # 讀取期間被覆寫
+                self.lapped += 1
+                next_seq += 1
+                continue
+
+            entries.append(RingEntry(seq, tc_id, cmd_key, frame_seq, flags, receive_ns, frame))
+            next_seq += 1
+
+        self.next_seq = next_seq
+        return entries
+
+    def close(self):
+        """中斷附加（不移除共享記憶體）"""
+        self.buf = None
+        self.shm.close()
@@ -0,0 +1,275 @@
+"""
+5F03 步階轉換時序資料
+
+每個控制器一個環狀緩衝區，以 array 模組按欄儲存步階轉換，
+每筆約 22 bytes（不建立 Python 物件）；欄位隨筆數增長，到達容量後才循環覆寫。
+提供綠燈實際秒數、週期長度、步階歷史查詢，並可匯出為 .npz 供離線分析
+（不依賴 NumPy；Command 模式 export-steps 指令）。
+
+查詢只在鎖內複製所需欄位的切片（step_history 只取最後幾筆），
+但綠燈秒數與週期長度的彙總仍是逐筆 Python 迴圈（O(筆數)），
+適合 status 等少量查詢；大量分析請匯出 .npz 後以 NumPy 處理。
+"""
+
+import io
+import sys
+import time
+import zipfile
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+# 每筆記錄保留的燈號狀態數（岔路數目上限）
+MAX_SIGNALS = 8
+
+# 燈號狀態中代表車道綠燈的位元（綠燈、左轉、直行、右轉）
+GREEN_MASK = 0x3C
+
+# 燈號狀態 byte -> 是否含綠燈位元（bytes.translate 用）
+_GREEN_TABLE = bytes(1 if value & GREEN_MASK else 0 for value in range(256))
+
+# 欄位名稱 -> (array typecode, npy dtype)
+COLUMNS = {
+    "timestamp_ns": ("q", "<i8"),
+    "phase_order": ("B", "|u1"),
+    "sub_phase": ("B", "|u1"),
+    "step": ("B", "|u1"),
+    "step_sec": ("H", "<u2"),
+    "signal_count": ("B", "|u1"),
+}
+
+
+class StepSeries:
+    """單一控制器的步階轉換環狀緩衝區"""
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        # 欄位隨筆數增長（不預先配置整個容量），到達容量後循環覆寫
+        self.columns = {name: array(typecode) for name, (typecode, _) in COLUMNS.items()}
+        # 燈號狀態：每筆 MAX_SIGNALS bytes，攤平存放
+        self.signal_status = array("B")
+
+        self.head = 0   # 下一筆寫入位置
+        self.count = 0  # 目前筆數
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp_ns: int, phase_order: int, sub_phase: int,
+               step: int, step_sec: int, statuses: List[int]) -> bool:
+        """
+        追加一筆步階轉換
+
+        Returns:
+            是否寫入（與上一筆步階相同時不寫入）
+        """
+        with self.lock:
+            cols = self.columns
+            if self.count:
+                last = (self.head - 1) % self.capacity
+                if (cols["step"][last] == step and cols["sub_phase"][last] == sub_phase
+                        and cols["phase_order"][last] == phase_order):
+                    return False
+
+            i = self.head
+            statuses = statuses[:MAX_SIGNALS]
+            values = (
+                ("timestamp_ns", timestamp_ns),
+                ("phase_order", phase_order & 0xFF),
+                ("sub_phase", sub_phase & 0xFF),
+                ("step", step & 0xFF),
+                ("step_sec", step_sec & 0xFFFF),
+                ("signal_count", len(statuses)),
+            )
+            padded = statuses + [0] * (MAX_SIGNALS - len(statuses))
+
+            if self.count < self.capacity:
+                # 尚未到達容量：追加（head 即為筆數）
+                for name, value in values:
+                    cols[name].append(value)
+                self.signal_status.extend(padded)
+                self.count += 1
+            else:
+                for name, value in values:
+                    cols[name][i] = value
+                base = i * MAX_SIGNALS
+                self.signal_status[base:base + MAX_SIGNALS] = array("B", padded)
+
+            self.head = (i + 1) % self.capacity
+            return True
+
+    # ============= 查詢 =============
+
+    def select(self, names, last: Optional[int] = None) -> Dict[str, array]:
+        """
+        依時間順序複製指定欄位（signal_status 為攤平的燈號狀態）
+
+        Args:
+            names: 欄位名稱
+            last: 只取最後幾筆（None 為全部）
+        """
+        with self.lock:
+            n = self.count if not last else min(last, self.count)
+            result = {}
+            for name in names:
+                if name == "signal_status":
+                    result[name] = self._ordered(self.signal_status, n, MAX_SIGNALS)
+                else:
+                    result[name] = self._ordered(self.columns[name], n)
+        return result
+
+    def snapshot(self) -> Dict[str, array]:
+        """依時間順序複製所有欄位（含攤平的 signal_status）"""
+        return self.select((*COLUMNS, "signal_status"))
+
+    def _ordered(self, col: array, n: int, width: int = 1) -> array:
+        """依時間順序取最後 n 筆的切片（呼叫端須持有 lock）"""
+        if self.count < self.capacity:
+            return col[(self.count - n) * width:]
+        if n == 0:
+            return col[:0]
+        h = self.head
+        start = (h - n) % self.capacity
+        if start < h:
+            return col[start * width:h * width]
+        return col[start * width:] + col[:h * width]
+
+    def step_history(self, last: Optional[int] = None) -> List[Tuple[int, int, int, int, int]]:
+        """
+        步階歷史
+
+        Returns:
+            [(timestamp_ns, 時相編號, 分相序號, 步階序號, 步階秒數), ...]
+        """
+        cols = self.select(("timestamp_ns", "phase_order", "sub_phase", "step", "step_sec"), last)
+        return list(zip(cols["timestamp_ns"], cols["phase_order"], cols["sub_phase"],
+                        cols["step"], cols["step_sec"]))
+
+    def durations(self, cols: Optional[Dict[str, array]] = None) -> array:
+        """每筆步階的實際持續時間（秒），最後一筆尚未結束不計"""
+        cols = cols or self.select(("timestamp_ns",))
+        ts = cols["timestamp_ns"]
+        return array("d", [(b - a) / 1e9 for a, b in zip(ts, ts[1:])])
+
+    def green_durations(self) -> List[Tuple[int, float]]:
+        """
+        各分相綠燈實際秒數
+
+        將同一分相中燈號狀態含綠燈位元的連續步階合併計算
+
+        Returns:
+            [(分相序號, 秒數), ...]
+        """
+        cols = self.select(("timestamp_ns", "sub_phase", "signal_status"))
+        durations = self.durations(cols)
+        status = cols["signal_status"]
+
+        # 每筆是否有任一方向為綠燈：燈號 byte 轉為 0/1 後每筆 MAX_SIGNALS(8) bytes 視為一個 uint64
+        # （未使用的位置為 0），非零即為綠燈
+        green = array("Q", status.tobytes().translate(_GREEN_TABLE))
+
+        result = []
+        current_sub, total = None, 0.0
+        for sub_phase, is_green, duration in zip(cols["sub_phase"], green, durations):
+            if is_green and sub_phase == current_sub:
+                total += duration
+                continue
+            if current_sub is not None:
+                result.append((current_sub, total))
+            current_sub, total = (sub_phase, duration) if is_green else (None, 0.0)
+        if current_sub is not None:
+            result.append((current_sub, total))
+        return result
+
+    def cycle_lengths(self) -> array:
+        """週期長度（秒）：相鄰兩次進入分相 1 步階 1 的時間差"""
+        cols = self.select(("timestamp_ns", "sub_phase", "step"))
+        starts = [
+            ts for ts, sub_phase, step in zip(cols["timestamp_ns"], cols["sub_phase"], cols["step"])
+            if sub_phase == 1 and step == 1
+        ]
+        return array("d", [(b - a) / 1e9 for a, b in zip(starts, starts[1:])])
+
+
+class StepStore:
+    """所有控制器的 5F03 步階轉換資料"""
+
+    def __init__(self, capacity: int = 65536):
+        self.capacity = capacity
+        self.series: Dict[int, StepSeries] = {}
+
+        # monotonic -> epoch 換算（匯出時使用）
+        self.epoch_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def record(self, packet) -> bool:
+        """從已解析的 5F03 封包記錄一筆步階轉換"""
+        fields = packet.record
+        statuses = fields.get("燈號狀態列表")
+
+        series = self.series.get(packet.tc_id)
+        if series is None:
+            series = self.series[packet.tc_id] = StepSeries(self.capacity)
+
+        return series.append(
+            time.monotonic_ns(),
+            fields.get("時相編號") or 0,
+            fields.get("分相序號") or 0,
+            fields.get("步階序號") or 0,
+            fields.get("步階秒數") or 0,
+            list(statuses.status_bytes) if statuses else [],
+        )
+
+    def get(self, tc_id: int) -> Optional[StepSeries]:
+        """獲取控制器的時序資料"""
+        return self.series.get(tc_id)
+
+    def export_npz(self, path: str, tc_id: Optional[int] = None):
+        """
+        匯出為 .npz（未壓縮 zip，每欄一個 .npy）
+
+        陣列名稱格式為 tc003_timestamp_ns，另含 epoch_offset_ns
+        用於將 monotonic 時間戳換算為 epoch 時間
+        """
+        targets = [tc_id] if tc_id is not None else sorted(self.series)
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+            zf.writestr("epoch_offset_ns.npy", _to_npy(array("q", [self.epoch_offset_ns]), "<i8"))
+
+            for tc in targets:
+                series = self.series.get(tc)
+                if series is None:
+                    continue
+                cols = series.snapshot()
+                # 筆數取自快照本身：快照後接收執行緒仍可能追加
+                rows = len(cols["step"])
+                for name, (_, dtype) in COLUMNS.items():
+                    zf.writestr(f"tc{tc:03d}_{name}.npy", _to_npy(cols[name], dtype))
+                zf.writestr(
+                    f"tc{tc:03d}_signal_status.npy",
+                    _to_npy(cols["signal_status"], "|u1", (rows, MAX_SIGNALS)),
+                )
+
+
+# ============= 輔助函數 =============
+
+def _to_npy(data: array, dtype: str, shape: Optional[Tuple[int, ...]] = None) -> bytes:
+    """將 array 序列化為 NPY 1.0 格式"""
+    if sys.byteorder == "big" and data.itemsize > 1:
+        data = array(data.typecode, data)
+        data.byteswap()
+
+    shape = shape or (len(data),)
+    shape_str = f"({shape[0]},)" if len(shape) == 1 else f"({', '.join(map(str, shape))})"
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': {shape_str}, }}"
+
+    # magic(6) + version(2) + header_len(2) + header，總長對齊 64 bytes
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = header + " " * (padding % 64) + "\n"
+
+    buf = io.BytesIO()
+    buf.write(b"\x93NUMPY\x01\x00")
+    buf.write(len(header).to_bytes(2, "little"))
+    buf.write(header.encode("latin1"))
+    buf.write(data.tobytes())
+    return buf.getvalue()
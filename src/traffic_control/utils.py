@@ -39,22 +39,50 @@ def calculate_checksum(data: bytes) -> int:
     return checksum & 0xFF
 
 
+def verify_frame(frame: bytes) -> bool:
+    """
+    快速驗證幀（不解碼 PAYLOAD）
+
+    檢查 DLE、STX/ACK、LEN 字段與實際長度、XOR 校驗和，轉發路徑使用
+    """
+    if len(frame) < 8 or frame[0] != DLE or frame[1] not in (STX, ACK):
+        return False
+    if int.from_bytes(frame[5:7], 'big') != len(frame):
+        return False
+    return calculate_checksum(frame[:-1]) == frame[-1]
+
+
 # ============= 封包解碼函數 =============
 
+class FrameError(ValueError):
+    """
+    幀解碼錯誤
+
+    reason 為錯誤分類：short（長度不足）、format（缺少 DLE / 非 STX、ACK）、
+    checksum（校驗和錯誤）、truncated（實際長度小於 LEN 字段）
+    """
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
 def decode(frame: bytes) -> Dict:
-    """解碼封包"""
+    """解碼封包（失敗時拋出 FrameError）"""
     if not frame or len(frame) < 3:
-        raise ValueError("封包長度不足")
+        raise FrameError("封包長度不足", "short")
     
     if frame[0] != DLE:
-        raise ValueError("封包格式錯誤：缺少DLE")
+        raise FrameError("封包格式錯誤：缺少DLE", "format")
     
     if frame[1] not in [STX, ACK]:
-        raise ValueError("非ACK或STX封包")
+        raise FrameError("非ACK或STX封包", "format")
     
-    # 驗證校驗和
+    # 驗證校驗和（失敗時才比對 LEN 字段，區分不完整的幀）
     if calculate_checksum(frame[:-1]) != frame[-1]:
-        raise ValueError("封包校驗和錯誤")
+        if frame[1] == STX and len(frame) >= 7 and len(frame) < int.from_bytes(frame[5:7], 'big'):
+            raise FrameError("封包不完整", "truncated")
+        raise FrameError("封包校驗和錯誤", "checksum")
     
     seq = frame[2]
     addr = int.from_bytes(frame[3:5], 'big')
@@ -122,13 +150,22 @@ def encode(seq: int, addr: int, payload: bytes = b"") -> bytes:
         
         return header + struct.pack(">B", calculate_checksum(header))
 
-def int_to_binary_list(n: int) -> list:
+def _build_binary_list(n: int) -> list:
     """將整數轉換為二進制列表（低位在前）"""
     if n == 0:
         return [0] * 8
     binary_str = format(n, '08b')
     reverse_str = binary_str[::-1]
     return [int(bit) for bit in reverse_str]
+
+# 0x00~0xFF 預先計算（共用列表，呼叫端不可修改）
+_BINARY_LISTS = [_build_binary_list(n) for n in range(256)]
+
+def int_to_binary_list(n: int) -> list:
+    """將整數轉換為二進制列表（低位在前，0x00~0xFF 查表返回共用列表）"""
+    if 0 <= n <= 0xFF:
+        return _BINARY_LISTS[n]
+    return _build_binary_list(n)
     
 def binary_list_to_int(bits: list) -> int:
     """
@@ -166,52 +203,6 @@ def _u16(x: int) -> int:
         raise ValueError(f"u16 range error: {x}")
     return x
 
-def format_packet_display(packet, command, fields):
-    """
-    統一的封包顯示格式化函數
-    
-    Args:
-        packet: 封包對象
-        command: 指令碼
-        fields: 字段映射字典 {顯示名稱: 值或獲取函數}
-    
-    Returns:
-        格式化後的多行字符串
-    """
-    lines = []
-    
-    # 標題
-    lines.append("="*60)
- 
-    lines.append(f"接收 {command} 封包: {packet.raw_packet}")
-    lines.append("=== 封包詳細資訊 ===")
-    
-    # 標準字段
-    lines.append(f"序列號 (SEQ): 0x{packet.seq:02X}")
-    lines.append(f"控制器編號: TC{packet.tc_id:03d}")
-    lines.append(f"指令: {command}")
-    lines.append(f"訊息型態: {packet.reply_type}")
-    
-    # 自定義字段
-    for label, value in fields.items():
-        if callable(value):
-            value = value(packet)
-        
-        if isinstance(value, list):
-            for item in value:
-                lines.append(str(item))
-        else:
-            lines.append(f"{label}: {value}")
-    
-    # 結尾
-    lines.append(f"原始資料: {packet.raw_packet}")
-    
-    lines.append(f"接收時間: {packet.receive_time}")
-
-    lines.append("="*60)
-    
-    return "\n".join(lines)    
-
 def validate_param_range(value: int, field_name: str, 
                         min_val: int = 0, max_val: int = 0xFF) -> bool:
     """
@@ -0,0 +1,21 @@
+"""
+測試共用設定
+
+模組以 src/traffic_control 為根目錄互相匯入（與 main.py 執行時相同）
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_ROOT = Path(__file__).resolve().parent.parent / "src" / "traffic_control"
+if str(SRC_ROOT) not in sys.path:
+    sys.path.insert(0, str(SRC_ROOT))
+
+
+@pytest.fixture
+def center():
+    """接收模式的 PacketCenter（不含網路，用於解析與格式化）"""
+    from packet.center import PacketCenter
+    return PacketCenter(mode="receive")
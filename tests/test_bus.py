@@ -0,0 +1,86 @@
+"""
+封包訂閱分派（PacketBus）
+"""
+
+import threading
+from types import SimpleNamespace
+
+from packet.bus import PacketBus
+
+
+def _packet(cmd_key, tc_id):
+    return SimpleNamespace(cmd_key=cmd_key, tc_id=tc_id, cmd_code=f"{cmd_key:04X}")
+
+
+def test_routing_by_command_and_controller():
+    bus = PacketBus()
+    received = {"all": [], "5f03": [], "tc2": [], "both": []}
+    bus.subscribe(received["all"].append, queue_size=0)
+    bus.subscribe(received["5f03"].append, cmd_codes=["5F03"], queue_size=0)
+    bus.subscribe(received["tc2"].append, tc_ids=[2], queue_size=0)
+    bus.subscribe(received["both"].append, cmd_codes=[0x5F03, 0x0F04], tc_ids=[2], queue_size=0)
+
+    packets = [_packet(0x5F03, 1), _packet(0x5F03, 2), _packet(0x0F04, 2), _packet(0x0F80, 1)]
+    for packet in packets:
+        bus.publish(packet)
+
+    assert received["all"] == packets
+    assert received["5f03"] == packets[:2]
+    assert received["tc2"] == packets[1:3]
+    assert received["both"] == packets[1:3]
+
+
+def test_subscribe_and_unsubscribe_reset_routes():
+    bus = PacketBus()
+    first, second = [], []
+    bus.subscribe(first.append, cmd_codes=["5F03"], queue_size=0)
+    bus.publish(_packet(0x5F03, 1))
+
+    subscription = bus.subscribe(second.append, cmd_codes=["5F03"], queue_size=0)
+    bus.publish(_packet(0x5F03, 1))
+    bus.unsubscribe(subscription)
+    bus.publish(_packet(0x5F03, 1))
+
+    assert len(first) == 3
+    assert len(second) == 1
+
+
+def test_failing_subscriber_does_not_affect_others():
+    bus = PacketBus()
+    received = []
+
+    def broken(packet):
+        raise RuntimeError("boom")
+
+    bus.subscribe(broken, queue_size=0, name="broken")
+    bus.subscribe(received.append, queue_size=0, name="ok")
+    bus.publish(_packet(0x5F03, 1))
+
+    assert received
+    assert [(name, errors) for name, _, _, _, errors in bus.stats()] == [("broken", 1), ("ok", 0)]
+
+
+def test_queued_subscriber_runs_on_its_own_thread():
+    bus = PacketBus()
+    threads = []
+    bus.subscribe(lambda packet: threads.append(threading.current_thread()), name="queued")
+    for _ in range(5):
+        bus.publish(_packet(0x5F03, 1))
+    bus.stop()
+
+    assert len(threads) == 5
+    assert threading.current_thread() not in threads
+
+
+def test_full_queue_drops_without_blocking():
+    bus = PacketBus()
+    release = threading.Event()
+    subscription = bus.subscribe(lambda packet: release.wait(5), queue_size=2, name="slow")
+    for _ in range(10):
+        bus.publish(_packet(0x5F03, 1))
+    release.set()
+    bus.stop()
+
+    # 1 筆處理中、2 筆在佇列，其餘丟棄
+    assert subscription.dropped >= 7
+    assert subscription.delivered + subscription.dropped == 10
@@ -0,0 +1,77 @@
+"""
+原始流量擷取檔：寫入、讀取與中斷後附加
+"""
+
+import pytest
+
+from packet.capture import FILE_HEADER, RECORD_HEADER, CaptureReader, CaptureWriter
+
+DATAGRAMS = [
+    (b"\xaa\xbb\x01", ("192.168.1.10", 5000), 1_000),
+    (b"", None, 2_000),
+    (bytes(range(200)), ("10.0.0.1", 6000), 3_000),
+]
+
+
+def _write(path, datagrams):
+    writer = CaptureWriter(str(path))
+    for data, addr, receive_ns in datagrams:
+        writer.record(data, addr, receive_ns)
+    writer.close()
+    return writer
+
+
+def _read(path):
+    with CaptureReader(str(path)) as reader:
+        return [(record.data, record.addr, record.receive_ns) for record in reader]
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "traffic.cap"
+    writer = _write(path, DATAGRAMS)
+
+    assert writer.records == 3
+    assert path.stat().st_size == FILE_HEADER.size + writer.bytes
+    assert _read(path) == [
+        (b"\xaa\xbb\x01", ("192.168.1.10", 5000), 1_000),
+        (b"", ("0.0.0.0", 0), 2_000),
+        (bytes(range(200)), ("10.0.0.1", 6000), 3_000),
+    ]
+
+
+def test_append_keeps_existing_records(tmp_path):
+    path = tmp_path / "traffic.cap"
+    _write(path, DATAGRAMS[:1])
+    writer = _write(path, DATAGRAMS[2:])
+
+    assert writer.truncated == 0
+    assert [record[2] for record in _read(path)] == [1_000, 3_000]
+
+
+@pytest.mark.parametrize("cut", [1, RECORD_HEADER.size - 1, RECORD_HEADER.size + 5])
+def test_append_after_truncated_record(tmp_path, cut):
+    path = tmp_path / "traffic.cap"
+    _write(path, DATAGRAMS)
+    # 模擬寫到一半中斷：最後一筆（200 bytes 資料）只剩前 cut bytes
+    complete = path.stat().st_size - RECORD_HEADER.size - 200
+    with open(path, "r+b") as f:
+        f.truncate(complete + cut)
+
+    writer = _write(path, [(b"\x01\x02", ("127.0.0.1", 7000), 4_000)])
+
+    assert writer.truncated == cut
+    assert _read(path) == [
+        (b"\xaa\xbb\x01", ("192.168.1.10", 5000), 1_000),
+        (b"", ("0.0.0.0", 0), 2_000),
+        (b"\x01\x02", ("127.0.0.1", 7000), 4_000),
+    ]
+
+
+@pytest.mark.parametrize("content", [b"TCC", b"not a capture file at all", b"TCCP\x09\x00" + bytes(10)])
+def test_refuses_to_append_to_other_files(tmp_path, content):
+    path = tmp_path / "other.bin"
+    path.write_bytes(content)
+
+    with pytest.raises(ValueError):
+        CaptureWriter(str(path))
+    assert path.read_bytes() == content
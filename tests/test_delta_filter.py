@@ -0,0 +1,54 @@
+"""
+重複回報過濾（DeltaFilter）
+"""
+
+from types import SimpleNamespace
+
+from packet.delta_filter import DeltaFilter
+
+
+def _packet(tc_id, cmd_key, payload):
+    return SimpleNamespace(tc_id=tc_id, cmd_key=cmd_key, payload=payload)
+
+
+def test_repeat_detection_per_controller_and_command():
+    delta = DeltaFilter()
+
+    assert not delta.is_repeat(_packet(1, 0x5F03, b"a"))
+    assert delta.is_repeat(_packet(1, 0x5F03, b"a"))
+    # 其他控制器、其他指令各自比對
+    assert not delta.is_repeat(_packet(2, 0x5F03, b"a"))
+    assert not delta.is_repeat(_packet(1, 0x0F04, b"a"))
+    # 內容變化後以新內容為基準
+    assert not delta.is_repeat(_packet(1, 0x5F03, b"b"))
+    assert not delta.is_repeat(_packet(1, 0x5F03, b"a"))
+
+
+def test_reset_single_controller():
+    delta = DeltaFilter()
+    delta.is_repeat(_packet(1, 0x5F03, b"a"))
+    delta.is_repeat(_packet(2, 0x5F03, b"a"))
+
+    delta.reset(1)
+
+    assert not delta.is_repeat(_packet(1, 0x5F03, b"a"))
+    assert delta.is_repeat(_packet(2, 0x5F03, b"a"))
+
+
+def test_report_after_interval():
+    delta = DeltaFilter(report_interval=0)
+    for _ in range(3):
+        delta.is_repeat(_packet(3, 0x5F03, b"a"))
+    delta.is_repeat(_packet(1, 0x0F04, b"x"))
+    delta.is_repeat(_packet(1, 0x0F04, b"x"))
+
+    assert delta.collect_report() == "略過重複回報: TC001 0F04 x1, TC003 5F03 x2"
+    assert delta.collect_report() is None
+
+
+def test_report_waits_for_interval():
+    delta = DeltaFilter(report_interval=3600)
+    delta.is_repeat(_packet(3, 0x5F03, b"a"))
+    delta.is_repeat(_packet(3, 0x5F03, b"a"))
+
+    assert delta.collect_report() is None
@@ -0,0 +1,46 @@
+"""
+錯誤幀計數
+"""
+
+import sys
+import threading
+
+from packet.frame_errors import FrameErrors
+from utils import encode
+
+
+def test_record_invalid_classifies_by_controller_and_reason():
+    errors = FrameErrors()
+    frame = bytearray(encode(1, 7, bytes([0x5F, 0x03, 0x00])))
+    frame[-1] ^= 0xFF
+    errors.record_invalid(bytes(frame))
+    errors.record_invalid(b"\xaa")
+
+    assert errors.snapshot() == {(7, "checksum"): 1, (-1, "short"): 1}
+    assert errors.total() == 2
+    assert errors.by_reason() == {"checksum": 1, "short": 1}
+
+
+def test_concurrent_records_are_not_lost():
+    """轉發模式的上行、下行執行緒同時計數同一個 (控制器, 原因)"""
+    errors = FrameErrors()
+    threads_count, per_thread = 4, 20000
+    start = threading.Barrier(threads_count)
+
+    def worker():
+        start.wait()
+        for _ in range(per_thread):
+            errors.record("checksum", b"", 7)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors.snapshot() == {(7, "checksum"): threads_count * per_thread}
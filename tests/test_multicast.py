@@ -0,0 +1,120 @@
+"""
+Multicast 轉發（MulticastPublisher -> MulticastUDPTransport）本機 loopback 遺失與吞吐量
+
+發送端最多領先最慢的訂閱者 WINDOW 筆（避免測到核心接收緩衝區溢位），
+驗證每個訂閱者都完整收到 N 筆、無重複與錯誤，且吞吐量不低於下限。
+最大速率下的遺失率見 benchmark/multicast.py。
+"""
+
+import logging
+import random
+import threading
+import time
+
+import pytest
+
+from config.network import MulticastPublisher, MulticastUDPTransport
+from utils import decode, encode
+
+GROUP = "239.255.13.98"
+INTERFACE = "127.0.0.1"
+
+FRAMES = 20000
+WINDOW = 200
+# 吞吐量下限（幀/秒，每個訂閱者）
+MIN_THROUGHPUT = 5000
+
+BASE_PAYLOAD = bytes([0x5F, 0x03, 0x01, 0x1E, 4, 1, 1, 0x11, 0x22, 0x33, 0x44, 0, 30])
+
+
+class Subscriber:
+    """訂閱執行緒：以流水號（PAYLOAD 尾端 4 bytes）統計收到、重複與錯誤"""
+
+    def __init__(self, index: int, port: int, total: int):
+        self.transport = MulticastUDPTransport(
+            local_ip=INTERFACE, local_port=port,
+            server_ip=INTERFACE, server_port=0,
+            logger=logging.getLogger(f"tc.test_multicast.{index}"), multicast_group=GROUP,
+        )
+        self.total = total
+        self.seen = bytearray(total)
+        self.received = 0
+        self.duplicates = 0
+        self.corrupt = 0
+        self.first = None
+        self.last = None
+        self.running = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> bool:
+        if not self.transport.open():
+            return False
+        self.transport.socket.settimeout(0.05)
+        self.running = True
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        self.thread.join(2)
+        self.transport.close()
+
+    def _run(self):
+        while self.running and self.received < self.total:
+            data, _ = self.transport.receive_data()
+            if not data:
+                continue
+            for frame in self.transport.process_buffer(data):
+                try:
+                    payload = decode(frame)["payload"]
+                    counter = int.from_bytes(payload[-4:], "big")
+                except (ValueError, KeyError):
+                    self.corrupt += 1
+                    continue
+                if counter >= self.total or self.seen[counter]:
+                    self.duplicates += 1
+                    continue
+                self.seen[counter] = 1
+                self.received += 1
+                now = time.perf_counter()
+                if self.first is None:
+                    self.first = now
+                self.last = now
+
+
+@pytest.mark.parametrize("consumers", [1, 3])
+def test_loopback_fan_out_has_no_loss(consumers):
+    port = random.randint(20000, 60000)
+    subscribers = [Subscriber(i, port, FRAMES) for i in range(consumers)]
+    started = [subscriber for subscriber in subscribers if subscriber.start()]
+    publisher = MulticastPublisher(GROUP, port, logging.getLogger("tc.test_multicast"), interface=INTERFACE)
+    try:
+        if len(started) != consumers or not publisher.open():
+            pytest.skip("本機不支援 multicast loopback")
+
+        frames = [encode(i & 0xFF, 3, BASE_PAYLOAD + i.to_bytes(4, "big")) for i in range(FRAMES)]
+        # 訂閱者停止接收時最多等待 5 秒後繼續送出（由下方的遺失檢查失敗，不卡住測試）
+        deadline = time.monotonic() + 10
+        for i, frame in enumerate(frames):
+            while i - min(subscriber.received for subscriber in subscribers) >= WINDOW:
+                if time.monotonic() > deadline:
+                    break
+                time.sleep(0.0005)
+            publisher.publish(frame)
+            deadline = time.monotonic() + 5
+
+        end = time.monotonic() + 5
+        while time.monotonic() < end and any(subscriber.received < FRAMES for subscriber in subscribers):
+            time.sleep(0.01)
+    finally:
+        publisher.close()
+        for subscriber in started:
+            subscriber.stop()
+
+    assert publisher.failed == 0
+    for subscriber in subscribers:
+        assert subscriber.received == FRAMES, f"遺失 {FRAMES - subscriber.received} 筆"
+        assert subscriber.duplicates == 0
+        assert subscriber.corrupt == 0
+        throughput = FRAMES / (subscriber.last - subscriber.first)
+        assert throughput >= MIN_THROUGHPUT, f"吞吐量 {throughput:,.0f} 幀/秒"
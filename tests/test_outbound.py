@@ -0,0 +1,207 @@
+"""
+發送排程（OutboundScheduler）：優先序、重送與速率限制
+"""
+
+import threading
+import time
+
+import pytest
+
+from packet.metrics import ACK_BUCKETS_US, LatencyStats
+from packet.outbound import PRIORITY_ACK, PRIORITY_COMMAND, PRIORITY_RETRANSMIT, OutboundScheduler
+from packet.rate_limit import RateLimiter
+
+TC1 = ("127.0.0.1", 7001)
+TC2 = ("127.0.0.1", 7002)
+
+
+class RecordingNetwork:
+    """記錄送出的幀"""
+
+    def __init__(self):
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def send_data(self, frame, addr):
+        with self.lock:
+            self.sent.append((frame, addr))
+        return True
+
+    def frames(self, addr=None):
+        with self.lock:
+            return [frame for frame, to in self.sent if addr is None or to == addr]
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+@pytest.fixture
+def network():
+    return RecordingNetwork()
+
+
+@pytest.fixture
+def make_scheduler(network):
+    schedulers = []
+
+    def make(**kwargs):
+        scheduler = OutboundScheduler(network, **kwargs)
+        scheduler.start()
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def test_unacknowledged_command_is_retransmitted_then_expires(network, make_scheduler):
+    scheduler = make_scheduler(retransmit_timeout=0.05, max_retransmits=2)
+    scheduler.send_command(b"cmd", TC1, seq=1)
+
+    assert _wait_for(lambda: scheduler.expired == 1)
+    assert network.frames() == [b"cmd"] * 3
+    assert scheduler.sent[PRIORITY_COMMAND] == 1
+    assert scheduler.sent[PRIORITY_RETRANSMIT] == 2
+    assert not scheduler.awaiting
+
+
+def test_acknowledged_command_is_not_retransmitted(network, make_scheduler):
+    scheduler = make_scheduler(retransmit_timeout=0.05)
+    scheduler.send_command(b"cmd", TC1, seq=7)
+    assert _wait_for(lambda: network.frames())
+
+    assert scheduler.acknowledge(7)
+    assert not scheduler.acknowledge(7)
+    time.sleep(0.2)
+
+    assert network.frames() == [b"cmd"]
+    assert scheduler.expired == 0
+    assert scheduler.ack_rtt.count == 1
+
+
+def test_command_without_seq_is_not_tracked(network, make_scheduler):
+    scheduler = make_scheduler(retransmit_timeout=0.05)
+    scheduler.send_command(b"fire-and-forget", TC1)
+    assert _wait_for(lambda: network.frames())
+    time.sleep(0.15)
+
+    assert network.frames() == [b"fire-and-forget"]
+
+
+def test_queued_ack_is_sent_before_commands(network):
+    release = threading.Event()
+
+    class BlockingNetwork(RecordingNetwork):
+        def send_data(self, frame, addr):
+            if frame == b"first":
+                release.wait(2)
+            return super().send_data(frame, addr)
+
+    blocking = BlockingNetwork()
+    scheduler = OutboundScheduler(blocking, inline_ack=False, retransmit_timeout=0)
+    scheduler.start()
+    try:
+        scheduler.send_command(b"first", TC1)
+        assert _wait_for(lambda: scheduler.depth() == (0, 0, 0))
+        for i in range(3):
+            scheduler.send_command(b"cmd%d" % i, TC1)
+        scheduler.send_ack(b"ack", TC2)
+        release.set()
+        assert _wait_for(lambda: len(blocking.frames()) == 5)
+    finally:
+        scheduler.stop()
+
+    assert blocking.frames() == [b"first", b"ack", b"cmd0", b"cmd1", b"cmd2"]
+    assert scheduler.sent[PRIORITY_ACK] == 1
+
+
+def test_retransmit_timer_starts_when_sent(network):
+    """在佇列中等待超過重送逾時的指令，送出前不計時、不重送"""
+    release = threading.Event()
+
+    class BlockingNetwork(RecordingNetwork):
+        def send_data(self, frame, addr):
+            if frame == b"first":
+                release.wait(2)
+            return super().send_data(frame, addr)
+
+    blocking = BlockingNetwork()
+    scheduler = OutboundScheduler(blocking, retransmit_timeout=0.05, max_retransmits=2)
+    scheduler.start()
+    try:
+        scheduler.send_command(b"first", TC1)
+        scheduler.send_command(b"cmd", TC1, seq=1)
+        time.sleep(0.2)
+        release.set()
+        assert _wait_for(lambda: b"cmd" in blocking.frames())
+        assert scheduler.acknowledge(1)
+        time.sleep(0.15)
+    finally:
+        scheduler.stop()
+
+    assert blocking.frames() == [b"first", b"cmd"]
+    assert scheduler.sent[PRIORITY_RETRANSMIT] == 0
+
+
+def test_rate_limited_controller_does_not_block_others(network, make_scheduler):
+    limiter = RateLimiter(controller_rate=1.0, controller_burst=1, global_rate=0)
+    scheduler = make_scheduler(rate_limiter=limiter, retransmit_timeout=0)
+    for i in range(3):
+        scheduler.send_command(b"a%d" % i, TC1)
+    scheduler.send_command(b"b0", TC2)
+
+    assert _wait_for(lambda: b"b0" in network.frames())
+    assert network.frames(TC1) == [b"a0"]
+    assert scheduler.depth()[2] == 2
+    assert scheduler.limited > 0
+
+
+def test_queued_ack_latency_recorded_after_send(network):
+    """inline_ack=False 時 ACK 回覆延遲在發送執行緒實際送出後才記錄"""
+    release = threading.Event()
+
+    class BlockingNetwork(RecordingNetwork):
+        def send_data(self, frame, addr):
+            if frame == b"first":
+                release.wait(2)
+            return super().send_data(frame, addr)
+
+    latency = LatencyStats(ACK_BUCKETS_US)
+    blocking = BlockingNetwork()
+    scheduler = OutboundScheduler(blocking, inline_ack=False, retransmit_timeout=0, ack_latency=latency)
+    scheduler.start()
+    try:
+        scheduler.send_command(b"first", TC1)
+        assert _wait_for(lambda: scheduler.depth() == (0, 0, 0))
+        scheduler.send_ack(b"ack", TC2, time.perf_counter_ns())
+        time.sleep(0.05)
+        # 發送執行緒仍卡在前一筆：ACK 只排入佇列，尚未記錄
+        assert latency.count == 0
+        release.set()
+        assert _wait_for(lambda: latency.count == 1)
+    finally:
+        scheduler.stop()
+
+    assert latency.max_ns >= 50_000_000
+
+
+def test_inline_ack_latency_not_recorded_on_failure():
+    """立即送出的 ACK 只在送出成功時記錄回覆延遲"""
+
+    class FailingNetwork(RecordingNetwork):
+        def send_data(self, frame, addr):
+            return frame != b"bad"
+
+    latency = LatencyStats(ACK_BUCKETS_US)
+    scheduler = OutboundScheduler(FailingNetwork(), ack_latency=latency)
+    assert scheduler.send_ack(b"ack", TC1, time.perf_counter_ns())
+    assert not scheduler.send_ack(b"bad", TC1, time.perf_counter_ns())
+    assert latency.count == 1
+    assert scheduler.failed[PRIORITY_ACK] == 1
@@ -0,0 +1,100 @@
+"""
+機器可讀封包日誌（--log-format json / csv）
+"""
+
+import csv
+import json
+import logging
+
+import pytest
+
+from config import log_setup
+from config.log_setup import KeyedFileHandler, setup_packet_log, stop_logging
+from packet.center import PacketCenter
+from utils import encode
+
+FRAMES = [
+    encode(1, 3, bytes([0x5F, 0x03, 0x40, 0xC0, 2, 1, 1, 0, 30, 0x44, 0x84])),
+    encode(2, 3, bytes([0x0F, 0x04, 0x00, 0x01])),
+    encode(3, 3, bytes([0x5F, 0x03, 0x40, 0xC0, 2, 1, 2, 0, 25, 0x44, 0x84])),
+]
+
+
+@pytest.fixture
+def packet_log(tmp_path):
+    """設置封包日誌，結束後移除 handler 與管線"""
+    configured = []
+
+    def setup(output, queue_size=0):
+        logger = setup_packet_log(output, log_dir=str(tmp_path), mode="receive", queue_size=queue_size)
+        configured.append(logger)
+        return logger
+
+    yield setup
+    stop_logging("receive.packets")
+    for logger in configured:
+        _remove_handlers(logger)
+
+
+def _remove_handlers(logger):
+    """關閉封包日誌的 handler，之後可重新設置"""
+    for handler in list(logger.handlers):
+        if isinstance(handler, (KeyedFileHandler, logging.FileHandler)):
+            handler.close()
+            logger.removeHandler(handler)
+    log_setup._logging_configured.pop(logger.name, None)
+
+
+def _process(output):
+    center = PacketCenter(mode="receive", log_format=output)
+    for frame in FRAMES:
+        center.processor.process(center.parse(frame))
+
+
+def test_json_log_has_one_record_per_line(tmp_path, packet_log):
+    packet_log("json", queue_size=100)
+    _process("json")
+    stop_logging("receive.packets")
+
+    lines = (tmp_path / "receive.packets.jsonl").read_text(encoding="utf-8").splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["cmd_code"] for record in records] == ["5F03", "0F04", "5F03"]
+    assert records[2]["fields"]["步階秒數"] == 25
+
+
+def test_csv_log_writes_header_once_per_command(tmp_path, packet_log):
+    packet_log("csv")
+    _process("csv")
+
+    directory = tmp_path / "receive.packets"
+    assert sorted(path.name for path in directory.iterdir()) == ["0F04.csv", "5F03.csv"]
+
+    with open(directory / "5F03.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    header = rows[0]
+    assert header[:4] == ["receive_time", "tc_id", "seq", "cmd_code"]
+    assert len(rows) == 3
+    assert all(len(row) == len(header) for row in rows)
+    assert [row[header.index("seq")] for row in rows[1:]] == ["1", "3"]
+
+    with open(directory / "0F04.csv", encoding="utf-8", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0][-1] == "raw" and len(rows) == 2
+
+
+def test_csv_log_does_not_repeat_header_when_appending(tmp_path, packet_log):
+    logger = packet_log("csv")
+    logger.info("1,a", extra={"log_key": "5F03", "log_header": "n,v"})
+    _remove_handlers(logger)
+
+    logger = packet_log("csv")
+    logger.info("2,b", extra={"log_key": "5F03", "log_header": "n,v"})
+
+    text = (tmp_path / "receive.packets" / "5F03.csv").read_text(encoding="utf-8")
+    assert text == "n,v\n1,a\n2,b\n"
+
+
+def test_unsupported_packet_log_format(tmp_path):
+    with pytest.raises(ValueError):
+        setup_packet_log("text", log_dir=str(tmp_path), mode="packet_log_text")
+    assert not logging.getLogger("tc.packet_log_text.packets").handlers
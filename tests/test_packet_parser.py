@@ -0,0 +1,85 @@
+"""
+封包解析與驗證（PacketParser）
+"""
+
+import logging
+
+from config.network import PacketBuffer
+from packet.frame_errors import FrameErrors
+from utils import encode
+
+STEP_5F03 = bytes([0x5F, 0x03, 0x40, 0xC0, 2, 1, 1, 0, 30, 0x44, 0x84])
+
+
+def test_parse_5f03_fields(center):
+    packet = center.parse(encode(1, 3, STEP_5F03))
+
+    assert packet.cmd_code == "5F03"
+    assert packet.cmd_key == 0x5F03
+    assert packet.tc_id == 3
+    assert packet.seq == 1
+    assert packet.reply_type == "主動回報"
+    record = packet.record
+    assert record.get("時相編號") == 0x40
+    assert record.get("岔路數目") == 2
+    assert record.get("步階秒數") == 30
+    assert len(record.get("燈號狀態列表")) == 2
+    assert not center.parser.errors.snapshot()
+
+
+def test_parse_ack(center):
+    packet = center.parse(encode(9, 3))
+
+    assert packet.reply_type == "ACK"
+    assert packet.seq == 9
+    assert packet.tc_id == 3
+
+
+def test_payload_length_mismatch_is_rejected(center):
+    # 5F00 需要 ControlStrategy + BeginEnd
+    assert center.parse(encode(1, 5, bytes([0x5F, 0x00, 0x01]))) is None
+    assert center.parser.errors.snapshot() == {(5, "length"): 1}
+
+
+def test_rejected_frames_are_not_logged_per_frame(center, caplog):
+    """長度不符只計數（與隔離檔），不在接收執行緒逐筆記錄"""
+    with caplog.at_level(logging.DEBUG, logger="tc.receive"):
+        for seq in range(100):
+            assert center.parse(encode(seq, 5, bytes([0x5F, 0x00, 0x01]))) is None
+
+    assert center.parser.errors.snapshot() == {(5, "length"): 100}
+    assert not caplog.records
+
+
+def test_short_payload_is_rejected(center):
+    assert center.parse(encode(1, 5, bytes([0x5F]))) is None
+    assert center.parser.errors.snapshot() == {(5, "short"): 1}
+
+
+def test_unknown_command_returns_bare_packet(center):
+    packet = center.parse(encode(1, 5, bytes([0x7E, 0x01])))
+
+    assert packet.cmd_key == 0x7E01
+    assert packet.definition is None
+    assert center.parser.errors.snapshot() == {(5, "unknown"): 1}
+
+
+def test_corrupted_frame_is_counted(center):
+    frame = bytearray(encode(1, 6, STEP_5F03))
+    frame[-1] ^= 0xFF
+
+    assert center.parse(bytes(frame)) is None
+    assert center.parser.errors.snapshot() == {(6, "checksum"): 1}
+
+
+def test_buffer_skips_frame_with_len_below_minimum():
+    """LEN=0 的 STX 幀不可讓 PacketBuffer 原地循環"""
+    valid = encode(2, 3, STEP_5F03)
+    bad = bytes([0xAA, 0xBB, 0x01, 0x00, 0x07, 0x00, 0x00])
+    errors = FrameErrors()
+
+    for datagram in (True, False):
+        buffer = PacketBuffer(logging.getLogger("tc.test_buffer"), datagram=datagram)
+        assert buffer.feed(bad + valid, errors) == [valid]
+
+    assert errors.snapshot() == {(7, "length"): 2}
@@ -0,0 +1,48 @@
+"""
+封包處理器：延遲格式化訊息
+"""
+
+import io
+import logging
+from types import SimpleNamespace
+
+from packet.packet_processor import LazyMessage
+
+
+def test_lazy_message_renders_once_for_multiple_handlers():
+    calls = []
+
+    def render(packet):
+        calls.append(packet)
+        return f"cmd={packet.cmd_code}"
+
+    logger = logging.getLogger("tc.test_lazy_message")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    file_stream, console_stream = io.StringIO(), io.StringIO()
+    handlers = [logging.StreamHandler(file_stream), logging.StreamHandler(console_stream)]
+    for handler in handlers:
+        logger.addHandler(handler)
+    try:
+        logger.info(LazyMessage(render, SimpleNamespace(cmd_code="5F03")))
+    finally:
+        for handler in handlers:
+            logger.removeHandler(handler)
+
+    assert len(calls) == 1
+    assert file_stream.getvalue() == "cmd=5F03\n"
+    assert console_stream.getvalue() == "cmd=5F03\n"
+
+
+def test_lazy_message_caches_render_failure():
+    calls = []
+
+    def render(packet):
+        calls.append(packet)
+        raise KeyError("mode")
+
+    message = LazyMessage(render, SimpleNamespace(cmd_code="5F03"))
+    first = str(message)
+    assert first.startswith("格式化失敗: 5F03")
+    assert str(message) == first
+    assert len(calls) == 1
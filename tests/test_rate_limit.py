@@ -0,0 +1,56 @@
+"""
+發送速率限制（TokenBucket / RateLimiter）
+"""
+
+import time
+
+import pytest
+
+from packet.rate_limit import RateLimiter, TokenBucket
+
+
+def test_token_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=2.0, burst=3, now=0.0)
+    for _ in range(3):
+        assert bucket.wait_time(0.0) == 0.0
+        bucket.take()
+
+    assert bucket.wait_time(0.0) == pytest.approx(0.5)
+    assert bucket.wait_time(0.5) == 0.0
+    # 長時間閒置後最多累積 burst 個
+    assert bucket.wait_time(100.0) == 0.0
+    assert bucket.tokens == 3
+
+
+def test_controller_limit_is_per_key():
+    limiter = RateLimiter(controller_rate=1.0, controller_burst=1, global_rate=0)
+
+    assert limiter.acquire("a", 0.0) == 0.0
+    assert limiter.acquire("a", 0.0) == pytest.approx(1.0)
+    assert limiter.acquire("b", 0.0) == 0.0
+    assert limiter.acquire("a", 1.0) == 0.0
+
+
+def test_global_limit_applies_across_controllers():
+    limiter = RateLimiter(controller_rate=0, global_rate=10.0, global_burst=2)
+    # 全域 bucket 建立時以 time.monotonic() 為起點
+    now = time.monotonic()
+
+    assert limiter.acquire("a", now) == 0.0
+    assert limiter.acquire("b", now) == 0.0
+    assert limiter.acquire("c", now) == pytest.approx(0.1)
+    assert limiter.acquire("c", now + 0.1) == 0.0
+
+
+def test_denied_acquire_takes_no_tokens():
+    """控制器 bucket 不足時，全域 token 不可被扣除"""
+    limiter = RateLimiter(controller_rate=1.0, controller_burst=1, global_rate=1.0, global_burst=2)
+    now = time.monotonic()
+
+    assert limiter.acquire("a", now) == 0.0
+    assert limiter.acquire("a", now) > 0
+    assert limiter.acquire("b", now) == 0.0
+
+
+def test_describe():
+    assert RateLimiter(5, 2, 0, 0).describe() == "每控制器 5/s (burst 2), 全域 不限"
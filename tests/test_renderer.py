@@ -0,0 +1,85 @@
+"""
+封包輸出模板（text / json / csv）
+"""
+
+import csv
+import json
+
+import pytest
+
+from utils import encode
+
+STEP_5F03 = bytes([0x5F, 0x03, 0x40, 0xC0, 2, 1, 1, 0, 30, 0x44, 0x84])
+SET_OK_0F80 = bytes([0x0F, 0x80, 0x5F, 0x10])
+
+
+@pytest.fixture
+def renderer(center):
+    return center.processor.renderer
+
+
+def test_text_output(center, renderer):
+    packet = center.parse(encode(1, 3, STEP_5F03))
+    lines = renderer.text(packet).split("\n")
+
+    assert lines[0] == lines[-1] == "=" * 60
+    assert lines[1] == f"接收 5F03 封包: {packet.raw_packet}"
+    assert "序列號 (SEQ): 0x01" in lines
+    assert "控制器編號: TC003" in lines
+    assert "時相編號: 40" in lines
+    assert "步階秒數: 30 秒" in lines
+    # 燈號狀態行位於字段之後、原始資料之前
+    assert lines[-5:-1] == [
+        "   方向 1: 黃燈、左轉、直行",
+        "   方向 2: 綠燈、行人綠燈",
+        f"原始資料: {packet.raw_packet}",
+        f"接收時間: {packet.receive_time}",
+    ]
+
+
+def test_json_output(center, renderer):
+    packet = center.parse(encode(1, 3, STEP_5F03))
+    data = json.loads(renderer.json(packet))
+
+    assert data["cmd_code"] == "5F03"
+    assert data["tc_id"] == 3
+    assert data["seq"] == 1
+    assert data["reply_type"] == "主動回報"
+    assert data["raw"] == packet.raw_packet
+    assert data["fields"]["時相編號"] == "40"
+    assert data["fields"]["步階秒數"] == 30
+    assert data["fields"]["燈號狀態列表"] == ["黃燈、左轉、直行", "綠燈、行人綠燈"]
+
+
+def test_csv_output_matches_header(center, renderer):
+    packet = center.parse(encode(1, 3, STEP_5F03))
+    header = next(csv.reader([renderer.csv_header(packet)]))
+    row = next(csv.reader([renderer.csv(packet)]))
+
+    assert len(row) == len(header)
+    values = dict(zip(header, row))
+    assert values["cmd_code"] == "5F03"
+    assert values["步階秒數"] == "30"
+    assert json.loads(values["燈號狀態列表"]) == ["黃燈、左轉、直行", "綠燈、行人綠燈"]
+    assert values["raw"] == packet.raw_packet
+
+
+def test_constant_and_hex_columns(center, renderer):
+    packet = center.parse(encode(2, 3, SET_OK_0F80))
+
+    text = renderer.text(packet).split("\n")
+    assert "指令ID: 5F10" in text
+    assert "狀態: 設定成功" in text
+    assert json.loads(renderer.json(packet))["fields"] == {"指令ID": "5F10", "狀態": "設定成功"}
+
+
+def test_unknown_format_is_rejected(renderer):
+    with pytest.raises(ValueError):
+        renderer.formatter("xml")
+
+
+def test_template_is_cached_per_definition(center, renderer):
+    first = center.parse(encode(1, 3, STEP_5F03))
+    second = center.parse(encode(2, 4, STEP_5F03))
+
+    assert renderer.template(first) is renderer.template(second)
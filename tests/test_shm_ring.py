@@ -0,0 +1,111 @@
+"""
+共享記憶體環狀緩衝區（seqlock 讀取）
+"""
+
+import os
+
+import pytest
+
+from packet.shm_ring import (FLAG_TRUNCATED, HEADER_SIZE, SLOT_HEADER, SLOT_SEQ, ShmRingReader,
+                             ShmRingWriter)
+
+
+@pytest.fixture
+def ring_name(request):
+    return f"tc_test_{os.getpid()}_{request.node.name[-20:]}"
+
+
+@pytest.fixture
+def writer(ring_name):
+    writer = ShmRingWriter(ring_name, slot_count=8, slot_size=64)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def open_reader(ring_name):
+    readers = []
+
+    def open_(start="latest"):
+        reader = ShmRingReader(ring_name, start=start)
+        readers.append(reader)
+        return reader
+
+    yield open_
+    for reader in readers:
+        reader.close()
+
+
+def _publish(writer, count, start=0):
+    for i in range(start, start + count):
+        writer.publish(bytes([i]) * 4, tc_id=i, cmd_key=0x5F03, frame_seq=i, receive_ns=1000 + i)
+
+
+def test_reader_receives_published_entries(writer, open_reader):
+    reader = open_reader()
+    _publish(writer, 3)
+
+    entries = reader.read()
+    assert [entry.seq for entry in entries] == [1, 2, 3]
+    first = entries[0]
+    assert (first.tc_id, first.cmd_key, first.frame_seq, first.receive_ns, first.frame) == (
+        0, 0x5F03, 0, 1000, b"\x00" * 4)
+    assert reader.read() == []
+    assert reader.backlog() == 0
+
+
+def test_start_latest_and_oldest(writer, open_reader):
+    _publish(writer, 10)
+
+    assert open_reader("latest").read() == []
+    # 8 個 slot：最舊仍可讀取的為第 3 筆
+    assert [entry.seq for entry in open_reader("oldest").read()] == list(range(3, 11))
+
+
+def test_lapped_reader_skips_overwritten_entries(writer, open_reader):
+    reader = open_reader()
+    _publish(writer, 20)
+
+    entries = reader.read()
+    assert [entry.seq for entry in entries] == list(range(13, 21))
+    assert reader.lapped == 12
+
+
+def test_max_items(writer, open_reader):
+    reader = open_reader()
+    _publish(writer, 5)
+
+    assert [entry.seq for entry in reader.read(max_items=2)] == [1, 2]
+    assert reader.backlog() == 3
+    assert [entry.seq for entry in reader.read()] == [3, 4, 5]
+
+
+def test_slot_being_written_is_skipped(writer, open_reader):
+    reader = open_reader()
+    _publish(writer, 3)
+    # 模擬寫入者正在覆寫第 2 筆（序號先標記為 0）
+    SLOT_SEQ.pack_into(writer.buf, HEADER_SIZE + 1 * writer.slot_size, 0)
+
+    assert [entry.seq for entry in reader.read()] == [1, 3]
+    assert reader.lapped == 1
+
+
+def test_oversized_frame_is_truncated(writer, open_reader):
+    reader = open_reader()
+    frame = bytes(range(100))
+    writer.publish(frame, tc_id=1, cmd_key=0x5F03, frame_seq=1, receive_ns=0)
+
+    entry, = reader.read()
+    assert entry.flags & FLAG_TRUNCATED
+    assert entry.frame == frame[:64 - SLOT_HEADER.size]
+    assert writer.truncated == 1
+
+
+def test_live_ring_is_not_replaced(writer, ring_name):
+    with pytest.raises(FileExistsError):
+        ShmRingWriter(ring_name, slot_count=8, slot_size=64)
+
+
+def test_missing_ring():
+    with pytest.raises(FileNotFoundError):
+        ShmRingReader(f"tc_test_missing_{os.getpid()}")
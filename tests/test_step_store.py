@@ -0,0 +1,62 @@
+"""
+5F03 步階轉換時序資料（環狀緩衝區查詢與 .npz 匯出）
+"""
+
+import ast
+import zipfile
+
+from packet.step_store import MAX_SIGNALS, StepSeries, StepStore
+
+
+def _fill(series, count, start=0):
+    for i in range(start, start + count):
+        series.append(i * 1_000_000_000, 1, i % 4 + 1, i % 250 + 1, 10, [0x04] * 3)
+
+
+def _npy_shape(data):
+    header_len = int.from_bytes(data[8:10], "little")
+    header = ast.literal_eval(data[10:10 + header_len].decode("latin1"))
+    return header["shape"], len(data) - 10 - header_len
+
+
+def test_step_history_last_wraps_in_time_order():
+    series = StepSeries(capacity=5)
+    _fill(series, 7)
+
+    timestamps = [row[0] // 1_000_000_000 for row in series.step_history()]
+    assert timestamps == [2, 3, 4, 5, 6]
+    assert [row[0] // 1_000_000_000 for row in series.step_history(3)] == [4, 5, 6]
+    assert [row[0] // 1_000_000_000 for row in series.step_history(10)] == [2, 3, 4, 5, 6]
+
+
+def test_select_copies_only_requested_columns():
+    series = StepSeries(capacity=5)
+    _fill(series, 7)
+
+    cols = series.select(("step", "signal_status"), last=2)
+    assert set(cols) == {"step", "signal_status"}
+    assert list(cols["step"]) == [6, 7]
+    assert len(cols["signal_status"]) == 2 * MAX_SIGNALS
+
+
+def test_export_shape_matches_snapshot_when_appended_concurrently(tmp_path):
+    store = StepStore(capacity=16)
+    series = store.series[3] = StepSeries(16)
+    _fill(series, 4)
+
+    # 模擬接收執行緒在快照之後、寫入 signal_status 之前追加
+    original = series.snapshot
+
+    def snapshot():
+        cols = original()
+        _fill(series, 2, start=4)
+        return cols
+
+    series.snapshot = snapshot
+    path = tmp_path / "steps.npz"
+    store.export_npz(str(path), tc_id=3)
+
+    with zipfile.ZipFile(path) as zf:
+        shape, size = _npy_shape(zf.read("tc003_signal_status.npy"))
+    assert shape == (4, MAX_SIGNALS)
+    assert size == 4 * MAX_SIGNALS
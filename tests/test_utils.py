@@ -0,0 +1,80 @@
+"""
+幀編碼與解碼（utils）
+"""
+
+import pytest
+
+from utils import FrameError, calculate_checksum, decode, encode, escape_dle, unescape_dle, verify_frame
+
+
+def test_encode_stx_frame_layout():
+    frame = encode(0x12, 0x0003, bytes([0x5F, 0x00]))
+
+    assert frame[:7] == bytes([0xAA, 0xBB, 0x12, 0x00, 0x03, 0x00, 0x0C])
+    assert frame[7:9] == bytes([0x5F, 0x00])
+    assert frame[9:11] == bytes([0xAA, 0xCC])
+    assert frame[-1] == calculate_checksum(frame[:-1])
+    assert len(frame) == 12
+
+
+def test_encode_ack_frame_layout():
+    frame = encode(0x07, 0x0102)
+
+    assert frame[:7] == bytes([0xAA, 0xDD, 0x07, 0x01, 0x02, 0x00, 0x08])
+    assert frame[-1] == calculate_checksum(frame[:-1])
+    assert decode(frame) == {"type": "ACK", "seq": 7, "addr": 0x0102, "len": 8, "payload": b""}
+
+
+@pytest.mark.parametrize("payload", [
+    bytes([0x5F, 0x03]),
+    bytes([0x5F, 0xAA, 0x01]),
+    bytes([0xAA, 0xAA, 0xAA]),
+    bytes(range(256)),
+])
+def test_round_trip_with_dle_stuffing(payload):
+    frame = encode(1, 3, payload)
+
+    assert verify_frame(frame)
+    decoded = decode(frame)
+    assert decoded["type"] == "STX"
+    assert decoded["payload"] == payload
+    assert decoded["len"] == len(frame)
+
+
+def test_escape_dle_round_trip():
+    data = bytes([0x01, 0xAA, 0x02, 0xAA, 0xAA])
+    assert escape_dle(data) == bytes([0x01, 0xAA, 0xAA, 0x02, 0xAA, 0xAA, 0xAA, 0xAA])
+    assert unescape_dle(escape_dle(data)) == data
+
+
+def test_encode_rejects_out_of_range_fields():
+    with pytest.raises(ValueError):
+        encode(0x100, 3, b"\x5F\x00")
+    with pytest.raises(ValueError):
+        encode(1, 0x10000)
+
+
+def _corrupt_checksum(frame: bytes) -> bytes:
+    return frame[:-1] + bytes([frame[-1] ^ 0xFF])
+
+
+@pytest.mark.parametrize("frame, reason", [
+    (b"", "short"),
+    (b"\xaa\xbb", "short"),
+    (b"\x00" + encode(1, 3, b"\x5F\x00")[1:], "format"),
+    (b"\xaa\xee" + encode(1, 3, b"\x5F\x00")[2:], "format"),
+    (_corrupt_checksum(encode(1, 3, b"\x5F\x00")), "checksum"),
+    (_corrupt_checksum(encode(1, 3, b"\x5F\x03\x01\x02\x03")[:9]), "truncated"),
+])
+def test_decode_errors_are_classified(frame, reason):
+    with pytest.raises(FrameError) as info:
+        decode(frame)
+    assert info.value.reason == reason
+    assert not verify_frame(frame)
+
+
+def test_verify_frame_checks_length_field():
+    frame = bytearray(encode(1, 3, b"\x5F\x00"))
+    frame[6] += 1
+    frame[-1] = calculate_checksum(frame[:-1])
+    assert not verify_frame(bytes(frame))